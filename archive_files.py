@@ -0,0 +1,102 @@
+"""
+PURPOSE
+    - A module for opening the files we keep tweets (or tweet ids) in,
+    whether they are plain, gzipped or zstd compressed. Every script
+    that reads or writes archive files opens them through here, so
+    they all accept the same file types and fail the same way.
+
+METHODS
+    - open_archive_file:
+        - Open a plain, gzipped or zstd compressed file for reading or
+        writing bytes or text. See docstring for parameters and example
+        usage.
+
+DEPENDENCIES:
+    - zstandard (optional, only for .zst files)
+
+Author: Matthew R. DeVerna
+Date: 10/18/2026
+"""
+
+import io
+import gzip
+
+# Optional dependency, only needed for .zst files
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# The first bytes of every gzip file and zstd frame
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+def _compression(path, mode):
+    """
+    Return "gzip", "zstd" or None for `path`. Files being written go by
+    their ending. Files being read also go by their first bytes, so e.g.
+    a gzipped file without ".gz" in its name is still read properly.
+    """
+    if path.endswith(".gz"):
+        return "gzip"
+    if path.endswith(".zst"):
+        return "zstd"
+    if "r" in mode:
+        with open(path, "rb") as f:
+            start = f.read(4)
+        if start.startswith(GZIP_MAGIC):
+            return "gzip"
+        if start.startswith(ZSTD_MAGIC):
+            return "zstd"
+    return None
+
+
+def open_archive_file(path, mode="rb", encoding="utf-8"):
+    """
+    Open `path` for reading or writing, gzipping/gunzipping files ending
+    in ".gz" and zstd compressing/decompressing files ending in ".zst".
+    Compressed files being read are also recognized by their first bytes.
+
+    Required Parameters:
+    - path (str): File to open.
+
+    Optional Parameters:
+    - mode (str): One of "rb", "wb" (bytes) or "rt", "wt" (text).
+        - default = "rb"
+    - encoding (str): Encoding used in the text modes.
+        - default = "utf-8"
+
+    Raises:
+    - ValueError: `mode` is not one of the modes above.
+    - ImportError: The file is zstd compressed and `zstandard` is not
+        installed.
+
+    Example Usage:
+    with open_archive_file("data/streaming_data--01-02-2021.json.zst") as f:
+        for line in f:
+            ...
+    with open_archive_file("refiltered.json.gz", "wt") as f:
+        f.write(line)
+    """
+    if mode not in ("rb", "wb", "rt", "wt"):
+        raise ValueError(f"mode must be one of 'rb', 'wb', 'rt' or 'wt', not {mode!r}")
+    text = mode.endswith("t")
+    reading = mode.startswith("r")
+
+    compression = _compression(path, mode)
+    if compression == "gzip":
+        return gzip.open(path, mode, encoding=encoding if text else None)
+
+    if compression == "zstd":
+        if zstandard is None:
+            raise ImportError("Reading/writing .zst files requires the `zstandard` package (pip install zstandard)")
+        if reading:
+            reader = zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), read_across_frames=True, closefd=True)
+            f = io.BufferedReader(reader)
+        else:
+            f = zstandard.ZstdCompressor().stream_writer(open(path, "wb"), closefd=True)
+        return io.TextIOWrapper(f, encoding=encoding) if text else f
+
+    return open(path, mode, encoding=encoding if text else None)
@@ -0,0 +1,573 @@
+#!/usr/bin/env python3
+
+"""
+PURPOSE
+    - A local stand-in for the parts of the Twitter API and Moe's Tavern
+    that our scripts use, so they can be run (and benchmarked) without
+    network access, credentials or rate limit windows.
+
+ENDPOINTS
+    Twitter (plain http, see redirect/sitecustomize.py for pointing the
+    scripts at it):
+    - POST /1.1/statuses/filter.json
+        - V1 filtered stream (length delimited, as tweepy asks for). The
+        recording is played once, at `rate` tweets per second. Later
+        connections only get keep-alives, so a reconnecting streamer
+        doesn't save the same tweets twice.
+    - GET /2/tweets/search/stream
+        - V2 filtered stream ({"data": ...} lines), played once per
+        connection and then closed.
+    - GET/POST /2/tweets/search/stream/rules
+        - V2 stream rules, kept in memory.
+    - GET/POST /1.1/statuses/lookup.json
+        - Returns the recorded tweets for the requested ids (others are
+        left out, like deleted tweets).
+    - GET /2/users
+        - Made-up user objects (every 20th id comes back as an error).
+    Both lookup endpoints send x-rate-limit-limit/-remaining/-reset
+    headers and answer 429 once a window is used up.
+
+    Moe's Tavern:
+    - POST /moe/submit
+        - Returns {"result_url": ...}. The job "runs" for one poll.
+    - GET /moe/results/<job>/data/...
+        - The data page, getTweets page, tweetContent page and the
+        part-m-*.gz files (the recording, gzipped, split into
+        `num_parts` files). Range requests are supported.
+
+CLASSES
+    - MockTwitter:
+        - Holds the recording and serves it. See docstring for
+        parameters and example usage.
+
+METHODS
+    - make_tweets:
+        - Make up realistic V1 tweet objects to play back.
+    - load_tweets:
+        - Load a recording (JSONL of V1 tweet objects).
+
+Example Usage (command line):
+    python mock_twitter.py --port 8765 --tweets recorded.json --rate 500
+    # then, in another terminal
+    PYTHONPATH=benchmarks/redirect MOCK_TWITTER_URL=http://127.0.0.1:8765 python twitter-streamer-V1.py -f keywords.txt
+
+Author: Matthew R. DeVerna
+Date: 10/18/2026
+"""
+
+import re
+import gzip
+import json
+import time
+import random
+import argparse
+import threading
+from datetime import datetime as dt
+from datetime import timezone
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# Twitter's V1 created_at format, e.g. "Wed Oct 10 20:19:24 +0000 2018"
+TWITTER_TIME_FORMAT = "%a %b %d %H:%M:%S %z %Y"
+
+WORDS = (
+    "vaccine covid pfizer moderna booster mask health news today people "
+    "getting shot second dose study data trial cases hospital doctor "
+    "science public school work family friends week update report"
+    ).split()
+
+
+def make_tweets(num_tweets, seed=0):
+    """
+    Return `num_tweets` made-up V1 tweet objects, shaped (and sized,
+    roughly 4-6 KB each) like the ones the filtered stream sends.
+    """
+    rng = random.Random(seed)
+    now = time.time()
+    tweets = []
+    for num in range(num_tweets):
+        tweet_id = 1350000000000000000 + num * 1000 + rng.randint(0, 999)
+        user_id = rng.randint(10**6, 10**9)
+        hashtags = rng.sample(WORDS[:6], rng.randint(0, 3))
+        text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 40)))
+        text += "".join(f" #{tag}" for tag in hashtags)
+        created_at = dt.fromtimestamp(now, timezone.utc).strftime(TWITTER_TIME_FORMAT)
+        user = {
+            "id": user_id,
+            "id_str": str(user_id),
+            "name": f"User {user_id}",
+            "screen_name": f"user{user_id}",
+            "location": rng.choice(["", "Bloomington, IN", "New York", "London"]),
+            "url": None,
+            "description": " ".join(rng.choice(WORDS) for _ in range(rng.randint(0, 25))),
+            "protected": False,
+            "verified": rng.random() < 0.01,
+            "followers_count": rng.randint(0, 100000),
+            "friends_count": rng.randint(0, 5000),
+            "listed_count": rng.randint(0, 100),
+            "favourites_count": rng.randint(0, 50000),
+            "statuses_count": rng.randint(1, 200000),
+            "created_at": created_at,
+            "profile_background_color": "F5F8FA",
+            "profile_image_url_https": f"https://pbs.twimg.com/profile_images/{user_id}/photo_normal.jpg",
+            "profile_banner_url": f"https://pbs.twimg.com/profile_banners/{user_id}/1600000000",
+            "default_profile": True,
+            "default_profile_image": False,
+        }
+        tweet = {
+            "created_at": created_at,
+            "id": tweet_id,
+            "id_str": str(tweet_id),
+            "text": text[:140],
+            "source": "<a href=\"http://twitter.com/download/iphone\" rel=\"nofollow\">Twitter for iPhone</a>",
+            "truncated": len(text) > 140,
+            "in_reply_to_status_id": None,
+            "in_reply_to_user_id": None,
+            "user": user,
+            "geo": None,
+            "coordinates": None,
+            "place": None,
+            "is_quote_status": False,
+            "quote_count": 0,
+            "reply_count": 0,
+            "retweet_count": 0,
+            "favorite_count": 0,
+            "entities": {
+                "hashtags": [{"text": tag, "indices": [0, len(tag) + 1]} for tag in hashtags],
+                "urls": [],
+                "user_mentions": [],
+                "symbols": [],
+            },
+            "favorited": False,
+            "retweeted": False,
+            "filter_level": "low",
+            "lang": "en",
+            "timestamp_ms": str(int(now * 1000)),
+        }
+        if len(text) > 140:
+            tweet["extended_tweet"] = {
+                "full_text": text,
+                "display_text_range": [0, len(text)],
+                "entities": tweet["entities"],
+            }
+        # Roughly a third of the stream is retweets, which carry the whole original
+        if rng.random() < 0.33:
+            original = dict(tweet, id=tweet_id - 7, id_str=str(tweet_id - 7))
+            tweet["retweeted_status"] = original
+            tweet["text"] = f"RT @{user['screen_name']}: {tweet['text']}"[:140]
+        tweets.append(tweet)
+    return tweets
+
+
+def load_tweets(path, limit=None):
+    """
+    Load tweet objects from a JSONL file (.gz ok), skipping anything
+    that isn't a tweet (e.g. {"limit": ...} notices).
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    tweets = []
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            try:
+                tweet = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(tweet, dict) and "id" in tweet:
+                tweets.append(tweet)
+                if limit and len(tweets) >= limit:
+                    break
+    return tweets
+
+
+def to_v2(tweet):
+    """
+    Turn a V1 tweet object into a V2 filtered stream line.
+    """
+    created_at = dt.strptime(tweet["created_at"], TWITTER_TIME_FORMAT)
+    extended = tweet.get("extended_tweet") or {}
+    entities = extended.get("entities") or tweet.get("entities") or {}
+    data = {
+        "author_id": str(tweet["user"]["id"]),
+        "created_at": created_at.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+        "entities": {"hashtags": [{"tag": h["text"]} for h in entities.get("hashtags", [])]},
+        "id": str(tweet["id"]),
+        "text": extended.get("full_text") or tweet.get("text"),
+    }
+    return {"data": data, "matching_rules": [{"id": "1", "tag": "benchmark"}]}
+
+
+class RateLimitWindow(object):
+    """
+    Counts requests to one endpoint in fixed windows, like Twitter does.
+    """
+
+    def __init__(self, limit, window):
+        self.limit = limit
+        self.window = window
+        self.reset = int(time.time() + window)
+        self.remaining = limit
+        self.lock = threading.Lock()
+
+    def take(self):
+        """
+        Use up one request. Returns (allowed, headers).
+        """
+        with self.lock:
+            now = time.time()
+            if now >= self.reset:
+                self.reset = int(now + self.window)
+                self.remaining = self.limit
+            allowed = self.remaining > 0
+            if allowed:
+                self.remaining -= 1
+            headers = {
+                "x-rate-limit-limit": str(self.limit),
+                "x-rate-limit-remaining": str(self.remaining),
+                "x-rate-limit-reset": str(self.reset),
+            }
+        return allowed, headers
+
+
+class MockTwitter(object):
+    """
+    Serve `tweets` from the endpoints listed in this module's docstring.
+
+    Required Parameters:
+    - tweets (list): V1 tweet objects to play back (see make_tweets()).
+
+    Optional Parameters:
+    - host, port (str, int): Where to listen. Port 0 picks a free port.
+        - default = "127.0.0.1", 0
+    - rate (float): Tweets per second on the streams. 0 = as fast as
+        the client reads them.
+        - default = 0
+    - rate_limit, rate_window (int, float): Requests allowed per window
+        (seconds) on each lookup endpoint.
+        - default = 900, 900 (Twitter's user-auth limit for statuses/lookup)
+    - num_parts (int): Number of part-m-*.gz files per Moe job.
+        - default = 4
+
+    Example Usage:
+    mock = MockTwitter(make_tweets(10000), rate_limit=100000, rate_window=15)
+    mock.start()
+    print(mock.url)
+    ...
+    mock.stop()
+    """
+
+    def __init__(
+        self,
+        tweets,
+        host="127.0.0.1",
+        port=0,
+        rate=0,
+        rate_limit=900,
+        rate_window=900,
+        num_parts=4
+        ):
+        self.tweets = tweets
+        self.rate = rate
+        self.num_parts = num_parts
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+
+        # Everything is encoded once up front so serving is cheap
+        self.lines = [json.dumps(tweet).encode() for tweet in tweets]
+        self.v2_lines = [json.dumps(to_v2(tweet)).encode() for tweet in tweets]
+        self.by_id = {tweet["id"]: line for tweet, line in zip(tweets, self.lines)}
+        self.parts = [
+            gzip.compress(b"".join(line + b"\n" for line in self.lines[num::num_parts]))
+            for num in range(num_parts)
+            ]
+
+        self.rules = {}
+        self.jobs = {}
+        self.limits = {
+            "lookup": RateLimitWindow(rate_limit, rate_window),
+            "users": RateLimitWindow(rate_limit, rate_window),
+        }
+        self.v1_played = threading.Event()
+        self.stream_started_at = None
+        self.stream_finished_at = None
+        self._lock = threading.Lock()
+
+        self.server = ThreadingHTTPServer((host, port), self._make_handler())
+        self.server.daemon_threads = True
+        self.url = f"http://{self.server.server_address[0]}:{self.server.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, name="mock-twitter", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def reset_streams(self):
+        """
+        Let the V1 stream play the recording again (e.g. between benchmarks).
+        """
+        self.v1_played.clear()
+        self.stream_started_at = None
+        self.stream_finished_at = None
+
+    def _pace(self, num, started_at):
+        if self.rate:
+            delay = started_at + num / self.rate - time.time()
+            if delay > 0:
+                time.sleep(delay)
+
+    def _make_handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _params(self):
+                url = urlparse(self.path)
+                params = {key: values[0] for key, values in parse_qs(url.query).items()}
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                if body and self.headers.get("Content-Type", "").startswith("application/x-www-form-urlencoded"):
+                    params.update({key: values[0] for key, values in parse_qs(body.decode()).items()})
+                return url.path, params, body
+
+            def _send(self, status, body, content_type="application/json", headers=None):
+                if not isinstance(body, bytes):
+                    body = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _start_stream(self):
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self.close_connection = True
+
+            def do_GET(self):
+                self._route("GET")
+
+            def do_POST(self):
+                self._route("POST")
+
+            def _route(self, method):
+                path, params, body = self._params()
+                try:
+                    if path == "/1.1/statuses/filter.json":
+                        return self._v1_stream()
+                    if path == "/2/tweets/search/stream":
+                        return self._v2_stream()
+                    if path == "/2/tweets/search/stream/rules":
+                        return self._rules(method, params, body)
+                    if path == "/1.1/statuses/lookup.json":
+                        return self._lookup(params)
+                    if path == "/2/users":
+                        return self._users(params)
+                    if path == "/moe/submit":
+                        return self._moe_submit(body)
+                    if path.startswith("/moe/results/"):
+                        return self._moe_results(path)
+                    self._send(404, {"errors": [{"message": f"Unknown endpoint {path}"}]})
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def _v1_stream(self):
+                self._start_stream()
+                # Played once. Reconnections just get keep-alives.
+                with mock._lock:
+                    first = not mock.v1_played.is_set()
+                    mock.v1_played.set()
+                if not first:
+                    while True:
+                        self.wfile.write(b"\r\n")
+                        self.wfile.flush()
+                        time.sleep(1)
+
+                started_at = mock.stream_started_at = time.time()
+                for num, line in enumerate(mock.lines):
+                    mock._pace(num, started_at)
+                    self.wfile.write(f"{len(line) + 2}\r\n".encode() + line + b"\r\n")
+                mock.stream_finished_at = time.time()
+                # Stay connected (quietly) until the client goes away
+                while True:
+                    time.sleep(1)
+                    self.wfile.write(b"\r\n")
+                    self.wfile.flush()
+
+            def _v2_stream(self):
+                self._start_stream()
+                started_at = mock.stream_started_at = time.time()
+                for num, line in enumerate(mock.v2_lines):
+                    mock._pace(num, started_at)
+                    self.wfile.write(line + b"\r\n")
+                mock.stream_finished_at = time.time()
+
+            def _rules(self, method, params, body):
+                if method == "GET":
+                    data = [dict(rule, id=rule_id) for rule_id, rule in mock.rules.items()]
+                    return self._send(200, {"data": data, "meta": {"sent": "now"}} if data else {"meta": {"sent": "now"}})
+                payload = json.loads(body or b"{}")
+                if "add" in payload:
+                    created = []
+                    for rule in payload["add"]:
+                        rule_id = str(len(mock.rules) + 1 + int(time.time() * 1000))
+                        mock.rules[rule_id] = {k: v for k, v in rule.items() if k in ("value", "tag")}
+                        created.append(dict(mock.rules[rule_id], id=rule_id))
+                    return self._send(201, {"data": created, "meta": {"summary": {"created": len(created)}}})
+                deleted = 0
+                for rule_id in payload.get("delete", {}).get("ids", []):
+                    deleted += mock.rules.pop(rule_id, None) is not None
+                return self._send(200, {"meta": {"summary": {"deleted": deleted}}})
+
+            def _lookup(self, params):
+                allowed, headers = mock.limits["lookup"].take()
+                if not allowed:
+                    return self._send(429, {"errors": [{"code": 88, "message": "Rate limit exceeded"}]}, headers=headers)
+                ids = [int(tid) for tid in params.get("id", "").split(",") if tid.strip().isdigit()]
+                found = [mock.by_id[tid] for tid in ids if tid in mock.by_id]
+                self._send(200, b"[" + b",".join(found) + b"]", headers=headers)
+
+            def _users(self, params):
+                allowed, headers = mock.limits["users"].take()
+                if not allowed:
+                    return self._send(429, {"title": "Too Many Requests"}, headers=headers)
+                data, errors = [], []
+                for user_id in params.get("ids", "").split(","):
+                    if not user_id:
+                        continue
+                    if user_id.endswith("0") and int(user_id) % 20 == 0:
+                        errors.append({
+                            "value": user_id,
+                            "detail": f"Could not find user with ids: [{user_id}].",
+                            "title": "Not Found Error",
+                            "resource_type": "user",
+                            "parameter": "ids",
+                            "resource_id": user_id,
+                        })
+                        continue
+                    data.append({
+                        "id": user_id,
+                        "name": f"User {user_id}",
+                        "username": f"user{user_id}",
+                        "created_at": "2012-03-04T05:06:07.000Z",
+                        "description": "Just a made-up account for benchmarks",
+                        "protected": False,
+                        "verified": False,
+                        "public_metrics": {"followers_count": 10, "following_count": 20, "tweet_count": 30, "listed_count": 0},
+                    })
+                response = {"data": data} if data else {}
+                if errors:
+                    response["errors"] = errors
+                self._send(200, response, headers=headers)
+
+            def _moe_submit(self, body):
+                with mock._lock:
+                    job = len(mock.jobs)
+                    mock.jobs[job] = {"query": json.loads(body or b"{}"), "polls": 0}
+                host = self.headers.get("Host")
+                self._send(200, {"result_url": f"http://{host}/moe/results/{job}/"})
+
+            def _moe_results(self, path):
+                match = re.match(r"/moe/results/(\d+)/data/(.*)", path)
+                if not match or int(match.group(1)) not in mock.jobs:
+                    return self._send(404, b"", "text/html")
+                job = mock.jobs[int(match.group(1))]
+                rest = match.group(2)
+
+                if rest == "":
+                    # Still "running" on the first poll
+                    job["polls"] += 1
+                    if job["polls"] < 2:
+                        return self._send(404, b"", "text/html")
+                    return self._send(200, b'<a href="getTweets-1/">getTweets-1</a>', "text/html")
+                if rest == "getTweets-1/tweetContent/":
+                    links = "".join(
+                        f'<a href="part-m-{num:05d}.gz">part-m-{num:05d}.gz</a>\n' for num in range(mock.num_parts)
+                        )
+                    return self._send(200, links.encode(), "text/html")
+
+                match = re.match(r"getTweets-1/tweetContent/part-m-(\d+)\.gz", rest)
+                if not match or int(match.group(1)) >= mock.num_parts:
+                    return self._send(404, b"", "text/html")
+                data = mock.parts[int(match.group(1))]
+                byte_range = re.match(r"bytes=(\d+)-", self.headers.get("Range", ""))
+                if byte_range:
+                    start = int(byte_range.group(1))
+                    if start >= len(data):
+                        return self._send(416, b"", "text/html")
+                    return self._send(206, data[start:], "application/gzip",
+                                      {"Content-Range": f"bytes {start}-{len(data) - 1}/{len(data)}"})
+                self._send(200, data, "application/gzip")
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Serve recorded tweets from a local stand-in for the Twitter API and Moe's Tavern."
+    )
+    parser.add_argument(
+        "-p", "--port",
+        metavar='Port',
+        type=int,
+        default=8765,
+        help="Port to listen on. (default = 8765)"
+    )
+    parser.add_argument(
+        "-t", "--tweets",
+        metavar='Tweets',
+        help="JSONL file of recorded V1 tweets (.gz ok). (default = made-up tweets)"
+    )
+    parser.add_argument(
+        "-n", "--num-tweets",
+        metavar='Num Tweets',
+        type=int,
+        default=10000,
+        help="Number of tweets to play (made up, or read from --tweets). (default = 10000)"
+    )
+    parser.add_argument(
+        "-r", "--rate",
+        metavar='Rate',
+        type=float,
+        default=0,
+        help="Tweets per second on the streams. (default = 0, as fast as possible)"
+    )
+    parser.add_argument(
+        "--rate-limit",
+        metavar='Rate Limit',
+        type=int,
+        default=900,
+        help="Requests allowed per window on the lookup endpoints. (default = 900)"
+    )
+    parser.add_argument(
+        "--rate-window",
+        metavar='Rate Window',
+        type=float,
+        default=900,
+        help="Length of a rate limit window in seconds. (default = 900)"
+    )
+    args = parser.parse_args()
+
+    tweets = load_tweets(args.tweets, args.num_tweets) if args.tweets else make_tweets(args.num_tweets)
+    mock = MockTwitter(
+        tweets,
+        port=args.port,
+        rate=args.rate,
+        rate_limit=args.rate_limit,
+        rate_window=args.rate_window
+        )
+    print(f"Serving {len(tweets)} tweets on {mock.url} (ctrl-c to stop)")
+    try:
+        mock.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
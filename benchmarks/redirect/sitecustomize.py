@@ -0,0 +1,33 @@
+"""
+PURPOSE
+    - Point every `requests` call to Twitter (api.twitter.com and
+    stream.twitter.com) at the mock server in $MOCK_TWITTER_URL instead.
+    Python imports this file automatically on startup when this folder
+    is on the PYTHONPATH, so the scripts run unchanged:
+
+        PYTHONPATH=benchmarks/redirect MOCK_TWITTER_URL=http://127.0.0.1:8765 python hydrate_tweets.py ids.csv
+
+    tweepy, requests_oauthlib and our own scripts all send their
+    requests through requests' HTTPAdapter, which is where the url is
+    swapped.
+
+Author: Matthew R. DeVerna
+Date: 10/18/2026
+"""
+
+import os
+import re
+
+MOCK_TWITTER_URL = os.environ.get("MOCK_TWITTER_URL")
+TWITTER_HOSTS = re.compile(r"^https?://(api|stream)\.twitter\.com")
+
+if MOCK_TWITTER_URL:
+    import requests.adapters
+
+    _send = requests.adapters.HTTPAdapter.send
+
+    def send(self, request, *args, **kwargs):
+        request.url = TWITTER_HOSTS.sub(MOCK_TWITTER_URL.rstrip("/"), request.url)
+        return _send(self, request, *args, **kwargs)
+
+    requests.adapters.HTTPAdapter.send = send
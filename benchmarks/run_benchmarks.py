@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+
+"""
+PURPOSE
+    - End-to-end benchmarks for our scripts, run entirely offline
+    against the mock server in mock_twitter.py.
+
+    Each benchmark runs the real script, unchanged, in its own process
+    (in a temporary folder) with its Twitter requests redirected to the
+    mock server (see redirect/sitecustomize.py), and reports:
+        - items/s  : tweets (or users) handled per second
+        - CPU us/item : CPU time (user + system) of the process per item
+        - peak RSS : the process's peak memory use (VmHWM)
+    CPU time and RSS include starting Python and importing packages,
+    which is why the default number of tweets is fairly large.
+
+BENCHMARKS
+    - v1-stream, v1-stream-queue, v1-stream-gzip:
+        - twitter-streamer-V1.py writing directly, through the write
+        queue (-q) and gzip compressed (-c gzip). Timed from the first
+        tweet sent until the streamer has counted every tweet (read
+        from its --metrics-port).
+    - v2-stream, v2-stream-raw:
+        - wip/twitter-streamer-V2.py parsing each tweet vs --raw.
+    - hydrate:
+        - hydrate_tweets.py rehydrating every tweet id in the recording.
+    - user-lookup:
+        - user-lookup.py looking up every user id in the recording.
+    - moe-download, moe-download-parquet:
+        - moe_downloader.download_files() for one Moe job, plain and
+        converting to Parquet as it downloads (needs pyarrow).
+
+Example Usage:
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py -n 50000 --only v1-stream,v1-stream-queue
+    python benchmarks/run_benchmarks.py --tweets data/streaming_data--01-02-2021.json --json results.json
+
+Author: Matthew R. DeVerna
+Date: 10/18/2026
+"""
+
+import os
+import sys
+import glob
+import gzip
+import json
+import time
+import signal
+import socket
+import shutil
+import argparse
+import tempfile
+import subprocess
+import importlib.util
+
+import requests
+
+from mock_twitter import MockTwitter, make_tweets, load_tweets
+
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO = os.path.dirname(BENCHMARK_DIR)
+V1_DIR = os.path.join(REPO, "twitter-streaming", "v1-framework")
+WIP_DIR = os.path.join(REPO, "twitter-streaming", "wip")
+REDIRECT_DIR = os.path.join(BENCHMARK_DIR, "redirect")
+
+
+
+# Helpers
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def child_env(mock):
+    """
+    Environment for a benchmarked script: redirected to `mock`, with
+    made-up credentials.
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join([REDIRECT_DIR, REPO, env.get("PYTHONPATH", "")])
+    env["MOCK_TWITTER_URL"] = mock.url
+    env["BEARER_TOKEN"] = "benchmark"
+    for name in ("TWITTER_API_KEY", "TWITTER_API_KEY_SECRET", "TWITTER_ACCESS_TOKEN", "TWITTER_ACCESS_TOKEN_SECRET"):
+        env[name] = "benchmark"
+    return env
+
+
+def peak_rss_kb(pid):
+    """
+    Return the peak memory use (VmHWM, in KB) of process `pid` so far,
+    or None once it has exited.
+    """
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def run(cmd, cwd, env, stop_when=None, timeout=600):
+    """
+    Run `cmd` and return its wall time, CPU time, peak RSS and return
+    code. If `stop_when` (a function) is given, the process is sent
+    SIGINT (like ctrl-c) once it returns True.
+
+    The peak RSS is read from /proc while the process runs (every
+    20 ms), not from wait4: after a fork that also counts the memory
+    this script held when it started the process.
+    """
+    with open(os.path.join(cwd, "benchmark_output.txt"), "ab") as output:
+        started_at = time.time()
+        process = subprocess.Popen(cmd, cwd=cwd, env=env, stdout=output, stderr=output)
+
+        peak_kb = 0
+        stopped_at = None
+        # WNOWAIT leaves the process to be reaped (with its CPU use) below
+        while os.waitid(os.P_PID, process.pid, os.WEXITED | os.WNOHANG | os.WNOWAIT) is None:
+            peak_kb = max(peak_kb, peak_rss_kb(process.pid) or 0)
+            if (stop_when is not None) and (stopped_at is None):
+                if stop_when() or (time.time() - started_at > timeout):
+                    stopped_at = time.time()
+                    process.send_signal(signal.SIGINT)
+            time.sleep(0.02)
+
+        # wait4 gives us the CPU use of this one process
+        _, status, usage = os.wait4(process.pid, 0)
+        process.returncode = os.waitstatus_to_exitcode(status)
+        finished_at = time.time()
+
+    return {
+        "wall": finished_at - started_at,
+        "stopped_at": stopped_at or finished_at,
+        "finished_at": finished_at,
+        "cpu": usage.ru_utime + usage.ru_stime,
+        "peak_rss_mb": peak_kb / 1024,
+        "returncode": process.returncode,
+    }
+
+
+def count_lines(paths):
+    num_lines = 0
+    for path in paths:
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rb") as f:
+            num_lines += sum(1 for line in f if line.strip())
+    return num_lines
+
+
+def stream_counter(port):
+    """
+    Return a function giving (tweets counted, queue depth) from a
+    streamer's --metrics-port, or (0, 0) before it is up.
+    """
+    def read():
+        try:
+            text = requests.get(f"http://127.0.0.1:{port}/metrics", timeout=1).text
+        except requests.RequestException:
+            return 0, 0
+        values = dict(line.split() for line in text.splitlines() if line and not line.startswith("#"))
+        return int(float(values.get("stream_tweets_total", 0))), int(float(values.get("stream_queue_depth", 0)))
+    return read
+
+
+def result(name, num_items, seconds, usage, num_saved):
+    return {
+        "benchmark": name,
+        "items": num_items,
+        "saved": num_saved,
+        "seconds": round(seconds, 3),
+        "items_per_second": round(num_items / seconds, 1) if seconds > 0 else None,
+        "cpu_us_per_item": round(usage["cpu"] / num_items * 1e6, 1),
+        "peak_rss_mb": round(usage["peak_rss_mb"], 1),
+        "returncode": usage["returncode"],
+    }
+
+
+
+# Benchmarks
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def bench_v1(name, extra_args):
+    def bench(mock, work_dir):
+        with open(os.path.join(work_dir, "keywords.txt"), "w") as f:
+            f.write("vaccine\ncovid\n")
+        port = free_port()
+        counter = stream_counter(port)
+        num_tweets = len(mock.tweets)
+        mock.reset_streams()
+
+        def done():
+            counted, depth = counter()
+            return counted >= num_tweets and depth == 0
+
+        cmd = [sys.executable, os.path.join(V1_DIR, "twitter-streamer-V1.py"),
+               "-f", "keywords.txt", "--metrics-port", str(port), *extra_args]
+        usage = run(cmd, work_dir, child_env(mock), stop_when=done)
+        seconds = usage["stopped_at"] - (mock.stream_started_at or usage["stopped_at"])
+        saved = count_lines(glob.glob(os.path.join(work_dir, "data", "streaming_data--*")))
+        return result(name, num_tweets, seconds, usage, saved)
+    return bench
+
+
+def bench_v2(name, extra_args):
+    def bench(mock, work_dir):
+        with open(os.path.join(work_dir, "rules.txt"), "w") as f:
+            f.write("vaccine OR covid\tbenchmark\n")
+        num_tweets = len(mock.tweets)
+        cmd = [sys.executable, os.path.join(WIP_DIR, "twitter-streamer-V2.py"), "-r", "rules.txt", *extra_args]
+        usage = run(cmd, work_dir, child_env(mock))
+        seconds = usage["finished_at"] - (mock.stream_started_at or usage["finished_at"] - usage["wall"])
+        saved = count_lines(glob.glob(os.path.join(work_dir, "streaming_data--*")))
+        return result(name, num_tweets, seconds, usage, saved)
+    return bench
+
+
+def bench_hydrate(mock, work_dir):
+    with open(os.path.join(work_dir, "ids.csv"), "w") as f:
+        f.writelines(f"{tweet['id']}\n" for tweet in mock.tweets)
+    cmd = [sys.executable, os.path.join(REPO, "hydrate_tweets.py"), "ids.csv", "-o", "rehydrated.json"]
+    usage = run(cmd, work_dir, child_env(mock))
+    saved = count_lines([os.path.join(work_dir, "rehydrated.json")])
+    return result("hydrate", len(mock.tweets), usage["wall"], usage, saved)
+
+
+def bench_user_lookup(mock, work_dir):
+    user_ids = sorted(set(str(tweet["user"]["id"]) for tweet in mock.tweets))
+    with open(os.path.join(work_dir, "users.txt"), "w") as f:
+        f.writelines(f"{user_id}\n" for user_id in user_ids)
+    cmd = [sys.executable, os.path.join(REPO, "user-lookup.py"), "-f", "users.txt", "-c", "5"]
+    usage = run(cmd, work_dir, child_env(mock))
+    saved = count_lines(glob.glob(os.path.join(work_dir, "account_*.json")))
+    return result("user-lookup", len(user_ids), usage["wall"], usage, saved)
+
+
+def bench_moe(name, parquet):
+    def bench(mock, work_dir):
+        result_url = requests.post(f"{mock.url}/moe/submit", json={"benchmark": True}).json()["result_url"]
+        requests.get(result_url + "data/")  # The job "finishes" after one poll
+        fields = '["id", "created_at", "user_id", "text", "hashtags"]' if parquet else "None"
+        code = (
+            "from moe_downloader import find_part_files, download_files\n"
+            f"download_files(find_part_files({result_url!r}), out_dir='moe', workers=4, parquet_fields={fields})\n"
+            )
+        usage = run([sys.executable, "-c", code], work_dir, child_env(mock))
+        saved = count_lines(glob.glob(os.path.join(work_dir, "moe", "part-m-*.gz")))
+        return result(name, len(mock.tweets), usage["wall"], usage, saved)
+    return bench
+
+
+BENCHMARKS = {
+    "v1-stream": bench_v1("v1-stream", []),
+    "v1-stream-queue": bench_v1("v1-stream-queue", ["-q", "10000"]),
+    "v1-stream-gzip": bench_v1("v1-stream-gzip", ["-c", "gzip"]),
+    "v2-stream": bench_v2("v2-stream", []),
+    "v2-stream-raw": bench_v2("v2-stream-raw", ["--raw"]),
+    "hydrate": bench_hydrate,
+    "user-lookup": bench_user_lookup,
+    "moe-download": bench_moe("moe-download", parquet=False),
+    "moe-download-parquet": bench_moe("moe-download-parquet", parquet=True),
+}
+
+# Benchmarks that need optional packages
+REQUIRES = {
+    "moe-download-parquet": "pyarrow",
+}
+
+
+
+# Run
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def print_results(results):
+    print(f"\n{'Benchmark':<22}{'Items':>9}{'Saved':>9}{'Seconds':>10}{'Items/s':>11}{'CPU us/item':>13}{'Peak RSS MB':>13}")
+    print("-" * 87)
+    for r in results:
+        if "error" in r:
+            print(f"{r['benchmark']:<22}  {r['error']}")
+            continue
+        print(
+            f"{r['benchmark']:<22}{r['items']:>9}{r['saved']:>9}{r['seconds']:>10.2f}"
+            f"{r['items_per_second'] or 0:>11.0f}{r['cpu_us_per_item']:>13.1f}{r['peak_rss_mb']:>13.1f}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark our scripts offline against a mock Twitter API / Moe's Tavern."
+    )
+    parser.add_argument(
+        "-n", "--num-tweets",
+        metavar='Num Tweets',
+        type=int,
+        default=20000,
+        help="Tweets to play back. (default = 20000)"
+    )
+    parser.add_argument(
+        "-t", "--tweets",
+        metavar='Tweets',
+        help="JSONL file of recorded V1 tweets to play back (.gz ok). (default = made-up tweets)"
+    )
+    parser.add_argument(
+        "-r", "--rate",
+        metavar='Rate',
+        type=float,
+        default=0,
+        help="Tweets per second on the streams. (default = 0, as fast as possible)"
+    )
+    parser.add_argument(
+        "--only",
+        metavar='Only',
+        help=f"Comma-separated benchmarks to run. (default = all: {','.join(BENCHMARKS)})"
+    )
+    parser.add_argument(
+        "--json",
+        metavar='JSON',
+        help="Also save the results to this JSON file, e.g. to compare runs."
+    )
+    parser.add_argument(
+        "--keep",
+        action='store_true',
+        help="Keep each benchmark's temporary folder (printed) for inspection."
+    )
+    args = parser.parse_args()
+
+    names = args.only.split(",") if args.only else list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        sys.exit(f"Unknown benchmarks: {unknown}. Choose from: {list(BENCHMARKS)}")
+
+    tweets = load_tweets(args.tweets, args.num_tweets) if args.tweets else make_tweets(args.num_tweets)
+    # Big rate limit windows would have the clients pace themselves,
+    # which benchmarks the pacing instead of the code
+    mock = MockTwitter(tweets, rate=args.rate, rate_limit=100000, rate_window=60).start()
+    print(f"Mock server on {mock.url} with {len(tweets)} tweets")
+
+    results = []
+    for name in names:
+        if REQUIRES.get(name) and importlib.util.find_spec(REQUIRES[name]) is None:
+            results.append({"benchmark": name, "error": f"skipped (needs {REQUIRES[name]})"})
+            continue
+        work_dir = tempfile.mkdtemp(prefix=f"benchmark-{name}-")
+        print(f"Running {name}...")
+        try:
+            r = BENCHMARKS[name](mock, work_dir)
+            if r["saved"] != r["items"] and name != "user-lookup":
+                print(f"[!] {name} saved {r['saved']} of {r['items']} items. See {work_dir}/benchmark_output.txt")
+            results.append(r)
+        except Exception as e:
+            results.append({"benchmark": name, "error": f"failed: {e}"})
+        if args.keep:
+            print(f"\tFiles kept in {work_dir}")
+        else:
+            shutil.rmtree(work_dir)
+
+    mock.stop()
+    print_results(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+PURPOSE
+    - A module for loading multiple sets of Twitter API credentials
+    and keeping track of the rate limit of each one.
+
+METHODS
+    - load_credentials:
+        - Load all credential sets from a JSON config file or from
+        environment variables. See docstring for details.
+
+CLASSES
+    - Credential:
+        - One set of Twitter API keys/tokens plus the rate limit state
+        reported by Twitter for it.
+
+Example config file (a list with one object per Twitter app):
+[
+    {
+        "name": "lab-app-1",
+        "consumer_key": "...",
+        "consumer_secret": "...",
+        "access_token": "...",
+        "access_token_secret": "..."
+    },
+    ...
+]
+
+Author: Matthew R. DeVerna
+Date: 10/18/2026
+"""
+
+import os
+import json
+import time
+import logging
+
+
+# Keys every credential set needs
+CREDENTIAL_KEYS = ("consumer_key", "consumer_secret", "access_token", "access_token_secret")
+
+# Environment variables for each key (same names the V1 streamer uses)
+ENV_VARS = {
+    "consumer_key": "TWITTER_API_KEY",
+    "consumer_secret": "TWITTER_API_KEY_SECRET",
+    "access_token": "TWITTER_ACCESS_TOKEN",
+    "access_token_secret": "TWITTER_ACCESS_TOKEN_SECRET",
+}
+
+
+class Credential(object):
+    """
+    One set of Twitter API credentials.
+
+    Rate limit state is updated from the `x-rate-limit-*` headers of each
+    response with `update()`, and `wait()` sleeps until the limit resets if
+    there are no requests left. A Credential is meant to be used by one
+    thread at a time.
+    """
+
+    def __init__(
+        self,
+        consumer_key,
+        consumer_secret,
+        access_token,
+        access_token_secret,
+        name=None
+        ):
+        self.consumer_key = consumer_key
+        self.consumer_secret = consumer_secret
+        self.access_token = access_token
+        self.access_token_secret = access_token_secret
+        self.name = name if name else f"...{consumer_key[-4:]}"
+
+        self.remaining = None   # Requests left in the current window (None = unknown)
+        self.reset = 0.0        # Timestamp when the current window resets
+        self.num_requests = 0
+
+    def __repr__(self):
+        return f"Credential({self.name})"
+
+    def update(self, headers):
+        """
+        Record the rate limit state from a response's headers.
+        """
+        self.num_requests += 1
+        if headers is None:
+            return
+        remaining = headers.get("x-rate-limit-remaining")
+        reset = headers.get("x-rate-limit-reset")
+        if remaining is not None:
+            self.remaining = int(remaining)
+        if reset is not None:
+            self.reset = float(reset)
+
+    def exhaust(self, reset=None):
+        """
+        Mark this credential as out of requests (e.g. after a 429 error).
+        If Twitter didn't say when the window resets, assume 15 minutes.
+        """
+        self.remaining = 0
+        self.reset = reset if reset else time.time() + 15 * 60
+
+    def wait(self, buffer=5):
+        """
+        Sleep until the rate limit resets (plus `buffer` seconds) if this
+        credential has no requests left.
+        """
+        if self.remaining != 0:
+            return
+        sleep_time = self.reset + buffer - time.time()
+        if sleep_time > 0:
+            logging.info(f"{self} is rate limited. Sleeping {sleep_time:.0f} seconds.")
+            time.sleep(sleep_time)
+        self.remaining = None
+
+
+def load_credentials(config_file=None):
+    """
+    Load all credential sets.
+
+    Optional Parameters:
+    - config_file (str): Path to a JSON file containing a list of
+        credential objects (see this module's docstring). If not given,
+        credentials are read from the environment instead:
+            TWITTER_API_KEY, TWITTER_API_KEY_SECRET,
+            TWITTER_ACCESS_TOKEN, TWITTER_ACCESS_TOKEN_SECRET
+        for the first set, and the same names ending in _2, _3, ... for
+        any additional sets.
+
+    Returns:
+    - A list of Credential objects.
+    """
+    credentials = []
+
+    if config_file is not None:
+        with open(config_file, "r") as f:
+            config = json.load(f)
+        for num, entry in enumerate(config):
+            missing = [key for key in CREDENTIAL_KEYS if not entry.get(key)]
+            if missing:
+                raise ValueError(f"Credential set #{num + 1} in {config_file} is missing: {missing}")
+            credentials.append(
+                Credential(
+                    **{key: entry[key] for key in CREDENTIAL_KEYS},
+                    name=entry.get("name")
+                    )
+                )
+
+    else:
+        suffixes = [""] + [f"_{num}" for num in range(2, 1000)]
+        for suffix in suffixes:
+            values = {key: os.environ.get(var + suffix) for key, var in ENV_VARS.items()}
+            if not all(values.values()):
+                break
+            credentials.append(Credential(**values, name=f"env{suffix or '_1'}"))
+
+    if not credentials:
+        raise ValueError("No Twitter credentials found. Pass a config file or set the TWITTER_* environment variables.")
+
+    logging.info(f"Loaded {len(credentials)} credential set(s).")
+    return credentials
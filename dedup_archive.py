@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+
+# Script Information
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+"""
+Purpose: Remove duplicate tweets from the whole archive (streaming files,
+    Moe's Tavern part files and rehydrated_twts.json) so that each tweet id
+    is kept exactly once, and report how many duplicates each source had.
+
+    Every input file is rewritten (deduplicated, with the same name and
+    compression) into the output folder, keeping its path relative to
+    the folder all the inputs share (so e.g. Moe's Tavern
+    chunk-NNNN/part-m-00000.gz files don't collide). The first copy of each tweet
+    found is kept, in the order the files are given. Lines without a
+    tweet id (e.g. the stream's {"limit": ...} notices) are dropped.
+
+    A sorted file of every unique tweet id in the archive is also saved
+    (<out_dir>/tweet_ids.u64, packed little-endian uint64, which can be
+    loaded with numpy.fromfile(path, dtype="<u8")).
+
+How it works (memory use is fixed by --chunk-size, not the archive size):
+    1. Scan: every line's tweet id is paired with the line's position in
+       the archive. Each --chunk-size pairs are sorted and saved as a
+       "run" in the temporary folder.
+    2. Merge: the runs are merged (an external sort) into one stream of
+       pairs sorted by id. The first pair of each id is marked as "keep"
+       in a bitmap on disk (one bit per line), and the id is added to
+       tweet_ids.u64.
+    3. Rewrite: the files are read again and only the lines marked as
+       "keep" are written out.
+
+Usage:
+    python dedup_archive.py data/streaming_data--*.json moe_results/*.gz rehydrated_twts.json -o deduped
+    python dedup_archive.py data/*.json.gz --dry-run
+
+Author: Matthew DeVerna
+Date: 10/18/2026
+"""
+
+
+# Import packages
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+from collections import defaultdict
+
+import numpy as np
+
+# Local modules
+from archive_files import open_archive_file
+
+
+# Ids are never 0, so it marks lines without one
+NO_ID = 0
+
+
+
+# Create Functions
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Deduplicate tweets across streaming, Moe's Tavern and rehydrated files."
+    )
+    parser.add_argument(
+        "files",
+        nargs="+",
+        help="JSONL files to deduplicate (.json, .gz or .zst). Earlier files win ties."
+    )
+    parser.add_argument(
+        "-o", "--out-dir",
+        metavar='Out Dir',
+        default="deduped",
+        help="Folder for the deduplicated files and tweet_ids.u64. (default = deduped)"
+    )
+    parser.add_argument(
+        "-t", "--tmp-dir",
+        metavar='Temp Dir',
+        help="Folder for the temporary sort runs. (default = system temp folder)"
+    )
+    parser.add_argument(
+        "--chunk-size",
+        metavar='Chunk Size',
+        type=int,
+        default=10000000,
+        help="Ids sorted in memory at a time (16 bytes each). (default = 10000000)"
+    )
+    parser.add_argument(
+        "--dry-run",
+        action='store_true',
+        help="Only report duplicate rates, don't write anything."
+    )
+    return parser.parse_args()
+
+
+def source_of(path):
+    """Which source a file came from, based on its name."""
+    name = os.path.basename(path)
+    if name.startswith("streaming_data"):
+        return "streaming"
+    if name.startswith("part-m-"):
+        return "moe"
+    if name.startswith("rehydrated"):
+        return "rehydrated"
+    return "other"
+
+
+def line_id(line):
+    """
+    Return the tweet id of one line (a tweet object or, as in Moe's
+    "tweet-id" output, just the id), or NO_ID if it doesn't have one.
+    """
+    line = line.strip()
+    if line.isdigit():
+        return int(line)
+    try:
+        tweet = json.loads(line)
+    except ValueError:
+        return NO_ID
+    if not isinstance(tweet, dict) or not isinstance(tweet.get("id"), int):
+        return NO_ID
+    return tweet["id"]
+
+
+def save_run(ids, positions, tmp_dir, runs):
+    """Sort (id, position) pairs by id and save them as one run."""
+    pairs = np.column_stack((np.array(ids, dtype="<u8"), np.array(positions, dtype="<u8")))
+    pairs = pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+    path = os.path.join(tmp_dir, f"run-{len(runs):05d}.npy")
+    np.save(path, pairs)
+    runs.append(path)
+
+
+def scan(files, tmp_dir, chunk_size):
+    """
+    Step 1. Read every line of `files`, saving sorted runs of
+    (tweet id, line position) pairs to `tmp_dir`.
+
+    Returns:
+    - runs (list): Paths of the saved runs
+    - line_counts (list): Number of lines in each file
+    - no_id_counts (list): Number of lines without a tweet id in each file
+    """
+    runs, line_counts, no_id_counts = [], [], []
+    ids, positions = [], []
+    position = 0
+
+    for path in files:
+        num_lines = num_no_id = 0
+        with open_archive_file(path) as f:
+            for line in f:
+                tid = line_id(line)
+                if tid == NO_ID:
+                    num_no_id += 1
+                else:
+                    ids.append(tid)
+                    positions.append(position)
+                    if len(ids) >= chunk_size:
+                        save_run(ids, positions, tmp_dir, runs)
+                        ids, positions = [], []
+                num_lines += 1
+                position += 1
+        line_counts.append(num_lines)
+        no_id_counts.append(num_no_id)
+        print(f"Scanned {path} ({num_lines} lines)")
+
+    if ids:
+        save_run(ids, positions, tmp_dir, runs)
+    return runs, line_counts, no_id_counts
+
+
+def merge_runs(runs, block_size=1000000):
+    """
+    Step 2 (helper). Yield arrays of (id, position) pairs from all `runs`,
+    in order of id. Only `block_size` pairs of each run are in memory at
+    once.
+
+    Each round takes everything up to the smallest "last id" of the
+    blocks currently loaded. Nothing still waiting in any run can be
+    smaller than that, so the rounds come out in order.
+    """
+    runs = [np.load(path, mmap_mode="r") for path in runs]
+    offsets = [0] * len(runs)
+    blocks = [np.asarray(run[:block_size]) for run in runs]
+
+    while True:
+        live = [i for i, block in enumerate(blocks) if len(block)]
+        if not live:
+            return
+        bound = min(blocks[i][-1, 0] for i in live)
+
+        taken = []
+        for i in live:
+            cut = np.searchsorted(blocks[i][:, 0], bound, side="right")
+            taken.append(blocks[i][:cut])
+            blocks[i] = blocks[i][cut:]
+            # Refill blocks that were used up
+            if not len(blocks[i]):
+                offsets[i] += block_size
+                blocks[i] = np.asarray(runs[i][offsets[i]:offsets[i] + block_size])
+
+        merged = np.concatenate(taken)
+        yield merged[np.lexsort((merged[:, 1], merged[:, 0]))]
+
+
+def mark_keepers(runs, num_lines, keep_file, ids_file):
+    """
+    Step 2. Merge the sorted `runs` and mark the line of the first copy
+    of every tweet id in a bitmap saved to `keep_file`. Every unique id is
+    written (sorted) to `ids_file`.
+
+    Returns:
+    - The bitmap (a numpy memmap of bytes, one bit per line)
+    """
+    keep = np.memmap(keep_file, dtype=np.uint8, mode="w+", shape=(max(num_lines // 8 + 1, 1),))
+    last_id = None
+    with open(ids_file, "wb") as ids_out:
+        for pairs in merge_runs(runs):
+            is_first = np.ones(len(pairs), dtype=bool)
+            is_first[1:] = pairs[1:, 0] != pairs[:-1, 0]
+            if last_id is not None:
+                is_first[0] = pairs[0, 0] != last_id
+            last_id = pairs[-1, 0]
+
+            firsts = pairs[is_first]
+            ids_out.write(firsts[:, 0].astype("<u8").tobytes())
+            positions = firsts[:, 1]
+            np.bitwise_or.at(keep, positions // 8, (1 << (positions % 8)).astype(np.uint8))
+    keep.flush()
+    return keep
+
+
+def count_kept(keep, start, num_lines):
+    """Number of lines from `start` to `start` + `num_lines` marked as kept."""
+    if not num_lines:
+        return 0
+    bits = np.unpackbits(np.asarray(keep[start // 8:(start + num_lines) // 8 + 1]), bitorder="little")
+    offset = start % 8
+    return int(bits[offset:offset + num_lines].sum())
+
+
+def output_paths(files, out_dir):
+    """
+    Return where each of `files` is rewritten to: its path relative to
+    the deepest folder holding every input, under `out_dir`.
+    """
+    paths = [os.path.abspath(path) for path in files]
+    root = os.path.commonpath([os.path.dirname(path) for path in paths])
+    return [os.path.join(out_dir, os.path.relpath(path, root)) for path in paths]
+
+
+def rewrite(files, keep, out_dir):
+    """
+    Step 3. Write the lines of `files` marked in `keep` to files with the
+    same names (and relative paths, see output_paths) in `out_dir`.
+    """
+    position = 0
+    for path, out_path in zip(files, output_paths(files, out_dir)):
+        os.makedirs(os.path.dirname(out_path), exist_ok=True)
+        with open_archive_file(path) as f, open_archive_file(out_path, "wb") as out:
+            for line in f:
+                if keep[position // 8] >> (position % 8) & 1:
+                    out.write(line if line.endswith(b"\n") else line + b"\n")
+                position += 1
+        print(f"Wrote {out_path}")
+
+
+def report(files, line_counts, no_id_counts, keep):
+    """
+    Print the number of tweets and duplicates found in each source.
+    """
+    totals = defaultdict(lambda: [0, 0])
+    start = 0
+    for path, num_lines, num_no_id in zip(files, line_counts, no_id_counts):
+        num_tweets = num_lines - num_no_id
+        num_kept = count_kept(keep, start, num_lines)
+        totals[source_of(path)][0] += num_tweets
+        totals[source_of(path)][1] += num_tweets - num_kept
+        start += num_lines
+
+    print("\nSource          Tweets     Duplicates  Duplicate rate")
+    print("-" * 54)
+    for source, (num_tweets, num_dups) in sorted(totals.items()):
+        rate = num_dups / num_tweets if num_tweets else 0
+        print(f"{source:<12}{num_tweets:>12}{num_dups:>15}{rate:>15.2%}")
+    all_tweets = sum(t[0] for t in totals.values())
+    all_dups = sum(t[1] for t in totals.values())
+    rate = all_dups / all_tweets if all_tweets else 0
+    print("-" * 54)
+    print(f"{'total':<12}{all_tweets:>12}{all_dups:>15}{rate:>15.2%}")
+
+
+def main():
+    args = parse_args()
+    files = args.files
+
+    # Don't overwrite an input file with its own output
+    in_paths = [os.path.abspath(path) for path in files]
+    if len(set(in_paths)) != len(files):
+        raise ValueError("The same input file was given more than once.")
+    for path, out_path in zip(files, output_paths(files, os.path.abspath(args.out_dir))):
+        if out_path in in_paths:
+            raise ValueError(f"{path} would be overwritten by an output file. Pick a different --out-dir.")
+
+    tmp_dir = tempfile.mkdtemp(prefix="dedup_archive-", dir=args.tmp_dir)
+    try:
+        runs, line_counts, no_id_counts = scan(files, tmp_dir, args.chunk_size)
+
+        if args.dry_run:
+            ids_file = os.path.join(tmp_dir, "tweet_ids.u64")
+        else:
+            os.makedirs(args.out_dir, exist_ok=True)
+            ids_file = os.path.join(args.out_dir, "tweet_ids.u64")
+        keep = mark_keepers(runs, sum(line_counts), os.path.join(tmp_dir, "keep.bits"), ids_file)
+        print(f"Found {os.path.getsize(ids_file) // 8} unique tweet ids")
+
+        if not args.dry_run:
+            rewrite(files, keep, args.out_dir)
+        report(files, line_counts, no_id_counts, keep)
+        del keep
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+
+# Exectue the program
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+if __name__ == "__main__":
+    main()
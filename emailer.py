@@ -6,6 +6,16 @@ METHODS
     - send_email: 
         - A method for sending an email. See docstring for 
         parameters and example usage.
+    - flush_emails:
+        - Wait until every queued email has been sent.
+
+CLASSES
+    - MailDispatcher:
+        - Sends emails from a background thread over one reused,
+        logged-in connection, combining bursts of emails into one
+        digest and capping how often emails go out. send_email()
+        hands its emails to one of these, so it returns straight
+        away instead of waiting on the mail server.
 
 SECURITY NOTE: 
     - If you want to send from a gmail account, you 
@@ -18,12 +28,288 @@ SECURITY NOTE:
 
 Created: 01/02/2021
 Author: Matthew R. DeVerna
+
+CHANGELOG:
+    - 10/18/2026: send_email() now queues the email for a
+    background MailDispatcher (one per sending account) instead
+    of connecting to the mail server itself.
 """
 
 import smtplib
 from email.message import EmailMessage
 import logging
 import sys
+import time
+import queue
+import atexit
+import threading
+
+
+# Put on the queue to tell the dispatcher thread to finish up
+_STOP = object()
+
+
+class MailDispatcher(object):
+    """
+    Send emails from `from_email` on a background thread.
+
+    - One SMTP connection is opened, logged into and reused for every
+    email. It is closed after `idle_timeout` seconds without emails and
+    opened again (once) if the server has dropped it.
+    - Emails that arrive within `digest_window` seconds of each other
+    (and go to the same people) are sent as one digest email.
+    - At most `max_per_hour` emails are sent. Emails that come in while
+    waiting are added to the next digest, so nothing is lost. close()
+    doesn't wait for the rate limit: everything still queued goes out
+    right away as a final digest.
+
+    Required Parameters:
+    - from_email (str): The email address to send from.
+    - password (str): Password for `from_email`.
+
+    Optional Parameters:
+    - host (str): Mail server. See smtplib for details.
+        - default = "smtp.gmail.com"
+    - port (int): Mail server port (SSL).
+        - default = 465
+    - digest_window (float): Seconds to wait for more emails before
+        sending.
+        - default = 10
+    - max_per_hour (int): Most emails sent in an hour.
+        - default = 30
+    - idle_timeout (float): Seconds before an unused connection is closed.
+        - default = 60
+
+    Example Usage:
+    dispatcher = MailDispatcher("sendfromthisemail@gmail.com", password)
+    dispatcher.send(["Stream restarted."], "Stream Update", ["receiver1@gmail.com"])
+    dispatcher.close()   # Sends anything still queued
+    """
+
+    def __init__(
+        self,
+        from_email,
+        password,
+        host='smtp.gmail.com',
+        port=465,
+        digest_window=10,
+        max_per_hour=30,
+        idle_timeout=60
+        ):
+        self.from_email = from_email
+        self.password = password
+        self.host = host
+        self.port = port
+        self.digest_window = digest_window
+        self.min_interval = 3600 / max_per_hour
+        self.idle_timeout = idle_timeout
+
+        self.num_sent = 0
+        self._holding = []
+        self._closing = threading.Event()
+        self._server = None
+        self._last_send = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="mail-dispatcher", daemon=True)
+        self._thread.start()
+
+    def send(self, email_lines, subject, to_emails, log_name="Not Set."):
+        """
+        Queue an email. Returns straight away.
+        """
+        self._queue.put((list(email_lines), subject, [str(x) for x in to_emails], log_name))
+
+    def flush(self, timeout=None):
+        """
+        Wait until everything queued so far has been sent (or dropped
+        after an error). Returns False if `timeout` ran out first.
+        """
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self, timeout=None):
+        """
+        Send anything still queued (without waiting for the rate limit)
+        and stop the dispatcher thread. Emails that couldn't be sent
+        within `timeout` seconds are logged.
+        """
+        if not self._thread.is_alive():
+            return
+        self._closing.set()
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        if not self._thread.is_alive():
+            return
+
+        unsent = list(self._holding)
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, tuple):
+                unsent.append(item)
+        for email_lines, subject, to_emails, log_name in unsent:
+            logging.info(f"[!] Email not sent before exiting. Email Type: ~{log_name}~ Subject: {subject}")
+            print(f"[!] Email not sent before exiting. Email Type: ~{log_name}~ Subject:", subject)
+
+    def _connect(self):
+        if self._server is None:
+            logging.info("[*] Communicating with mail server...")
+            self._server = smtplib.SMTP_SSL(self.host, self.port)
+            self._server.ehlo()
+            # Authorize the sending email address with provided password
+            self._server.login(self.from_email, self.password)
+        return self._server
+
+    def _disconnect(self):
+        if self._server is None:
+            return
+        try:
+            self._server.quit()
+        except Exception:
+            pass
+        self._server = None
+
+    def _build_message(self, emails, to_emails):
+        """
+        Turn a list of queued emails (all to `to_emails`) into one message.
+        """
+        msg = EmailMessage()
+        if len(emails) == 1:
+            email_lines, subject, _, _ = emails[0]
+            msg.set_content("\n".join(email_lines))
+        else:
+            subject = f"[{len(emails)} messages] {emails[0][1]}"
+            sections = []
+            for num, (email_lines, email_subject, _, _) in enumerate(emails):
+                sections.append(f"#{num + 1}. {email_subject}\n{'~' * 32}\n" + "\n".join(email_lines))
+            msg.set_content("\n\n".join(sections))
+
+        # Update message container will all information
+        msg['Subject'] = subject
+        msg['From'] = self.from_email
+        msg['To'] = ",".join(to_emails)
+        return msg
+
+    def _deliver(self, emails):
+        """
+        Send `emails`, one message per group of recipients.
+        """
+        groups = {}
+        for email in emails:
+            groups.setdefault(tuple(email[2]), []).append(email)
+
+        for to_emails, group in groups.items():
+            log_names = ", ".join(sorted(set(email[3] for email in group)))
+
+            # Stay under the rate limit (unless we are closing)
+            wait = self._last_send + self.min_interval - time.time()
+            if wait > 0:
+                self._closing.wait(wait)
+
+            msg = self._build_message(group, list(to_emails))
+            for attempt in range(2):
+                try:
+                    self._connect().send_message(
+                        msg = msg,
+                        from_addr = self.from_email,
+                        to_addrs = list(to_emails)
+                        )
+                    self.num_sent += 1
+                    logging.info(f"[*] Email sent successfully. Email Type: ~{log_names}~")
+                    print("Email sent successfully.")
+                    break
+
+                # Catch all exceptions, log them, and keep going
+                    # We don't want to break something as a result of a
+                    # weird email problem. A dropped connection is
+                    # opened again once.
+                except smtplib.SMTPServerDisconnected as e:
+                    self._server = None
+                    if attempt == 1:
+                        logging.info(f"[!] Exception Encountered. Email Type: ~{log_names}~ {e}")
+                        print(f"[!] Exception Encountered. Email Type: ~{log_names}~", e)
+                except Exception as e:
+                    self._disconnect()
+                    logging.info(f"[!] Exception Encountered. Email Type: ~{log_names}~ {e}")
+                    print(f"[!] Exception Encountered. Email Type: ~{log_names}~", e)
+                    break
+            self._last_send = time.time()
+
+    def _run(self):
+        """
+        Dispatcher thread: collect emails into digests and send them.
+        """
+        stopping = False
+        while not stopping:
+            try:
+                item = self._queue.get(timeout=self.idle_timeout)
+            except queue.Empty:
+                self._disconnect()
+                continue
+
+            emails, flushes = [], []
+            # Keep collecting until the digest window closes and we are
+            # allowed to send again
+            send_at = max(time.time() + self.digest_window, self._last_send + self.min_interval)
+            while True:
+                if item is _STOP:
+                    stopping = True
+                elif isinstance(item, threading.Event):
+                    flushes.append(item)
+                else:
+                    emails.append(item)
+                # Flushing/stopping sends straight away
+                if stopping or flushes:
+                    send_at = time.time()
+                try:
+                    item = self._queue.get(timeout=max(send_at - time.time(), 0))
+                except queue.Empty:
+                    break
+
+            if emails:
+                # Kept so close() can log them if it gives up waiting
+                self._holding = emails
+                self._deliver(emails)
+                self._holding = []
+            for done in flushes:
+                done.set()
+
+        self._disconnect()
+
+
+# One dispatcher per sending account, shared by every send_email() call
+_dispatchers = {}
+_dispatchers_lock = threading.Lock()
+
+
+def _get_dispatcher(from_email, password, host, port):
+    key = (from_email, host, port)
+    with _dispatchers_lock:
+        if key not in _dispatchers:
+            _dispatchers[key] = MailDispatcher(from_email, password, host=host, port=port)
+        return _dispatchers[key]
+
+
+def flush_emails(timeout=None):
+    """
+    Wait until every email queued with send_email() has been sent.
+    """
+    with _dispatchers_lock:
+        dispatchers = list(_dispatchers.values())
+    for dispatcher in dispatchers:
+        dispatcher.flush(timeout)
+
+
+@atexit.register
+def _close_dispatchers():
+    # Don't lose queued emails when the script ends
+    with _dispatchers_lock:
+        dispatchers = list(_dispatchers.values())
+    for dispatcher in dispatchers:
+        dispatcher.close(timeout=60)
 
 
 def send_email(
@@ -39,6 +325,13 @@ def send_email(
     """
     Send email message based on parameters provided.
 
+    The email is queued for a background MailDispatcher (one per
+    `from_email`), so this returns straight away and never waits on
+    the mail server. Bursts of emails are combined into digests and
+    sending is rate limited (see MailDispatcher). Anything still queued
+    is sent (without waiting for the rate limit) when the script exits,
+    or call flush_emails() to wait.
+
     Required Paramters:
     - email_lines (list): A list of lines for the email. Each line 
     in the list concatenated together with a next line character
@@ -100,43 +393,9 @@ def send_email(
     if not isinstance(port, int):
         raise TypeError("`port` must be a string")
 
-    # Create message container 
-    msg = EmailMessage()
-
-    # Create the body of the email
-    msg.set_content("\n".join(email_lines))
-
-    # Update message container will all information
-    msg['Subject'] = subject
-    msg['From'] = from_email
-
-    # This if-statement handles whether one vs. multiple
-    # emails are provided.
-    if len(to_emails) == 1:
-        msg["To"] = str(to_emails[0])
-    else:
-        to_emails = [str(x) for x in to_emails] # Ensure all emails are strigns
-        msg['To'] = ",".join(to_emails)         # Convert to single string
-
-    try:
-        logging.info("[*] Communicating with mail server...")
-        server = smtplib.SMTP_SSL(host, port)
-        server.ehlo()
-        # Authorize the sending email address with provided password
-        server.login(from_email, password)
-        server.send_message(
-            msg = msg,
-            from_addr = from_email,
-            to_addrs = to_emails
-            )
-        server.close()
-        logging.info(f"[*] Email sent successfully. Email Type: ~{log_name}~")
-        print("Email sent successfully.")
-        
-    # Catch all exceptions, log them, and keep going
-        # We don't want to break something as a result of a
-        # weird email problem.
-    except Exception as e:
-        logging.info(f"[!] Exception Encountered. Email Type: ~{log_name}~", e)
-        print(f"[!] Exception Encountered. Email Type: ~{log_name}~", e)
-        pass
+    _get_dispatcher(from_email, password, host, port).send(
+        email_lines = email_lines,
+        subject = subject,
+        to_emails = to_emails,
+        log_name = log_name
+        )
@@ -1,28 +1,203 @@
 # Written by Christopher Torres-Lugo
+"""
+Rehydrate tweets (download the full tweet objects) from a csv file with
+one tweet id per line (optionally gzipped or zstd compressed). The file
+is read a little at a time, so memory use stays flat no matter how many
+ids it holds. All tweets are written to one JSONL file
+(rehydrated_twts.json by default).
 
+Batches of 100 ids are spread across every set of credentials we have
+(see credential_pool.py). Each credential gets its own worker thread and
+its own rate limit, so each extra Twitter app adds roughly the same
+amount of throughput.
+
+Progress is saved after every batch (see hydration_progress.py), so if
+the script is stopped or crashes, running the same command again skips
+every id that was already written and every id Twitter has already said
+is unavailable, and picks up where it stopped.
+
+Responses are kept as raw JSON: each lookup response is split into one
+line per tweet without building tweepy Status objects. If `orjson` is
+installed it is used to do the splitting (several times faster than the
+standard json module); its lines are compact and UTF-8 encoded rather
+than ASCII-escaped, but hold the same JSON.
+
+Usage:
+    python hydrate_tweets.py tweet_ids.csv
+    python hydrate_tweets.py tweet_ids.csv -c credentials.json
+    python hydrate_tweets.py tweet_ids.csv.gz
+    python hydrate_tweets.py tweet_ids.csv.zst
+"""
+
+import argparse
+import threading
+import itertools
 import tweepy
 import json
-import sys
-import pandas as pd
-# csv file with one tweet id per line
-file = sys.argv[1]
-consumer_key = ""
-consumer_secret = ""
-access_token = ""
-access_token_secret = ""
-auth = tweepy.OAuthHandler(consumer_key, consumer_secret)
-auth.set_access_token(access_token, access_token_secret)
-api = tweepy.API(auth, wait_on_rate_limit=True)
-tweets = list(pd.read_csv(file, header=None, names=['tid'])['tid'].values)
-for tweets_batch in range(0,len(tweets), 100):
-    try:
-      result = api.statuses_lookup(id_=tweets[tweets_batch:tweets_batch+100],
-                                 include_entities='true',
-                                 trim_user='false',
-                                 tweet_mode="extended")
-      with open('rehydrated_twts.json', 'a') as f:
-        for tweet_object in result:
-          json.dump(tweet_object._json, f, ensure_ascii=True)
-          f.write('\n')
-    except:
-        pass
\ No newline at end of file
+
+from tweepy.parsers import RawParser
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from archive_files import open_archive_file
+from credential_pool import load_credentials
+from hydration_progress import HydrationProgress
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+      description="Rehydrate tweets from a file of tweet ids."
+      )
+    parser.add_argument(
+      "file",
+      help="csv file with one tweet id per line. May be gzipped or zstd compressed."
+      )
+    parser.add_argument(
+      "-c", "--credentials",
+      metavar='Credentials',
+      help="JSON file with a list of credential sets (see credential_pool.py). If not given, credentials are read from the TWITTER_* environment variables."
+      )
+    parser.add_argument(
+      "-o", "--output",
+      metavar='Output',
+      default="rehydrated_twts.json",
+      help="File the rehydrated tweets are appended to. (default = rehydrated_twts.json)"
+      )
+    parser.add_argument(
+      "-p", "--progress-dir",
+      metavar='Progress Dir',
+      help="Folder used to keep track of finished ids. (default = <output>.progress)"
+      )
+    return parser.parse_args()
+
+
+def read_id_batches(file, progress, batch_size=100, chunk_size=10000):
+    """
+    Yield lists of at most `batch_size` tweet ids from `file`, leaving out
+    ids that `progress` says are finished already. Ids are read and
+    filtered `chunk_size` at a time so only one chunk is ever in memory.
+
+    Only the first column of each line is used, and lines without a
+    numeric id there (e.g. a header) are skipped.
+    """
+    with open_archive_file(file, 'rt') as f:
+        while True:
+            lines = list(itertools.islice(f, chunk_size))
+            if not lines:
+                return
+
+            ids = []
+            for line in lines:
+                tid = line.split(',', 1)[0].strip()
+                if tid.isdigit():
+                    ids.append(int(tid))
+
+            ids = [int(tid) for tid in progress.filter(ids)]
+            for start in range(0, len(ids), batch_size):
+                yield ids[start:start + batch_size]
+
+
+def split_tweets(payload):
+    """
+    Split a statuses/lookup response body (a JSON list of tweets, str
+    or bytes) into one JSON line (bytes) per tweet.
+
+    Returns:
+    - lines (list): One line per tweet, ending in a newline
+    - ids (list): The id of each tweet
+    """
+    if orjson is not None:
+        tweets = orjson.loads(payload)
+        lines = [orjson.dumps(tweet) + b'\n' for tweet in tweets]
+    else:
+        tweets = json.loads(payload)
+        lines = [json.dumps(tweet, ensure_ascii=True).encode() + b'\n' for tweet in tweets]
+    return lines, [tweet["id"] for tweet in tweets]
+
+
+def lookup_batch(api, credential, batch):
+    """
+    Look up one batch of (at most 100) tweet ids with `api`, waiting out
+    the rate limit of `credential` whenever it runs out. `api` should use
+    a RawParser, so the response body is returned as it is.
+    """
+    while True:
+        credential.wait()
+        try:
+            result = api.statuses_lookup(id_=batch,
+                                         include_entities='true',
+                                         trim_user='false',
+                                         tweet_mode="extended")
+        except tweepy.RateLimitError:
+            response = api.last_response
+            reset = response.headers.get("x-rate-limit-reset") if response is not None else None
+            credential.exhaust(float(reset) if reset else None)
+            continue
+        credential.update(api.last_response.headers)
+        return result
+
+
+def hydrate_worker(credential, batches, batches_lock, out_file, out_lock, progress):
+    """
+    Keep taking batches from the shared `batches` iterator and writing
+    the results to `out_file` until there are no batches left.
+    """
+    auth = tweepy.OAuthHandler(credential.consumer_key, credential.consumer_secret)
+    auth.set_access_token(credential.access_token, credential.access_token_secret)
+    api = tweepy.API(auth, parser=RawParser())
+
+    while True:
+        with batches_lock:
+            batch = next(batches, None)
+        if batch is None:
+            return
+
+        try:
+            result = lookup_batch(api, credential, batch)
+        except Exception as e:
+            print(f"[!] {credential} skipped a batch starting with id {batch[0]}: {e}")
+            continue
+
+        lines, found_ids = split_tweets(result)
+        missing_ids = list(set(int(tid) for tid in batch) - set(found_ids))
+        with out_lock:
+            out_file.writelines(lines)
+            progress.commit(out_file, found_ids, missing_ids)
+
+
+def hydrate(file, credentials, output, progress_dir=None):
+    """
+    Rehydrate all tweet ids in `file`, spreading batches of 100 ids across
+    all `credentials` and appending the results to `output`.
+    """
+    progress = HydrationProgress(output, progress_dir)
+    batches = read_id_batches(file, progress)
+    batches_lock = threading.Lock()
+    out_lock = threading.Lock()
+
+    with open(output, 'ab') as f:
+        workers = [
+            threading.Thread(
+                target=hydrate_worker,
+                args=(credential, batches, batches_lock, f, out_lock, progress),
+                name=f"hydrate-{credential.name}"
+                )
+            for credential in credentials
+            ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+    progress.close()
+
+    for credential in credentials:
+        print(f"{credential}: {credential.num_requests} requests")
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    credentials = load_credentials(args.credentials)
+    hydrate(args.file, credentials, args.output, args.progress_dir)
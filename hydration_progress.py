@@ -0,0 +1,140 @@
+"""
+PURPOSE
+    - A module for keeping track of which tweet ids have already been
+    rehydrated, so that hydrate_tweets.py can be stopped/crash and pick up
+    exactly where it left off.
+
+CLASSES
+    - HydrationProgress:
+        - On-disk progress index for one output file. See docstring
+        for details.
+
+FILES
+    Everything is kept in a folder next to the output file
+    (e.g. rehydrated_twts.json.progress/):
+    - done.u64       : ids of tweets that were returned (and written)
+    - tombstones.u64 : ids that Twitter silently left out of its response
+                       (deleted/protected/suspended). These are never
+                       requested again.
+    - checkpoint.json: sizes (in bytes) of the output file and the two
+                       files above after the last completed batch.
+
+    The .u64 files are just packed little-endian uint64 ids (8 bytes per
+    id), so 50M ids take up 400MB on disk and can be loaded straight into
+    numpy. On restart all three files are truncated back to the sizes in
+    checkpoint.json, which throws away anything from a batch that was only
+    partially written. That batch is then requested again.
+
+Author: Matthew R. DeVerna
+Date: 10/18/2026
+"""
+
+import os
+import json
+import logging
+import numpy as np
+
+
+class HydrationProgress(object):
+    """
+    Progress index for rehydrating tweets into `output`.
+
+    Required Parameters:
+    - output (str): The output file tweets are appended to.
+
+    Optional Parameters:
+    - progress_dir (str): Folder to keep the progress files in.
+        - default = `output` + ".progress"
+
+    Example Usage:
+    progress = HydrationProgress("rehydrated_twts.json")
+    with open("rehydrated_twts.json", "ab") as f:
+        ids = progress.filter(ids)      # Skip anything done already
+        ...                             # Write one batch of tweets to f
+        progress.commit(f, found_ids, missing_ids)
+    progress.close()
+    """
+
+    def __init__(self, output, progress_dir=None):
+        self.output = output
+        self.progress_dir = progress_dir if progress_dir else f"{output}.progress"
+        os.makedirs(self.progress_dir, exist_ok=True)
+
+        self.done_file = os.path.join(self.progress_dir, "done.u64")
+        self.tombstone_file = os.path.join(self.progress_dir, "tombstones.u64")
+        self.checkpoint_file = os.path.join(self.progress_dir, "checkpoint.json")
+
+        self._rollback()
+
+        # Sorted arrays of everything finished in previous runs
+        self.done = np.unique(np.fromfile(self.done_file, dtype="<u8"))
+        self.tombstones = np.unique(np.fromfile(self.tombstone_file, dtype="<u8"))
+        logging.info(f"Progress loaded: {len(self.done)} done | {len(self.tombstones)} tombstones")
+
+        self._done_fh = open(self.done_file, "ab")
+        self._tombstone_fh = open(self.tombstone_file, "ab")
+
+    def _rollback(self):
+        """
+        Truncate the output and progress files to the last checkpoint.
+        """
+        checkpoint = {}
+        if os.path.isfile(self.checkpoint_file):
+            with open(self.checkpoint_file, "r") as f:
+                checkpoint = json.load(f)
+
+        for key, file in (("output", self.output), ("done", self.done_file), ("tombstones", self.tombstone_file)):
+            size = checkpoint.get(key, 0)
+            if not os.path.isfile(file):
+                # Nothing to roll back, but make sure it exists
+                open(file, "ab").close()
+                continue
+            # Output written before progress tracking existed is kept as-is
+            if (key == "output") and (key not in checkpoint):
+                continue
+            if os.path.getsize(file) > size:
+                logging.info(f"Rolling {file} back to the last checkpoint ({size} bytes).")
+                with open(file, "r+b") as f:
+                    f.truncate(size)
+
+    @staticmethod
+    def _contains(sorted_ids, ids):
+        if len(sorted_ids) == 0:
+            return np.zeros(len(ids), dtype=bool)
+        positions = np.searchsorted(sorted_ids, ids)
+        positions[positions == len(sorted_ids)] = 0
+        return sorted_ids[positions] == ids
+
+    def filter(self, ids):
+        """
+        Return the `ids` which are neither done nor tombstoned.
+        """
+        ids = np.asarray(ids, dtype=np.uint64)
+        seen = self._contains(self.done, ids) | self._contains(self.tombstones, ids)
+        return ids[~seen]
+
+    def commit(self, out_file, found_ids, missing_ids):
+        """
+        Record one finished batch. Call this right after its tweets were
+        written to `out_file` (the open output file handle), and hold
+        whatever lock protects `out_file` while doing so.
+        """
+        out_file.flush()
+        self._done_fh.write(np.asarray(found_ids, dtype="<u8").tobytes())
+        self._tombstone_fh.write(np.asarray(missing_ids, dtype="<u8").tobytes())
+        self._done_fh.flush()
+        self._tombstone_fh.flush()
+
+        checkpoint = {
+            "output": out_file.tell(),
+            "done": self._done_fh.tell(),
+            "tombstones": self._tombstone_fh.tell(),
+        }
+        temp_file = f"{self.checkpoint_file}.tmp"
+        with open(temp_file, "w") as f:
+            json.dump(checkpoint, f)
+        os.replace(temp_file, self.checkpoint_file)
+
+    def close(self):
+        self._done_fh.close()
+        self._tombstone_fh.close()
@@ -5,6 +5,21 @@ Simply call the script with the proper command line flags (see
 options by calling "python3 moe-query-advanced.py -h") and the
 script will walk you through the rest.
 
+BATCH MODE
+Pass -b/--batch (plus --moes-url, --email, --start, --end and
+--input) to run without any prompts. The input file can hold any
+number of query objects: it is split into chunks of at most 5000,
+each chunk is submitted as its own job, all jobs are polled at the
+same time and each job's results are downloaded into
+<out-dir>/chunk-NNNN/ as soon as it finishes. Add --adaptive to
+automatically split the start/end window of any job that is truncated
+at 1M tweets, runs out of memory or is killed. The script exits with
+a non-zero status if any chunk failed. For example:
+
+  python3 moe-query-advanced.py -id -ti -b --input userids.txt \
+    --moes-url "<url with token>" --email me@iu.edu \
+    --start 2020-12-01T00:00 --end 2020-12-10T00:00 --out-dir results
+
 NOTES FROM MOE'S TAVERN!
 The Moe's Tavern tool is available for research by Indiana University users only. 
 All fields are required. You will receive an email with the results. 
@@ -31,12 +46,14 @@ Site Location: https://carl.cs.indiana.edu/moe/
 
 import argparse
 import dateutil.parser
+from datetime import datetime as dt
 import requests
-from bs4 import BeautifulSoup
-import urllib.request
 import pprint
 import sys
 
+from moe_downloader import find_part_files, download_files
+from moe_batch import load_query_objects, run_batch, MOE_TIME_FORMAT
+
 
 pp = pprint.PrettyPrinter(indent = 4)
 
@@ -78,6 +95,75 @@ parser.add_argument(
   action='store_true',
   help="Use an input file in your query. File should have one query object (url, hashtag, or user id) per line."
   )
+parser.add_argument(
+  "-w", "--workers", 
+  type=int,
+  default=4,
+  help="Number of files to download at once. (default = 4)"
+  )
+parser.add_argument(
+  "-pq", "--parquet", 
+  action='store_true',
+  help="Also convert each part-m-*.gz file to Parquet (part-m-*.parquet) while it downloads. Requires pyarrow."
+  )
+parser.add_argument(
+  "--fields", 
+  default="id,created_at,user_id,text,hashtags",
+  help="With -pq: comma-separated tweet fields to keep (see tweet_parquet.py). (default = id,created_at,user_id,text,hashtags)"
+  )
+parser.add_argument(
+  "-b", "--batch", 
+  action='store_true',
+  help="Run without prompts (see --moes-url, --email, --start, --end, --input). Inputs with more than 5000 query objects are split into multiple jobs."
+  )
+parser.add_argument(
+  "--moes-url", 
+  help="Batch mode: the url (with submit token) from the bottom of https://carl.cs.indiana.edu/moe"
+  )
+parser.add_argument(
+  "--email", 
+  help="Batch mode: your Indiana University email address."
+  )
+parser.add_argument(
+  "--start", 
+  help="Batch mode: query START TIME, e.g. 2020-12-03T00:00"
+  )
+parser.add_argument(
+  "--end", 
+  help="Batch mode: query END TIME, e.g. 2020-12-10T00:00"
+  )
+parser.add_argument(
+  "--input", 
+  help="Batch mode: file with one query object (url, hashtag, or user id) per line. May hold more than 5000."
+  )
+parser.add_argument(
+  "--out-dir", 
+  default=".",
+  help="Batch mode: folder to save results in. Each job gets its own sub-folder. (default = .)"
+  )
+parser.add_argument(
+  "--max-jobs", 
+  type=int,
+  default=4,
+  help="Batch mode: number of jobs submitted/polled at the same time. (default = 4)"
+  )
+parser.add_argument(
+  "--poll-interval", 
+  type=float,
+  default=60,
+  help="Batch mode: seconds between checks on each job. (default = 60)"
+  )
+parser.add_argument(
+  "--adaptive", 
+  action='store_true',
+  help="Batch mode: if a job is truncated (1M tweets), runs out of memory or is killed (2 hours), split its start/end window in half and resubmit until every piece finishes. The pieces are then joined, in time order, into one results--<start>--<end>.gz file."
+  )
+parser.add_argument(
+  "--min-window", 
+  type=float,
+  default=60,
+  help="Batch mode with --adaptive: smallest window (in minutes) a query may be split into. (default = 60)"
+  )
 
 # Read parsed arguments from the command line into "args"
 args = parser.parse_args()
@@ -89,6 +175,9 @@ user_ids = args.user_ids
 tweet_content = args.tweet_content
 tweet_ids = args.tweet_ids
 file = args.file
+workers = args.workers
+parquet_fields = args.fields.split(",") if args.parquet else None
+batch = args.batch
 
 # Make sure something was passed.
 if sum([hashtags, urls, user_ids, tweet_content, tweet_ids, file]) == 0:
@@ -102,6 +191,22 @@ if sum([hashtags, urls, user_ids]) != 1:
 if sum([tweet_content, tweet_ids]) != 1:
   raise TypeError("Can only pass ONE of the following flags: -tc, -ti.")
 
+# Batch mode can't ask for anything, so make sure we have it all.
+if batch:
+  missing = [flag for flag, value in [("--moes-url", args.moes_url), ("--email", args.email), ("--start", args.start), ("--end", args.end), ("--input", args.input)] if not value]
+  if missing:
+    raise TypeError(f"Batch mode (-b) also requires: {', '.join(missing)}")
+
+  # Check the dates now rather than after jobs have been submitted
+  try:
+    start_time_dt = dt.strptime(args.start, MOE_TIME_FORMAT)
+    end_time_dt = dt.strptime(args.end, MOE_TIME_FORMAT)
+  except ValueError:
+    raise TypeError("--start and --end must look like 2020-12-03T00:00. Please try again.")
+
+  if end_time_dt < start_time_dt:
+    raise TypeError("The end time entered occurs before start time. Please try again.")
+
 
 
 
@@ -122,7 +227,7 @@ def load_file():
       all_q_objects.append( line.rstrip("\n") )
 
   if len(all_q_objects) > 5000:
-    raise TypeError("You have pass more than 5000 search queries in your file. This is too large for Moe's Tavern. Please chunk the file into multiple smaller files and resubmit individually.")
+    raise TypeError("You have pass more than 5000 search queries in your file. This is too large for Moe's Tavern. Please chunk the file into multiple smaller files and resubmit individually, or use batch mode (-b) which does this for you.")
 
   else:
     return all_q_objects
@@ -242,42 +347,16 @@ def get_data(MOES_URL, query_details):
   result_url_str = response.json().get("result_url")
   print(f"RESULTS URL LOCATION:\n\n{result_url_str}\n\n")
 
-  # Set the data_url
-  data_url_str = result_url_str + "data/"
-
-  # Get the html content of the results "data" page
-  data_page = urllib.request.urlopen(data_url_str)
-
-  # Convert it to beautiful soup content for easier handling
-  soup = BeautifulSoup(data_page, "html.parser")
-
-  # This line iterates through all hyperlinks on the 
-  # results data page to find the unique "getTweets" link 
+  # Find ALL "part-m-0000*.gz" files on the results tweetContent page
   try:
-      getTweet_url_str = [link.get('href') for link in soup.findAll('a') if "getTweets" in link.text][0]
-  except IndexError:
-      print("~~~~~~~~\n\nNO DATA RETURNED. CHECK THE RESULT_URL TO MAKE SURE THIS IS CORRECT\n\n~~~~~~~~")
-      
-  # Build the url for the data page + the getTweets page
-  data_tweetContent_url_str = data_url_str + getTweet_url_str
-
-  # The next link will always be "tweetContent/" so we add that
-  tweet_content = data_tweetContent_url_str + "tweetContent/"
-
-  # We found the tweetContent page, now we need to get the specific download file urls
-  # To do this, we convert the final url into beautiful soup html content
-  new_html_page = urllib.request.urlopen(tweet_content)
-  final_soup = BeautifulSoup(new_html_page, "html.parser")
-
-  # Like before this line iterates through all hyperlinks on the 
-  # tweetContent page to find ALL "part-m-0000*.gz" links, which 
-  # automatically downloads compressed .gz files
-  data_files = [link.get('href') for link in final_soup.findAll('a') if "part" in link.text]
-
-  # Using the urllib.request.urlretrieve we mimic what wget does and download what's there.
-  for file in data_files:
-      urllib.request.urlretrieve(tweet_content + file,  # add the filename to this url to grab the individual file
-                                 filename= f"./{file}") # save it using the same name 
+    data_files = find_part_files(result_url_str)
+  except IOError:
+    print("~~~~~~~~\n\nNO DATA RETURNED. CHECK THE RESULT_URL TO MAKE SURE THIS IS CORRECT\n\n~~~~~~~~")
+    raise
+
+  # Download them in parallel, resuming any partial downloads, and save
+  # each one using the same name
+  download_files(data_files, out_dir=".", workers=workers, parquet_fields=parquet_fields)
 
   print("Finished Pulling Data.")
 
@@ -286,9 +365,6 @@ def get_data(MOES_URL, query_details):
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~ RUN SCRIPT ~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
 
-# Get Moe's Tavern url with submit token...
-moes_urls = get_moes_url()
-
 ## Set the type of data the user would like to return
 if tweet_content:
   data_type2return = "tweet-content"
@@ -301,6 +377,32 @@ if user_ids:
 else:
   qtype = "meme"
 
+## Batch mode: no prompts, split/submit/poll/download everything
+if batch:
+  results, failed = run_batch(
+    args.moes_url,
+    load_query_objects(args.input),
+    "hashtags" if hashtags else qtype,
+    data_type2return,
+    args.email,
+    args.start,
+    args.end,
+    out_dir=args.out_dir,
+    max_jobs=args.max_jobs,
+    poll_interval=args.poll_interval,
+    download_workers=workers,
+    adaptive=args.adaptive,
+    min_window=args.min_window,
+    parquet_fields=parquet_fields
+    )
+  # Exit non-zero so scripts/cron can tell that chunks failed
+  if failed:
+    sys.exit(f"{len(failed)} of {len(results) + len(failed)} chunks failed. See [!] FAILED above.")
+  sys.exit()
+
+# Get Moe's Tavern url with submit token...
+moes_urls = get_moes_url()
+
 # Create the query details dictionary
 query_details = create_query(qtype, data_type2return)
 
@@ -0,0 +1,500 @@
+"""
+PURPOSE
+    - A module for running large Moe's Tavern queries without babysitting
+    them. A long list of hashtags/urls/user ids is split into chunks that
+    Moe will accept (at most 5000 query objects each), every chunk is
+    submitted as its own job, all jobs are polled at the same time and
+    each job's results are downloaded as soon as it finishes.
+
+METHODS
+    - load_query_objects:
+        - Load query objects (one per line) from a file.
+    - chunk_query_objects:
+        - Split query objects into lists of at most 5000.
+    - build_query:
+        - Create the query dictionary Moe's Tavern expects.
+    - submit_query:
+        - Submit one query and return its result_url.
+    - job_status:
+        - Check whether a submitted job is still running, finished or failed.
+    - wait_for_job:
+        - Poll a job until it finishes or fails.
+    - check_window:
+        - Make sure a start/end time pair is valid before submitting.
+    - run_adaptive:
+        - Run one query, splitting its time window in half and resubmitting
+        whenever a piece is truncated (1M results), runs out of memory or
+        is killed (2 hour limit), then stitch the pieces back together in
+        time order. See docstring for parameters and example usage.
+    - run_batch:
+        - Do all of the above for a whole list of query objects.
+        See docstring for parameters and example usage.
+
+Author: Matthew R. DeVerna
+Date: 10/18/2026
+"""
+
+import os
+import gzip
+import time
+import shutil
+import threading
+import requests
+from bs4 import BeautifulSoup
+from datetime import datetime as dt
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+
+from moe_downloader import find_part_files, download_files
+
+
+# Moe's Tavern won't take more than this many query objects at once
+MAX_QUERY_OBJECTS = 5000
+
+# Moe's Tavern truncates results at this many tweets
+MAX_RESULTS = 1000000
+
+# Moe's Tavern kills jobs after two hours. Stop waiting a little after that.
+JOB_TIMEOUT = 2.5 * 60**2
+
+# Phrases in a failed job's error.log (or our own errors) which mean the
+# job was too big rather than wrong, so a smaller time window should work
+SPLITTABLE_ERRORS = ("memory", "killed", "time limit", "timed out")
+
+# Format of Moe's Tavern start/end times
+MOE_TIME_FORMAT = "%Y-%m-%dT%H:%M"
+
+
+class MoeJobError(Exception):
+    """
+    Raised when a Moe's Tavern job fails (e.g. out-of-memory or killed
+    for running more than two hours). `error_text` holds the contents
+    of the job's error.log (if there was one).
+    """
+
+    def __init__(self, message, result_url=None, error_text=""):
+        super(MoeJobError, self).__init__(message)
+        self.result_url = result_url
+        self.error_text = error_text
+
+
+def load_query_objects(file_path):
+    """
+    Load all query objects from `file_path` (one per line), skipping
+    blank lines.
+    """
+    with open(file_path, "r") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def chunk_query_objects(q_objects, size=MAX_QUERY_OBJECTS):
+    """
+    Split `q_objects` into lists of at most `size` query objects.
+    """
+    if size > MAX_QUERY_OBJECTS:
+        raise ValueError(f"Moe's Tavern accepts at most {MAX_QUERY_OBJECTS} query objects per query.")
+    return [q_objects[pos:pos + size] for pos in range(0, len(q_objects), size)]
+
+
+def build_query(q_objects, qtype, data_type2return, email, start_time, end_time, label=""):
+    """
+    Create the query dictionary for Moe's Tavern.
+
+    Required Parameters:
+    - q_objects (list): Hashtags, urls or user ids. Hashtags are given
+        a leading "#" if they don't have one already.
+    - qtype (str): "meme" (hashtags/urls) or "userid"
+    - data_type2return (str): "tweet-content" or "tweet-id"
+    - email (str): Indiana University email address
+    - start_time, end_time (str): e.g. "2020-12-03T00:00"
+
+    Optional Parameters:
+    - label (str): Label for the query.
+        - default = ""
+    """
+    if qtype == "hashtags":
+        qtype = "meme"
+        q_objects = [obj if obj.startswith("#") else "#" + obj for obj in q_objects]
+
+    return {
+        "email": email,
+        "qtype": qtype,
+        "q": ",".join(q_objects),
+        "start": start_time,
+        "end": end_time,
+        "output": data_type2return,
+        "label": label
+    }
+
+
+def submit_query(moes_url, query_details):
+    """
+    Submit a query to Moe's Tavern and return its result_url.
+    """
+    response = requests.post(moes_url, json=query_details)
+    response.raise_for_status()
+    result_url = response.json().get("result_url")
+    if not result_url:
+        raise MoeJobError(f"Moe's Tavern did not return a result_url: {response.text}")
+    return result_url
+
+
+def job_status(result_url):
+    """
+    Check on a submitted job.
+
+    Returns one of:
+    - ("running", None)
+    - ("done", list of part file urls)
+    - ("failed", text of the job's error.log)
+    """
+    data_url = result_url + "data/"
+    response = requests.get(data_url)
+
+    # The data page doesn't exist until the job has produced something
+    if response.status_code == 404:
+        return "running", None
+    response.raise_for_status()
+
+    soup = BeautifulSoup(response.text, "html.parser")
+    links = {link.text.strip(): link.get("href") for link in soup.findAll("a")}
+
+    if any("getTweets" in text for text in links):
+        return "done", find_part_files(result_url)
+
+    error_links = [href for text, href in links.items() if "error" in text.lower()]
+    if error_links:
+        error_text = requests.get(data_url + error_links[0]).text
+        if error_text.strip():
+            return "failed", error_text
+
+    return "running", None
+
+
+def wait_for_job(result_url, poll_interval=60, timeout=None):
+    """
+    Poll `result_url` every `poll_interval` seconds until the job is done
+    and return the urls of its part files. Raises MoeJobError if the job
+    fails or `timeout` seconds pass.
+    """
+    t_end = None if timeout is None else time.time() + timeout
+    while True:
+        status, details = job_status(result_url)
+        if status == "done":
+            return details
+        if status == "failed":
+            raise MoeJobError(f"Job failed: {result_url}", result_url, details)
+        if (t_end is not None) and (time.time() > t_end):
+            raise MoeJobError(f"Timed out waiting on job: {result_url}", result_url)
+        time.sleep(poll_interval)
+
+
+def check_window(start_time, end_time):
+    """
+    Raise a ValueError unless `start_time` and `end_time` are in Moe's
+    Tavern format (e.g. "2020-12-03T00:00") and `end_time` isn't before
+    `start_time`.
+    """
+    try:
+        start_dt = dt.strptime(start_time, MOE_TIME_FORMAT)
+        end_dt = dt.strptime(end_time, MOE_TIME_FORMAT)
+    except (TypeError, ValueError):
+        raise ValueError(f"Start/end times must look like 2020-12-03T00:00 (got {start_time!r}, {end_time!r}).")
+    if end_dt < start_dt:
+        raise ValueError(f"The end time ({end_time}) occurs before the start time ({start_time}).")
+
+
+def _run_job(moes_url, query_details, out_dir, poll_interval, download_workers, timeout=None, parquet_fields=None):
+    """
+    Submit one query, wait for it and download its results into `out_dir`.
+    """
+    result_url = submit_query(moes_url, query_details)
+    print(f"Submitted {out_dir}. RESULTS URL LOCATION: {result_url}")
+    part_urls = wait_for_job(result_url, poll_interval, timeout)
+    paths = download_files(part_urls, out_dir=out_dir, workers=download_workers, parquet_fields=parquet_fields)
+    return result_url, paths
+
+
+def split_window(start_time, end_time):
+    """
+    Split the window between `start_time` and `end_time` (Moe's Tavern
+    format, e.g. "2020-12-03T00:00") in half, rounding to the minute.
+    Returns two (start, end) tuples.
+    """
+    start_dt = dt.strptime(start_time, MOE_TIME_FORMAT)
+    end_dt = dt.strptime(end_time, MOE_TIME_FORMAT)
+    middle = (start_dt + (end_dt - start_dt) / 2).replace(second=0, microsecond=0)
+    middle = dt.strftime(middle, MOE_TIME_FORMAT)
+    return (start_time, middle), (middle, end_time)
+
+
+def count_lines(paths):
+    """
+    Count the lines (tweets/tweet ids) in gzipped result files.
+    """
+    num_lines = 0
+    for path in paths:
+        with gzip.open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1048576), b""):
+                num_lines += chunk.count(b"\n")
+    return num_lines
+
+
+def _run_piece(moes_url, query_details, piece_dir, poll_interval, download_workers, parquet_fields=None, job_slots=None):
+    """
+    Run the query for one time window, holding one of `job_slots` (a
+    semaphore limiting how many Moe's Tavern jobs run at once) while the
+    job runs.
+
+    Returns:
+    - ("done", paths) if it finished with complete results
+    - ("split", reason) if the window needs to be split up
+    """
+    try:
+        if job_slots is None:
+            result_url, paths = _run_job(moes_url, query_details, piece_dir, poll_interval, download_workers, JOB_TIMEOUT, parquet_fields)
+        else:
+            with job_slots:
+                result_url, paths = _run_job(moes_url, query_details, piece_dir, poll_interval, download_workers, JOB_TIMEOUT, parquet_fields)
+    except MoeJobError as e:
+        error_text = f"{e} {e.error_text}".lower()
+        if any(phrase in error_text for phrase in SPLITTABLE_ERRORS):
+            return "split", f"job failed ({e.error_text.strip()[:200] or e})"
+        raise
+
+    num_results = count_lines(paths)
+    if num_results >= MAX_RESULTS:
+        return "split", f"results truncated ({num_results} results)"
+    return "done", paths
+
+
+def stitch_results(paths, stitched_path):
+    """
+    Concatenate gzipped result files into `stitched_path`, in the order
+    given. Gzip files can simply be joined end to end, so nothing has to
+    be decompressed.
+    """
+    temp_path = f"{stitched_path}.part"
+    with open(temp_path, "wb") as out_file:
+        for path in paths:
+            with open(path, "rb") as f:
+                shutil.copyfileobj(f, out_file)
+    os.replace(temp_path, stitched_path)
+    return stitched_path
+
+
+def run_adaptive(
+    moes_url,
+    query_details,
+    out_dir=".",
+    min_window=60,
+    max_jobs=4,
+    poll_interval=60,
+    download_workers=4,
+    stitch=True,
+    parquet_fields=None,
+    job_slots=None
+    ):
+    """
+    Run one query, splitting its time window in half and resubmitting each
+    half whenever a piece:
+        - returns exactly/more than 1M results (i.e. was truncated)
+        - fails with an out-of-memory error
+        - is killed for running more than two hours
+    until every piece finishes. Pieces run at the same time.
+
+    Required Parameters:
+    - moes_url (str): Moe's Tavern submit url (including your token)
+    - query_details (dict): Query for the whole time window (see build_query)
+
+    Optional Parameters:
+    - out_dir (str): Each piece is saved in <out_dir>/<start>--<end>/
+        - default = "."
+    - min_window (float): Minutes. A piece is never split below this
+        (it fails instead).
+        - default = 60
+    - max_jobs (int): Pieces submitted/polled at the same time.
+        - default = 4
+    - poll_interval (float): Seconds between checks on each job.
+        - default = 60
+    - download_workers (int): Files downloaded at once for each piece.
+        - default = 4
+    - stitch (bool): Join every piece's results, in time order, into
+        <out_dir>/results--<start>--<end>.gz
+        - default = True
+    - parquet_fields (list): Also convert each piece's part files to
+        Parquet (kept in the piece's folder) while they download,
+        keeping these tweet fields (see tweet_parquet.py).
+        - default = None
+    - job_slots (threading.Semaphore): Shared limit on the number of Moe's
+        Tavern jobs running at once, e.g. across several run_adaptive()
+        calls (see run_batch). Each piece holds a slot while its job runs.
+        - default = a new semaphore with `max_jobs` slots
+
+    Returns:
+    - The stitched file (in a list) if `stitch` is True, otherwise every
+    piece's part files in time order.
+
+    Example Usage:
+    query = build_query(["#vaccine"], "hashtags", "tweet-id", "me@iu.edu",
+                        "2020-01-01T00:00", "2020-12-31T00:00")
+    run_adaptive(moes_url, query, out_dir="vaccine")
+    """
+    check_window(query_details["start"], query_details["end"])
+    if job_slots is None:
+        job_slots = threading.BoundedSemaphore(max_jobs)
+
+    def piece_dir(window):
+        return os.path.join(out_dir, f"{window[0]}--{window[1]}".replace(":", "-"))
+
+    def submit(executor, window):
+        piece_query = dict(query_details, start=window[0], end=window[1])
+        return executor.submit(_run_piece, moes_url, piece_query, piece_dir(window), poll_interval, download_workers, parquet_fields, job_slots)
+
+    finished = {}
+    with ThreadPoolExecutor(max_workers=max_jobs) as executor:
+        window = (query_details["start"], query_details["end"])
+        futures = {submit(executor, window): window}
+
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                window = futures.pop(future)
+                status, details = future.result()
+
+                if status == "done":
+                    finished[window] = details
+                    print(f"Finished window {window[0]} -> {window[1]}")
+                    continue
+
+                # Throw away the incomplete results and try two smaller windows
+                shutil.rmtree(piece_dir(window), ignore_errors=True)
+                length = dt.strptime(window[1], MOE_TIME_FORMAT) - dt.strptime(window[0], MOE_TIME_FORMAT)
+                if length.total_seconds() / 60 < 2 * min_window:
+                    raise MoeJobError(f"Window {window[0]} -> {window[1]} can't be split any further: {details}")
+                print(f"Splitting window {window[0]} -> {window[1]}: {details}")
+                for half in split_window(*window):
+                    futures[submit(executor, half)] = half
+
+    # Moe's time format sorts the same way as time does
+    paths = [path for window in sorted(finished) for path in sorted(finished[window])]
+    if not stitch:
+        return paths
+
+    start_time, end_time = query_details["start"], query_details["end"]
+    stitched_path = os.path.join(out_dir, f"results--{start_time}--{end_time}.gz".replace(":", "-"))
+    return [stitch_results(paths, stitched_path)]
+
+
+def _run_adaptive_job(moes_url, query_details, out_dir, poll_interval, download_workers, parquet_fields, min_window, max_jobs, job_slots):
+    """
+    run_adaptive() with the same return value as _run_job(). Every chunk
+    shares `job_slots`, so no more than `max_jobs` jobs run in total.
+    """
+    paths = run_adaptive(
+        moes_url,
+        query_details,
+        out_dir=out_dir,
+        min_window=min_window,
+        max_jobs=max_jobs,
+        poll_interval=poll_interval,
+        download_workers=download_workers,
+        parquet_fields=parquet_fields,
+        job_slots=job_slots
+        )
+    return None, paths
+
+
+def run_batch(
+    moes_url,
+    q_objects,
+    qtype,
+    data_type2return,
+    email,
+    start_time,
+    end_time,
+    out_dir=".",
+    chunk_size=MAX_QUERY_OBJECTS,
+    max_jobs=4,
+    poll_interval=60,
+    download_workers=4,
+    adaptive=False,
+    min_window=60,
+    parquet_fields=None
+    ):
+    """
+    Split `q_objects` into chunks, submit a Moe's Tavern job for each one,
+    poll all of them at once and download each job's results as soon as
+    it finishes.
+
+    Required Parameters:
+    - moes_url (str): Moe's Tavern submit url (including your token)
+    - q_objects (list): All hashtags, urls or user ids to query.
+    - qtype (str): "hashtags", "meme" (urls) or "userid"
+    - data_type2return (str): "tweet-content" or "tweet-id"
+    - email (str): Indiana University email address
+    - start_time, end_time (str): e.g. "2020-12-03T00:00"
+
+    Optional Parameters:
+    - out_dir (str): Results of chunk N are saved in <out_dir>/chunk-N/
+        - default = "."
+    - chunk_size (int): Query objects per job (at most 5000).
+        - default = 5000
+    - max_jobs (int): Jobs submitted/polled at the same time (including
+        the pieces of split windows with `adaptive`).
+        - default = 4
+    - poll_interval (float): Seconds between checks on each job.
+        - default = 60
+    - download_workers (int): Files downloaded at once for each job.
+        - default = 4
+    - adaptive (bool): Run each chunk with run_adaptive(), splitting its
+        time window whenever it is truncated/runs out of memory/is killed.
+        - default = False
+    - min_window (float): Minutes. Smallest window run_adaptive() may use.
+        - default = 60
+    - parquet_fields (list): Also convert each part file to Parquet while
+        it downloads, keeping these tweet fields (see tweet_parquet.py).
+        - default = None
+
+    Returns:
+    - A (results, failed) tuple of dictionaries. `results` maps each
+    finished chunk's folder to its downloaded files, `failed` maps each
+    failed chunk's folder to its exception. Failed chunks are also
+    listed at the end.
+
+    Example Usage:
+    results, failed = run_batch(
+        moes_url, load_query_objects("userids.txt"), "userid", "tweet-id",
+        "me@iu.edu", "2020-12-01T00:00", "2020-12-10T00:00", out_dir="results")
+    """
+    check_window(start_time, end_time)
+    chunks = chunk_query_objects(q_objects, chunk_size)
+    job_slots = threading.BoundedSemaphore(max_jobs)
+    print(f"Splitting {len(q_objects)} query objects into {len(chunks)} jobs.")
+
+    results = {}
+    failed = {}
+    with ThreadPoolExecutor(max_workers=max_jobs) as executor:
+        futures = {}
+        for num, chunk in enumerate(chunks):
+            chunk_dir = os.path.join(out_dir, f"chunk-{num:04d}")
+            query_details = build_query(chunk, qtype, data_type2return, email, start_time, end_time, label=f"chunk-{num:04d}")
+            if adaptive:
+                future = executor.submit(_run_adaptive_job, moes_url, query_details, chunk_dir, poll_interval, download_workers, parquet_fields, min_window, max_jobs, job_slots)
+            else:
+                future = executor.submit(_run_job, moes_url, query_details, chunk_dir, poll_interval, download_workers, None, parquet_fields)
+            futures[future] = chunk_dir
+
+        for future in as_completed(futures):
+            chunk_dir = futures[future]
+            try:
+                result_url, paths = future.result()
+                results[chunk_dir] = paths
+                print(f"Finished {chunk_dir} ({len(results)}/{len(chunks)})")
+            except Exception as e:
+                failed[chunk_dir] = e
+                print(f"[!] {chunk_dir} failed: {e}")
+
+    for chunk_dir, e in failed.items():
+        print(f"[!] FAILED: {chunk_dir} | {e}")
+
+    return results, failed
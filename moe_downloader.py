@@ -0,0 +1,256 @@
+"""
+PURPOSE
+    - A module for downloading the results of a Moe's Tavern query
+    (the part-m-*.gz files).
+
+METHODS
+    - find_part_files:
+        - Walk from a query's result_url to its tweetContent page and
+        return the urls of all the part-m-*.gz files found there.
+    - download_file:
+        - Download one file, resuming a partial download if one exists
+        and checking the gzip data as it comes in.
+    - download_files:
+        - Download many files at once with a pool of worker threads,
+        optionally converting each one to Parquet as it downloads.
+
+NOTES
+    - Files are downloaded to "<file>.part" and only renamed to "<file>"
+    once the whole file has arrived and passed the gzip check, so a
+    file without the .part ending is always complete.
+    - If a connection drops, the download is retried (with an increasing
+    wait) and picks up from the end of the .part file with an HTTP Range
+    request instead of starting again.
+
+Author: Matthew R. DeVerna
+Date: 10/18/2026
+"""
+
+import os
+import time
+import zlib
+import functools
+import requests
+import urllib.request
+from bs4 import BeautifulSoup
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+
+class GzipChecker(object):
+    """
+    Incrementally decompress gzip data (possibly made of several members)
+    and throw an error as soon as it is corrupt. Nothing is kept except
+    the decompressor state.
+    """
+
+    def __init__(self, on_data=None):
+        # Optionally called with each piece of decompressed data
+        self.on_data = on_data
+        self._decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+        self._in_member = False
+
+    def feed(self, chunk):
+        while chunk:
+            self._in_member = True
+            data = self._decompressor.decompress(chunk)
+            if data and self.on_data is not None:
+                self.on_data(data)
+            if not self._decompressor.eof:
+                return
+            # End of one gzip member (its CRC checked out). Anything
+            # left over is the start of the next one.
+            self._in_member = False
+            chunk = self._decompressor.unused_data
+            self._decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+
+    def finish(self):
+        """
+        Raise an error if the data ended in the middle of a gzip member.
+        """
+        if self._in_member:
+            raise IOError("Gzip data ended unexpectedly (truncated file).")
+
+
+def find_part_files(result_url):
+    """
+    Return the urls of every part-m-*.gz file for a query, given the
+    `result_url` returned by Moe's Tavern when it was submitted.
+    """
+    # Set the data_url
+    data_url_str = result_url + "data/"
+
+    # Get the html content of the results "data" page
+    data_page = urllib.request.urlopen(data_url_str)
+
+    # Convert it to beautiful soup content for easier handling
+    soup = BeautifulSoup(data_page, "html.parser")
+
+    # This line iterates through all hyperlinks on the
+    # results data page to find the unique "getTweets" link
+    try:
+        getTweet_url_str = [link.get('href') for link in soup.findAll('a') if "getTweets" in link.text][0]
+    except IndexError:
+        raise IOError(f"No data returned. Check the result_url page to make sure this is correct: {result_url}")
+
+    # Build the url for the data page + the getTweets page
+    # The next link will always be "tweetContent/" so we add that
+    tweet_content = data_url_str + getTweet_url_str + "tweetContent/"
+
+    # We found the tweetContent page, now we need to get the specific download file urls
+    final_soup = BeautifulSoup(urllib.request.urlopen(tweet_content), "html.parser")
+
+    # Find ALL "part-m-0000*.gz" links
+    data_files = [link.get('href') for link in final_soup.findAll('a') if "part" in link.text]
+    return [tweet_content + file for file in data_files]
+
+
+def download_file(url, path, retries=5, chunk_size=1048576, timeout=60, on_data=None, on_restart=None):
+    """
+    Download `url` to `path`.
+
+    Required Parameters:
+    - url (str): Url of the file.
+    - path (str): Where to save it.
+
+    Optional Parameters:
+    - retries (int): How many times to retry after a failed attempt.
+        - default = 5
+    - chunk_size (int): Bytes read from the connection at a time.
+        - default = 1048576 (1 MB)
+    - timeout (float): Seconds to wait on the server before giving up
+        on an attempt.
+        - default = 60
+    - on_data (function): Called with each piece of decompressed data as
+        the file downloads (see GzipChecker). Note that when a download
+        is resumed the data already on disk is passed through again.
+        - default = None
+    - on_restart (function): Called (with no arguments) before every
+        attempt, so whatever `on_data` feeds can start over.
+        - default = None
+
+    Returns:
+    - `path`
+    """
+    if os.path.isfile(path):
+        return path
+
+    part_path = f"{path}.part"
+
+    for attempt in range(retries + 1):
+        try:
+            if on_restart is not None:
+                on_restart()
+            _download_attempt(url, part_path, chunk_size, timeout, on_data)
+            os.replace(part_path, path)
+            return path
+
+        except (requests.RequestException, IOError, zlib.error) as e:
+            if isinstance(e, zlib.error):
+                # The data itself is bad, so don't resume from it
+                os.remove(part_path)
+            if attempt == retries:
+                raise
+            wait = 2 ** attempt
+            print(f"[!] Problem downloading {url} ({e}). Retrying in {wait} seconds...")
+            time.sleep(wait)
+
+
+def _download_attempt(url, part_path, chunk_size, timeout, on_data):
+    """
+    One attempt at downloading `url`, resuming from `part_path` if it exists.
+    """
+    checker = GzipChecker(on_data)
+    offset = os.path.getsize(part_path) if os.path.isfile(part_path) else 0
+
+    # Check what we already have so the gzip check covers the whole file
+    if offset:
+        with open(part_path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                checker.feed(chunk)
+
+    headers = {"Range": f"bytes={offset}-"} if offset else {}
+    with requests.get(url, headers=headers, stream=True, timeout=timeout) as response:
+
+        # The server ignored the Range request, so start from scratch
+        if offset and response.status_code == 200:
+            offset = 0
+            checker = GzipChecker(on_data)
+        # Nothing left to download
+        elif offset and response.status_code == 416:
+            checker.finish()
+            return
+        response.raise_for_status()
+
+        with open(part_path, "ab" if offset else "wb") as f:
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                checker.feed(chunk)
+                f.write(chunk)
+
+    checker.finish()
+
+
+def download_to_parquet(url, path, fields=None, **kwargs):
+    """
+    Download `url` to `path` while decompressing and converting it to
+    Parquet (see tweet_parquet.py) at the same time, so the file is never
+    read back from disk or held in memory. The Parquet file is saved next
+    to `path` (part-m-00000.gz -> part-m-00000.parquet). Any other keyword
+    arguments are passed to download_file().
+    """
+    # Only needed (along with pyarrow) if we convert to Parquet
+    from tweet_parquet import LineConverter, convert_file, DEFAULT_FIELDS
+
+    fields = fields if fields else DEFAULT_FIELDS
+    parquet_path = os.path.splitext(path)[0] + ".parquet"
+    if os.path.isfile(parquet_path):
+        return download_file(url, path, **kwargs)
+
+    # Downloaded before, just not converted
+    if os.path.isfile(path):
+        convert_file(path, parquet_path, fields)
+        return path
+
+    converter = LineConverter(parquet_path, fields)
+    try:
+        download_file(url, path, on_data=converter.feed, on_restart=converter.restart, **kwargs)
+        converter.close()
+    except BaseException:
+        # Don't leave a half written "<parquet_path>.part" behind
+        converter.discard()
+        raise
+    if converter.num_bad_lines:
+        print(f"[!] Skipped {converter.num_bad_lines} lines that weren't valid JSON in {path}")
+    return path
+
+
+def download_files(urls, out_dir=".", workers=4, parquet_fields=None, **kwargs):
+    """
+    Download every url in `urls` into `out_dir` (keeping each file's
+    name) using `workers` threads. Any other keyword arguments are
+    passed to download_file().
+
+    If `parquet_fields` (a list of tweet fields, see tweet_parquet.py) is
+    given, each file is also converted to Parquet while it downloads.
+
+    Returns:
+    - A list of the downloaded file paths.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+
+    if parquet_fields:
+        download = functools.partial(download_to_parquet, fields=parquet_fields)
+    else:
+        download = download_file
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(download, url, os.path.join(out_dir, url.rstrip("/").split("/")[-1]), **kwargs): url
+            for url in urls
+            }
+        for num, future in enumerate(as_completed(futures)):
+            path = future.result()
+            paths.append(path)
+            print(f"Downloaded {path} ({num + 1}/{len(futures)})")
+
+    return paths
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+
+# Script Information
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+"""
+Purpose: Convert the finished daily files written by the streamers
+    (data/streaming_data--<date>.json, .json.gz or .json.zst) into a
+    date-partitioned Parquet archive with a flattened schema:
+
+        <out_dir>/date=YYYY-MM-DD/streaming_data.parquet
+
+    Hourly files (data/streaming_data--<date>_<hour>.json, written with
+    `twitter-streamer-V1.py --hourly`) each become one file in their
+    day's partition:
+
+        <out_dir>/date=YYYY-MM-DD/streaming_data-HH.parquet
+
+    Notebooks can then read just the columns (and days) they need, e.g.
+        pd.read_parquet("archive", columns=["id", "hashtags"])
+
+    Conversion is incremental: days that were already converted (and
+    haven't changed since) are skipped, and today's file (or this
+    hour's) is left alone because the streamer is still writing to it.
+    Files are converted in parallel, one per process. A file that fails
+    to convert leaves nothing behind in the archive.
+
+Usage:
+    python streaming_to_parquet.py -i data -o archive
+    python streaming_to_parquet.py -i data -o archive --fields id,created_at,user_id,text,hashtags,lang
+
+Author: Matthew DeVerna
+Date: 10/18/2026
+"""
+
+
+# Import packages
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+import argparse
+import glob
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime as dt
+
+from tweet_parquet import convert_file, DEFAULT_FIELDS
+
+
+# The V1 streamer names files streaming_data--MM-DD-YYYY.json(.gz/.zst),
+# or streaming_data--MM-DD-YYYY_HH.json(.gz/.zst) with --hourly
+FILE_PATTERN = re.compile(r"streaming_data--(\d{2}-\d{2}-\d{4})(?:_(\d{2}))?\.json(\.gz|\.zst)?$")
+FILE_DATE_FORMAT = "%m-%d-%Y"
+
+
+
+# Create Functions
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Convert daily streaming JSON files into a date-partitioned Parquet archive."
+    )
+    parser.add_argument(
+        "-i", "--input-dir",
+        metavar='Input Dir',
+        default="data",
+        help="Folder holding the streaming_data--<date>.json files. (default = data)"
+    )
+    parser.add_argument(
+        "-o", "--out-dir",
+        metavar='Out Dir',
+        default="archive",
+        help="Folder for the Parquet archive. (default = archive)"
+    )
+    parser.add_argument(
+        "--fields",
+        metavar='Fields',
+        default=",".join(DEFAULT_FIELDS),
+        help=f"Comma-separated tweet fields to keep (see tweet_parquet.py). (default = {','.join(DEFAULT_FIELDS)})"
+    )
+    parser.add_argument(
+        "-w", "--workers",
+        metavar='Workers',
+        type=int,
+        default=os.cpu_count(),
+        help="Number of files converted at once. (default = number of CPUs)"
+    )
+    parser.add_argument(
+        "--include-today",
+        action='store_true',
+        help="Also convert today's file (or this hour's), even though it is probably still being written."
+    )
+    return parser.parse_args()
+
+
+def find_daily_files(input_dir, include_today=False):
+    """Return a list of (date, hour, path) tuples for every daily or
+    hourly file in `input_dir`, oldest first. Dates are datetime.date
+    objects and `hour` is None for daily files."""
+    now = dt.now()
+    today = now.date()
+    daily_files = []
+    for path in glob.glob(os.path.join(input_dir, "streaming_data--*")):
+        match = FILE_PATTERN.search(os.path.basename(path))
+        if not match:
+            continue
+        date = dt.strptime(match.group(1), FILE_DATE_FORMAT).date()
+        hour = int(match.group(2)) if match.group(2) else None
+        if hour is None:
+            unfinished = date >= today
+        else:
+            unfinished = (date, hour) >= (today, now.hour)
+        if unfinished and not include_today:
+            continue
+        daily_files.append((date, hour, path))
+    return sorted(daily_files, key=lambda item: (item[0], -1 if item[1] is None else item[1], item[2]))
+
+
+def partition_path(out_dir, date, hour=None):
+    """Where the Parquet file for `date` (and `hour`) goes."""
+    file_name = "streaming_data.parquet" if hour is None else f"streaming_data-{hour:02d}.parquet"
+    return os.path.join(out_dir, f"date={date:%Y-%m-%d}", file_name)
+
+
+def needs_converting(in_path, out_path):
+    """True if `out_path` doesn't exist or is older than `in_path`."""
+    if not os.path.isfile(out_path):
+        return True
+    return os.path.getmtime(in_path) > os.path.getmtime(out_path)
+
+
+def convert_day(in_path, out_path, fields):
+    """Convert one daily file. Runs in a worker process."""
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    return convert_file(in_path, out_path, fields)
+
+
+def main():
+    args = parse_args()
+    fields = args.fields.split(",")
+
+    daily_files = find_daily_files(args.input_dir, args.include_today)
+
+    # If there are several files for one day (e.g. .json and .json.gz)
+    # they would all map to the same partition, so only the last one
+    # found is used and the others are reported.
+    to_convert = {}
+    for date, hour, path in daily_files:
+        out_path = partition_path(args.out_dir, date, hour)
+        if out_path in to_convert:
+            print(f"[!] More than one file for {os.path.basename(out_path)} on {date}. Skipping {to_convert[out_path]}")
+        to_convert[out_path] = path
+
+    to_convert = {
+        out_path: in_path for out_path, in_path in to_convert.items()
+        if needs_converting(in_path, out_path)
+        }
+    print(f"Found {len(daily_files)} finished daily/hourly files. {len(to_convert)} need converting.")
+
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = {
+            executor.submit(convert_day, in_path, out_path, fields): in_path
+            for out_path, in_path in to_convert.items()
+            }
+        for future in as_completed(futures):
+            in_path = futures[future]
+            try:
+                num_rows = future.result()
+                print(f"Converted {in_path} ({num_rows} tweets)")
+            except Exception as e:
+                print(f"[!] Problem converting {in_path}: {e}")
+
+
+
+# Exectue the program
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+if __name__ == "__main__":
+    main()
+    print("Conversion complete.")
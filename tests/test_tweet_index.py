@@ -0,0 +1,73 @@
+"""
+PURPOSE
+    - Regression checks for tweet_index.py (and the writer that uses it).
+
+Example Usage:
+    python -m pytest tests
+
+Author: Matthew R. DeVerna
+Date: 10/18/2026
+"""
+
+import os
+import sys
+import json
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "twitter-streaming", "v1-framework"))
+
+np = pytest.importorskip("numpy")
+
+from stream_writer import DailyWriter
+from tweet_index import tweet_id, load_index, find_tweets
+
+
+TWEET_ID = 1350000000000000123
+
+
+def tweet_line(matched_terms=None):
+    tweet = {
+        "created_at": "Fri Jan 15 12:00:00 +0000 2021",
+        "id": TWEET_ID,
+        "id_str": str(TWEET_ID),
+        "text": "Got my covid vaccine",
+        "user": {"id": 42, "id_str": "42"},
+    }
+    if matched_terms is not None:
+        tweet = dict({"matched_terms": matched_terms}, **tweet)
+    return json.dumps(tweet) + "\n"
+
+
+def delete_line():
+    return json.dumps({
+        "delete": {
+            "status": {"id": TWEET_ID, "id_str": str(TWEET_ID), "user_id": 42, "user_id_str": "42"},
+            "timestamp_ms": "1610712000000",
+        }
+    }) + "\n"
+
+
+def test_tweet_id_skips_notices():
+    assert tweet_id(tweet_line()) == TWEET_ID
+    assert tweet_id(tweet_line().encode()) == TWEET_ID
+    assert tweet_id(tweet_line(matched_terms=["{covid}"])) == TWEET_ID
+    assert tweet_id(delete_line()) is None
+    assert tweet_id(delete_line().encode()) is None
+    assert tweet_id('{"limit":{"track":5,"timestamp_ms":"1610712000000"}}\n') is None
+
+
+def test_delete_notice_after_restart(tmp_path):
+    # The tweet is written and indexed, then the streamer restarts (on the
+    # same day) and writes the tweet's delete notice to the same file.
+    for line in (tweet_line(), delete_line()):
+        writer = DailyWriter(data_dir=str(tmp_path), index=True)
+        writer.write(line)
+        writer.close()
+
+    data_file, = [str(path) for path in tmp_path.glob("streaming_data--*.json")]
+    positions = find_tweets(load_index(data_file), np.array([TWEET_ID], dtype=np.uint64))
+    offset, length = positions[TWEET_ID]
+    with open(data_file, "rb") as f:
+        f.seek(offset)
+        assert f.read(length) == tweet_line().encode()
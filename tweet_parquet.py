@@ -0,0 +1,318 @@
+"""
+PURPOSE
+    - A module for turning newline-delimited tweet JSON into columnar
+    Parquet files, keeping only the fields we actually use.
+
+METHODS
+    - project_tweet:
+        - Pull the requested fields out of one tweet object.
+    - convert_file:
+        - Convert one JSONL file to Parquet.
+
+CLASSES
+    - TweetParquetWriter:
+        - Collects projected tweets and writes them to a Parquet file
+        one row group at a time.
+    - LineConverter:
+        - Takes raw (decompressed) bytes in arbitrary pieces, splits them
+        into lines and feeds each tweet to a TweetParquetWriter. This is
+        what lets moe_downloader.py convert files while they download.
+
+FIELDS
+    The named fields below are flattened out of the tweet object (the
+    full text and entities of extended tweets are used when present).
+    Any other field name is treated as a dotted path into the tweet
+    (e.g. "user.followers_count") and stored as a string (nested values
+    are stored as JSON).
+
+    Memory use is fixed by `batch_size` (rows held before a row group is
+    written), no matter how big the input is.
+
+DEPENDENCIES:
+    - pyarrow (https://arrow.apache.org/docs/python/)
+    - zstandard (optional, only to read .zst files, see archive_files.py)
+
+Author: Matthew R. DeVerna
+Date: 10/18/2026
+"""
+
+import os
+import json
+from datetime import datetime as dt
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Local modules
+from archive_files import open_archive_file
+
+
+# Twitter's V1 created_at format, e.g. "Wed Oct 10 20:19:24 +0000 2018"
+TWITTER_TIME_FORMAT = "%a %b %d %H:%M:%S %z %Y"
+
+
+def _extended(tweet):
+    # Extended (>140 character) tweets keep their full content here
+    return tweet.get("extended_tweet") or {}
+
+
+def _text(tweet):
+    return _extended(tweet).get("full_text") or tweet.get("full_text") or tweet.get("text")
+
+
+def _entities(tweet):
+    return _extended(tweet).get("entities") or tweet.get("entities") or {}
+
+
+def _created_at(tweet):
+    created_at = tweet.get("created_at")
+    if created_at is None:
+        return None
+    return dt.strptime(created_at, TWITTER_TIME_FORMAT)
+
+
+def _nested_id(tweet, key):
+    nested = tweet.get(key)
+    return nested.get("id") if nested else None
+
+
+# Field name: (arrow type, function pulling it out of a tweet)
+FIELDS = {
+    "id": (pa.int64(), lambda t: t.get("id")),
+    "created_at": (pa.timestamp("s", tz="UTC"), _created_at),
+    "user_id": (pa.int64(), lambda t: (t.get("user") or {}).get("id")),
+    "user_screen_name": (pa.string(), lambda t: (t.get("user") or {}).get("screen_name")),
+    "text": (pa.string(), _text),
+    "lang": (pa.string(), lambda t: t.get("lang")),
+    "hashtags": (pa.list_(pa.string()), lambda t: [h["text"] for h in _entities(t).get("hashtags", [])]),
+    "urls": (pa.list_(pa.string()), lambda t: [u.get("expanded_url") for u in _entities(t).get("urls", [])]),
+    "user_mentions": (pa.list_(pa.int64()), lambda t: [m["id"] for m in _entities(t).get("user_mentions", [])]),
+    "in_reply_to_status_id": (pa.int64(), lambda t: t.get("in_reply_to_status_id")),
+    "retweeted_status_id": (pa.int64(), lambda t: _nested_id(t, "retweeted_status")),
+    "quoted_status_id": (pa.int64(), lambda t: _nested_id(t, "quoted_status")),
+    "retweet_count": (pa.int64(), lambda t: t.get("retweet_count")),
+    "favorite_count": (pa.int64(), lambda t: t.get("favorite_count")),
+}
+
+# What we use in nearly every analysis
+DEFAULT_FIELDS = ["id", "created_at", "user_id", "text", "hashtags"]
+
+
+def _dotted_path(path):
+    keys = path.split(".")
+
+    def extract(tweet):
+        value = tweet
+        for key in keys:
+            if not isinstance(value, dict):
+                return None
+            value = value.get(key)
+        if value is None or isinstance(value, str):
+            return value
+        return json.dumps(value)
+
+    return extract
+
+
+def _field_spec(field):
+    if field in FIELDS:
+        return FIELDS[field]
+    return pa.string(), _dotted_path(field)
+
+
+def make_schema(fields=DEFAULT_FIELDS):
+    """
+    Return the Arrow schema for `fields`.
+    """
+    return pa.schema([(field, _field_spec(field)[0]) for field in fields])
+
+
+def project_tweet(tweet, fields=DEFAULT_FIELDS):
+    """
+    Return a list with the value of each of `fields` for `tweet`.
+    """
+    return [_field_spec(field)[1](tweet) for field in fields]
+
+
+class TweetParquetWriter(object):
+    """
+    Write tweets to `path` as Parquet, keeping only `fields`. The file is
+    written as "<path>.part" and only renamed to `path` when closed.
+
+    Required Parameters:
+    - path (str): Output Parquet file.
+
+    Optional Parameters:
+    - fields (list): Fields to keep (see this module's docstring).
+        - default = DEFAULT_FIELDS
+    - batch_size (int): Rows held in memory before a row group is written.
+        - default = 50000
+    - compression (str): Parquet compression codec.
+        - default = "zstd"
+
+    Example Usage:
+    with TweetParquetWriter("tweets.parquet") as writer:
+        for tweet in tweets:
+            writer.add(tweet)
+    """
+
+    def __init__(self, path, fields=DEFAULT_FIELDS, batch_size=50000, compression="zstd"):
+        self.path = path
+        self.fields = list(fields)
+        self.batch_size = batch_size
+        self.schema = make_schema(self.fields)
+        self.num_rows = 0
+
+        self._extractors = [_field_spec(field)[1] for field in self.fields]
+        self._columns = [[] for _ in self.fields]
+        self._writer = pq.ParquetWriter(f"{path}.part", self.schema, compression=compression)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def add(self, tweet):
+        """
+        Add one tweet object (a dictionary).
+        """
+        for column, extract in zip(self._columns, self._extractors):
+            column.append(extract(tweet))
+        if len(self._columns[0]) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Write everything held in memory as one row group.
+        """
+        if not self._columns[0]:
+            return
+        table = pa.Table.from_arrays(
+            [pa.array(column, type=field_type) for column, field_type in zip(self._columns, self.schema.types)],
+            schema=self.schema
+            )
+        self._writer.write_table(table)
+        self.num_rows += table.num_rows
+        self._columns = [[] for _ in self.fields]
+
+    def close(self):
+        if self._writer is not None:
+            self.flush()
+            self._writer.close()
+            self._writer = None
+            os.replace(f"{self.path}.part", self.path)
+
+    def discard(self):
+        """
+        Close the writer and delete everything written so far.
+        """
+        if self._writer is not None:
+            try:
+                self._writer.close()
+            finally:
+                self._writer = None
+                if os.path.isfile(f"{self.path}.part"):
+                    os.remove(f"{self.path}.part")
+
+
+class LineConverter(object):
+    """
+    Convert newline-delimited tweet JSON, handed over in arbitrary pieces
+    of bytes, to Parquet.
+
+    Lines that are just a number (e.g. Moe's Tavern "tweet-id" output)
+    are stored as a tweet with only an "id". Lines that aren't valid JSON
+    are counted in `num_bad_lines` and skipped. JSON objects without an
+    "id" (e.g. the stream's {"limit": ...} notices) are counted in
+    `num_skipped` and skipped.
+
+    Required Parameters:
+    - path (str): Output Parquet file.
+
+    Optional Parameters:
+    - fields, batch_size: see TweetParquetWriter.
+
+    Example Usage:
+    converter = LineConverter("part-m-00000.parquet")
+    download_file(url, "part-m-00000.gz", on_data=converter.feed, on_restart=converter.restart)
+    converter.close()
+    """
+
+    def __init__(self, path, fields=DEFAULT_FIELDS, batch_size=50000):
+        self.path = path
+        self.fields = fields
+        self.batch_size = batch_size
+        self._writer = None
+        self.restart()
+
+    def restart(self):
+        """
+        Throw away everything converted so far and start over.
+        """
+        if self._writer is not None:
+            self._writer.discard()
+        self._writer = TweetParquetWriter(self.path, self.fields, self.batch_size)
+        self._remainder = b""
+        self.num_bad_lines = 0
+        self.num_skipped = 0
+
+    def feed(self, data):
+        """
+        Convert every complete line in `data` (plus whatever was left
+        over from the last call).
+        """
+        lines = (self._remainder + data).split(b"\n")
+        self._remainder = lines.pop()
+        for line in lines:
+            self._add_line(line)
+
+    def _add_line(self, line):
+        line = line.strip()
+        if not line:
+            return
+        if line.isdigit():
+            self._writer.add({"id": int(line)})
+            return
+        try:
+            tweet = json.loads(line)
+        except ValueError:
+            self.num_bad_lines += 1
+            return
+        if not isinstance(tweet, dict) or "id" not in tweet:
+            self.num_skipped += 1
+            return
+        self._writer.add(tweet)
+
+    def close(self):
+        """
+        Convert anything left over and finish the Parquet file.
+        """
+        self._add_line(self._remainder)
+        self._remainder = b""
+        self._writer.close()
+        return self._writer.num_rows
+
+    def discard(self):
+        """
+        Give up: delete the unfinished Parquet file (e.g. after an error).
+        """
+        self._writer.discard()
+
+
+def convert_file(in_path, out_path, fields=DEFAULT_FIELDS, batch_size=50000, chunk_size=1048576):
+    """
+    Convert one JSONL file (plain, gzipped or zstd compressed, see
+    archive_files.py) to Parquet.
+    Returns the number of rows written.
+    """
+    converter = LineConverter(out_path, fields, batch_size)
+    try:
+        with open_archive_file(in_path) as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                converter.feed(chunk)
+        return converter.close()
+    except BaseException:
+        # Don't leave a half written "<out_path>.part" behind
+        converter.discard()
+        raise
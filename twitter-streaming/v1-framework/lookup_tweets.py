@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+
+"""
+PURPOSE:
+    - To fetch single tweets (or a batch of them) by id from the files
+    written by twitter-streamer-V1.py, without scanning the files.
+
+INPUT:
+    - Tweet ids, on the command line and/or in a file (one per line).
+    - A data folder written with `--index` (see tweet_index.py), so each
+    data file has a <file>.idx (and/or a <file>.idx.log while it is
+    still being written).
+
+OUTPUT:
+    - The raw JSON line of every tweet found, in the order the ids were
+    given, written to stdout or -o/--output. Ids that weren't found are
+    reported at the end.
+
+Each id is first looked for in the file covering the time the tweet was
+created (read from the id itself) and the file after it (in case the
+tweet was written a little late). Ids not found there are looked for in
+every indexed file. Each lookup is a binary search of a memory-mapped
+index plus one `pread` of the data file.
+
+Example Usage:
+    python lookup_tweets.py 1346915442316361728 1346915442341528576
+    python lookup_tweets.py -d /full/path/2/data -i ids.txt -o tweets.json
+
+DEPENDENCIES:
+    - numpy
+
+Author: Matthew R. DeVerna
+Date: 10/18/2026
+"""
+
+# Import packages
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+import os
+import re
+import sys
+import glob
+import argparse
+from datetime import datetime as dt
+
+import numpy as np
+
+# Local modules
+from tweet_index import INDEX_SUFFIX, LOG_SUFFIX, load_index, find_tweets, snowflake_time
+
+
+
+# Set CLI Arguments.
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+parser = argparse.ArgumentParser(
+  description="Fetch tweets by id from indexed streaming data files."
+  )
+parser.add_argument(
+  "ids",
+  nargs="*",
+  help="Tweet ids to fetch."
+  )
+parser.add_argument(
+  "-i", "--ids-file",
+  metavar='Ids File',
+  default=None,
+  help="File with more tweet ids to fetch, one per line."
+  )
+parser.add_argument(
+  "-d", "--data-dir",
+  metavar='Data Dir',
+  default="data",
+  help="Folder holding the indexed data files. (default = data)"
+  )
+parser.add_argument(
+  "-o", "--output",
+  metavar='Output',
+  default=None,
+  help="File the tweets are written to. (default = stdout)"
+  )
+parser.add_argument(
+  "--prefix",
+  metavar='Prefix',
+  default="streaming_data",
+  help="Start of the data file names. (default = streaming_data)"
+  )
+
+
+
+# Build Functions.
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def find_indexed_files(data_dir, prefix="streaming_data"):
+    """
+    Return a list of (start, end, data_file) tuples, oldest first, for
+    every indexed daily (<prefix>--<date>.json) or hourly
+    (<prefix>--<date>_<hour>.json) file. `start` and `end` are the unix
+    times the file covers.
+    """
+    pattern = re.compile(re.escape(prefix) + r"--(\d{2}-\d{2}-\d{4})(_\d{2})?\.json$")
+    data_files = set()
+    for suffix in (INDEX_SUFFIX, LOG_SUFFIX):
+        for index_file in glob.glob(os.path.join(data_dir, f"{prefix}--*{suffix}")):
+            data_files.add(index_file[:-len(suffix)])
+
+    indexed = []
+    for data_file in data_files:
+        match = pattern.search(os.path.basename(data_file))
+        if (match is None) or not os.path.isfile(data_file):
+            continue
+        date, hour = match.groups()
+        if hour:
+            start = dt.strptime(date + hour, "%m-%d-%Y_%H").timestamp()
+            end = start + 3600
+        else:
+            start = dt.strptime(date, "%m-%d-%Y").timestamp()
+            end = start + 86400
+        indexed.append((start, end, data_file))
+    return sorted(indexed)
+
+
+def read_tweets(data_file, positions):
+    """
+    Return a dictionary of {tweet id: raw line} for the tweets at
+    `positions` ({tweet id: (offset, length)}) in `data_file`.
+    """
+    tweets = {}
+    fd = os.open(data_file, os.O_RDONLY)
+    try:
+        for tid, (offset, length) in positions.items():
+            tweets[tid] = os.pread(fd, length, offset)
+    finally:
+        os.close(fd)
+    return tweets
+
+
+def lookup(tweet_ids, indexed_files):
+    """
+    Fetch `tweet_ids` (a list of ints) from `indexed_files` (see
+    find_indexed_files).
+
+    Returns:
+    - A dictionary of {tweet id: raw line} for the tweets found.
+    """
+    ids = np.unique(np.array(tweet_ids, dtype=np.uint64))
+    created = np.array([snowflake_time(int(tid)) for tid in ids])
+    tweets = {}
+
+    def search(data_file, wanted):
+        if len(wanted):
+            positions = find_tweets(load_index(data_file), wanted)
+            if positions:
+                tweets.update(read_tweets(data_file, positions))
+
+    # First the file the tweet was created in and the one after it
+    for start, end, data_file in indexed_files:
+        near = (created >= start - (end - start)) & (created < end)
+        search(data_file, ids[near])
+
+    # Then everywhere else
+    missing = np.array([tid for tid in ids if int(tid) not in tweets], dtype=np.uint64)
+    if len(missing):
+        for start, end, data_file in indexed_files:
+            search(data_file, missing)
+            missing = np.array([tid for tid in missing if int(tid) not in tweets], dtype=np.uint64)
+            if not len(missing):
+                break
+    return tweets
+
+
+
+# Execute main program.
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+
+    tweet_ids = [int(tid) for tid in args.ids]
+    if args.ids_file:
+        with open(args.ids_file, "r") as f:
+            tweet_ids += [int(line.strip()) for line in f if line.strip().isdigit()]
+    if not tweet_ids:
+        parser.error("Give at least one tweet id (or -i/--ids-file).")
+
+    indexed_files = find_indexed_files(args.data_dir, args.prefix)
+    tweets = lookup(tweet_ids, indexed_files)
+
+    out_file = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        for tid in tweet_ids:
+            if tid in tweets:
+                line = tweets[tid]
+                out_file.write(line if line.endswith(b"\n") else line + b"\n")
+    finally:
+        if args.output:
+            out_file.close()
+
+    unique_ids = set(tweet_ids)
+    num_found = len(unique_ids & set(tweets))
+    print(f"Found {num_found} of {len(unique_ids)} tweets in {len(indexed_files)} indexed files.", file=sys.stderr)
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+
+"""
+PURPOSE:
+    - To re-filter tweets we have already collected with a new
+    list of terms, using the same matching rules as Twitter's
+    `track` parameter (see term_matcher.py).
+
+INPUT:
+    - A keywords file (one term per line, same format as for
+    twitter-streamer-V1.py).
+    - Any number of JSONL tweet files (.json, .json.gz or .json.zst),
+    e.g. the daily files in data/.
+
+OUTPUT:
+    - One JSONL file with every tweet that matched at least one term,
+    each with a "matched_terms" field listing the terms it matched
+    (any "matched_terms" field already in the tweet is replaced).
+    The output is gzipped if its name ends in .gz (zstd compressed
+    if it ends in .zst).
+
+Example Usage:
+    python refilter_archive.py -f new_keywords.txt -o refiltered.json.gz data/streaming_data--*.json*
+
+DEPENDENCIES:
+    - zstandard (optional, only for .zst files, see ../../archive_files.py)
+
+Author: Matthew R. DeVerna
+Date: 10/18/2026
+"""
+
+# Import packages
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+import os
+import sys
+import json
+import argparse
+
+# Local modules
+from term_matcher import TermMatcher, split_terms
+
+# archive_files.py lives in the root of this repository
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir))
+from archive_files import open_archive_file
+
+
+
+# Set CLI Arguments.
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+parser = argparse.ArgumentParser(
+  description="Re-filter collected tweets with a new keywords file."
+  )
+parser.add_argument(
+  "files",
+  nargs="+",
+  help="JSONL tweet files to search (.json, .json.gz or .json.zst)."
+  )
+parser.add_argument(
+  "-f", "--file",
+  metavar='File',
+  required=True,
+  help="Full path to the file containing the new keywords. (One object (i.e. hashtag) per line)"
+  )
+parser.add_argument(
+  "-o", "--output",
+  metavar='Output',
+  default="refiltered_tweets.json",
+  help="File the matching tweets are written to. Gzipped if it ends in .gz, zstd compressed if it ends in .zst. (default = refiltered_tweets.json)"
+  )
+
+
+
+# Build Functions.
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def refilter(files, matcher, out_file):
+    """
+    Write every tweet in `files` that `matcher` finds a term in to
+    `out_file`, tagged with the terms it matched.
+
+    Returns:
+    - num_tweets (int): Tweets read
+    - num_matched (int): Tweets written
+    """
+    num_tweets = num_matched = 0
+    for file in files:
+        with open_archive_file(file, "rt") as f:
+            for line in f:
+                try:
+                    tweet = json.loads(line)
+                except ValueError:
+                    continue
+                if not isinstance(tweet, dict) or "id" not in tweet:
+                    continue
+                num_tweets += 1
+
+                matched = matcher.match_tweet(tweet)
+                if not matched:
+                    continue
+                tweet[TermMatcher.TAG_FIELD] = matched
+                out_file.write(json.dumps(tweet) + "\n")
+                num_matched += 1
+        print(f"Searched {file} ({num_matched}/{num_tweets} tweets matched so far)")
+    return num_tweets, num_matched
+
+
+
+# Execute main program.
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+
+    with open(args.file, "r") as f:
+        matcher = TermMatcher(split_terms(f))
+    print(f"Loaded {len(matcher.terms)} terms from {args.file}")
+
+    with open_archive_file(args.output, "wt") as out_file:
+        num_tweets, num_matched = refilter(args.files, matcher, out_file)
+
+    print(f"Done. {num_matched} of {num_tweets} tweets matched. Saved to {args.output}")
@@ -0,0 +1,413 @@
+"""
+PURPOSE
+    - A module for counting tweets per filter term and per hashtag over
+    rolling windows (the last minute, hour and day) while the stream
+    runs, so surges show up right away instead of after a rescan of the
+    data files.
+
+CLASSES
+    - RollingCounts:
+        - Counts per key over the last `seconds`, kept in a fixed-size
+        ring buffer of time buckets for each key.
+    - SpaceSaving:
+        - Approximate top-k counter (the "Space-Saving" algorithm) used
+        to decide which hashtags are worth counting.
+    - StreamCounters:
+        - Ties it together for a stream: total, per-term and per-hashtag
+        counts for every window, periodic snapshots to a JSON file and
+        simple surge detection. See docstring for parameters and example
+        usage.
+
+NOTES
+    - Recording a tweet is a handful of dictionary/list updates. Old
+    buckets are only cleared when the clock moves into a new bucket,
+    once per bucket rather than once per tweet.
+    - There is no limit on the number of hashtags, so only the
+    `capacity` most frequent ones (as estimated by SpaceSaving) get
+    ring buffers. Any hashtag used in more than 1/`capacity` of the
+    (recent) tweets is guaranteed to be counted. The SpaceSaving counts
+    are halved every hour, so hashtags that were popular yesterday
+    don't crowd out the ones rising now.
+    - Snapshots are written by a background thread (every `interval`
+    seconds) to a temporary file first, so readers never see half of
+    one.
+
+Author: Matthew R. DeVerna
+Date: 10/18/2026
+"""
+
+import os
+import json
+import time
+import heapq
+import logging
+import threading
+from datetime import datetime as dt
+
+# Local modules
+from term_matcher import TermMatcher
+
+
+# Window name, length in seconds, number of buckets
+WINDOWS = (
+    ("1m", 60, 12),
+    ("1h", 3600, 60),
+    ("1d", 86400, 24),
+)
+
+
+class RollingCounts(object):
+    """
+    Count how often each key was seen in the last `seconds`.
+
+    Each key gets a ring buffer of `num_buckets` counts, one per
+    `seconds / num_buckets` slice of time, plus a running total. Buckets
+    are aligned to the clock (e.g. whole minutes for a one hour window
+    with 60 buckets) and keys whose count drops to zero are forgotten.
+
+    Required Parameters:
+    - seconds (float): Length of the window.
+    - num_buckets (int): Number of buckets the window is split into.
+
+    Example Usage:
+    counts = RollingCounts(3600, 60)
+    counts.add("covid", time.time())
+    counts.count("covid")
+    """
+
+    def __init__(self, seconds, num_buckets):
+        self.seconds = seconds
+        self.num_buckets = num_buckets
+        self.bucket_seconds = seconds / num_buckets
+
+        self._rings = {}
+        self._totals = {}
+        self._bucket = None     # Bucket number (since the epoch) of the newest bucket
+
+    def advance(self, now):
+        """
+        Move the window up to `now`, clearing the buckets that fell out.
+        """
+        bucket = int(now // self.bucket_seconds)
+        if self._bucket is None:
+            self._bucket = bucket
+            return
+        if bucket <= self._bucket:
+            return
+        steps = min(bucket - self._bucket, self.num_buckets)
+        positions = [(self._bucket + step) % self.num_buckets for step in range(1, steps + 1)]
+        for key in list(self._rings):
+            ring = self._rings[key]
+            for pos in positions:
+                self._totals[key] -= ring[pos]
+                ring[pos] = 0
+            if not self._totals[key]:
+                del self._rings[key]
+                del self._totals[key]
+        self._bucket = bucket
+
+    def add(self, key, now, amount=1):
+        """
+        Count `key` (`amount` times) at time `now`.
+        """
+        self.advance(now)
+        ring = self._rings.get(key)
+        if ring is None:
+            ring = self._rings[key] = [0] * self.num_buckets
+            self._totals[key] = 0
+        ring[self._bucket % self.num_buckets] += amount
+        self._totals[key] += amount
+
+    def discard(self, key):
+        """
+        Stop counting `key`.
+        """
+        self._rings.pop(key, None)
+        self._totals.pop(key, None)
+
+    def count(self, key):
+        """
+        Return the count of `key` in the window.
+        """
+        return self._totals.get(key, 0)
+
+    def counts(self):
+        """
+        Return a dictionary with the count of every key in the window.
+        """
+        return dict(self._totals)
+
+
+class SpaceSaving(object):
+    """
+    Keep approximate counts for (at most) the `capacity` most frequent
+    keys of a stream (Metwally, Agrawal & El Abbadi, 2005).
+
+    When a new key arrives and the sketch is full, the key with the
+    smallest count is evicted and the new key takes over its count
+    (recorded as the new key's possible overestimate, `errors[key]`).
+
+    Optional Parameters:
+    - capacity (int): Number of keys kept.
+        - default = 1000
+
+    Example Usage:
+    sketch = SpaceSaving(capacity=1000)
+    evicted = sketch.add("covid")   # The key that made room, or None
+    sketch.top(10)
+    """
+
+    def __init__(self, capacity=1000):
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+
+        # One (count, key) entry per key. Counts in the heap may be lower
+        # than the real count; they are fixed when they reach the top.
+        self._heap = []
+
+    def __contains__(self, key):
+        return key in self.counts
+
+    def add(self, key, amount=1):
+        """
+        Count `key`. Returns the key that was evicted to make room for
+        it, or None.
+        """
+        if key in self.counts:
+            self.counts[key] += amount
+            return None
+
+        evicted = None
+        error = 0
+        if len(self.counts) >= self.capacity:
+            evicted, error = self._pop_min()
+        self.counts[key] = error + amount
+        self.errors[key] = error
+        heapq.heappush(self._heap, (self.counts[key], key))
+        return evicted
+
+    def _pop_min(self):
+        """
+        Remove and return the key with the smallest count (and its count).
+        """
+        while True:
+            count, key = heapq.heappop(self._heap)
+            if self.counts[key] != count:
+                heapq.heappush(self._heap, (self.counts[key], key))
+                continue
+            del self.counts[key]
+            del self.errors[key]
+            return key, count
+
+    def decay(self, factor=0.5):
+        """
+        Multiply every count by `factor` so recent keys count for more.
+        """
+        self.counts = {key: int(count * factor) for key, count in self.counts.items()}
+        self.errors = {key: int(error * factor) for key, error in self.errors.items()}
+        self._heap = [(count, key) for key, count in self.counts.items()]
+        heapq.heapify(self._heap)
+
+    def top(self, num):
+        """
+        Return the `num` keys with the highest counts as (key, count) tuples.
+        """
+        return heapq.nlargest(num, self.counts.items(), key=lambda item: item[1])
+
+
+class StreamCounters(object):
+    """
+    Count tweets in total, per filter term and per hashtag over the
+    last minute, hour and day (see WINDOWS).
+
+    Optional Parameters:
+    - terms (list): The filter terms. Tweets already tagged with
+        "matched_terms", or handed over by a term_matcher.TaggingWriter,
+        are counted under those terms, otherwise the terms are matched
+        here.
+        - default = None (no per-term counts)
+    - snapshot_file (str): JSON file rewritten every `interval` seconds
+        with the counts, the top hashtags and any surges. None turns it
+        off.
+        - default = None
+    - interval (float): Seconds between snapshots.
+        - default = 60.0
+    - capacity (int): Number of hashtags tracked (see SpaceSaving).
+        - default = 1000
+    - top (int): Number of hashtags listed in each snapshot window.
+        - default = 50
+
+    Example Usage:
+    counters = StreamCounters(terms, snapshot_file="stream_counts.json")
+    writer = RecordingWriter(DailyWriter(), counters)   # See stream_metrics.py
+    for line in stream:
+        writer.write(line)
+    counters.snapshot()["windows"]["1m"]["tweets"]
+    counters.close()
+    """
+
+    # A term/hashtag is surging when its count over the last minute is at
+    # least SURGE_FACTOR times its average per minute over the last hour
+    # (and at least SURGE_MIN).
+    SURGE_FACTOR = 3.0
+    SURGE_MIN = 20
+
+    # Seconds between halving the hashtag sketch's counts
+    DECAY_INTERVAL = 3600
+
+    def __init__(self, terms=None, snapshot_file=None, interval=60.0, capacity=1000, top=50):
+        self.terms = list(terms) if terms else []
+        self.matcher = TermMatcher(self.terms) if self.terms else None
+        self.snapshot_file = snapshot_file
+        self.interval = interval
+        self.top = top
+
+        self.started_at = time.time()
+        self.tweets = {name: RollingCounts(seconds, buckets) for name, seconds, buckets in WINDOWS}
+        self.term_counts = {name: RollingCounts(seconds, buckets) for name, seconds, buckets in WINDOWS}
+        self.hashtag_counts = {name: RollingCounts(seconds, buckets) for name, seconds, buckets in WINDOWS}
+        self.sketch = SpaceSaving(capacity)
+        self._next_decay = self.started_at + self.DECAY_INTERVAL
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stream-counters", daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def record_tweet(self, data):
+        """
+        Count one raw JSON line (str or bytes) being written. Lines that
+        aren't tweets (e.g. limit notices) are ignored.
+        """
+        try:
+            tweet = json.loads(data)
+        except ValueError:
+            return
+        if not isinstance(tweet, dict) or "id" not in tweet:
+            return
+        self.add_tweet(tweet)
+
+    def add_tweet(self, tweet, terms=None):
+        """
+        Count one tweet object. `terms` are the filter terms it matched
+        (e.g. from TermMatcher.tag_tweet). If None, they are read from
+        the tweet's "matched_terms" or matched here.
+        """
+        if terms is None:
+            terms = tweet.get(TermMatcher.TAG_FIELD)
+        if terms is None:
+            terms = self.matcher.match_tweet(tweet) if self.matcher is not None else []
+        entities = (tweet.get("extended_tweet") or {}).get("entities") or tweet.get("entities") or {}
+        hashtags = {hashtag["text"].lower() for hashtag in entities.get("hashtags", [])}
+
+        now = time.time()
+        with self._lock:
+            for name, _, _ in WINDOWS:
+                self.tweets[name].add("tweets", now)
+                term_counts = self.term_counts[name]
+                for term in terms:
+                    term_counts.add(term, now)
+
+            for hashtag in hashtags:
+                evicted = self.sketch.add(hashtag)
+                for name, _, _ in WINDOWS:
+                    if evicted is not None:
+                        self.hashtag_counts[name].discard(evicted)
+                    self.hashtag_counts[name].add(hashtag, now)
+
+    def _surges(self, kind, counts_1m, counts_1h, now):
+        """
+        Return the keys in `counts_1m` counted much more often in the last
+        minute than usual over the last hour.
+        """
+        minutes = min(60, max(1, (now - self.started_at) / 60))
+        surges = []
+        for key, last_minute in counts_1m.items():
+            per_minute = counts_1h.get(key, 0) / minutes
+            if last_minute >= max(self.SURGE_MIN, self.SURGE_FACTOR * per_minute):
+                surges.append({
+                    "type": kind,
+                    "key": key,
+                    "last_minute": last_minute,
+                    "per_minute_last_hour": round(per_minute, 2),
+                })
+        return surges
+
+    def snapshot(self):
+        """
+        Return a dictionary with the counts for every window, the top
+        hashtags and the terms/hashtags that are surging.
+        """
+        now = time.time()
+        with self._lock:
+            windows = {}
+            counts = {}
+            for name, _, _ in WINDOWS:
+                for rolling in (self.tweets[name], self.term_counts[name], self.hashtag_counts[name]):
+                    rolling.advance(now)
+                term_counts = self.term_counts[name].counts()
+                hashtag_counts = self.hashtag_counts[name].counts()
+                counts[name] = (term_counts, hashtag_counts)
+                windows[name] = {
+                    "tweets": self.tweets[name].count("tweets"),
+                    "terms": {term: term_counts.get(term, 0) for term in self.terms},
+                    "hashtags": sorted(hashtag_counts.items(), key=lambda item: -item[1])[:self.top],
+                }
+
+        surges = (
+            self._surges("term", counts["1m"][0], counts["1h"][0], now)
+            + self._surges("hashtag", counts["1m"][1], counts["1h"][1], now)
+            )
+        return {
+            "updated_at": dt.fromtimestamp(now).isoformat(timespec="seconds"),
+            "started_at": dt.fromtimestamp(self.started_at).isoformat(timespec="seconds"),
+            "windows": windows,
+            "surges": sorted(surges, key=lambda surge: -surge["last_minute"]),
+        }
+
+    def write_snapshot(self):
+        """
+        Rewrite the snapshot file (written to a temporary file first so
+        readers never see half of it).
+        """
+        if self.snapshot_file is None:
+            return
+        snapshot = self.snapshot()
+        for surge in snapshot["surges"]:
+            logging.info(
+                f"Surge in {surge['type']} {surge['key']!r}: {surge['last_minute']} "
+                f"in the last minute vs {surge['per_minute_last_hour']}/minute over the last hour"
+                )
+        tmp_file = f"{self.snapshot_file}.tmp"
+        with open(tmp_file, "w") as f:
+            json.dump(snapshot, f, indent=2)
+        os.replace(tmp_file, self.snapshot_file)
+
+    def _run(self):
+        """
+        Background thread: age the hashtag sketch and write snapshots.
+        """
+        while not self._stop.wait(self.interval):
+            try:
+                if time.time() >= self._next_decay:
+                    with self._lock:
+                        self.sketch.decay()
+                    self._next_decay += self.DECAY_INTERVAL
+                self.write_snapshot()
+            except Exception as e:
+                logging.error(f"Problem writing stream counts: {e}")
+
+    def close(self):
+        """
+        Stop the background thread and write the snapshot one last time.
+        """
+        self._stop.set()
+        self._thread.join()
+        self.write_snapshot()
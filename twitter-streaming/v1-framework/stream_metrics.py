@@ -0,0 +1,371 @@
+"""
+PURPOSE
+    - A module for keeping live throughput and lag numbers for a
+    running stream and making them visible from outside the process.
+
+CLASSES
+    - StreamMetrics:
+        - In-process counters (tweets, bytes, (re)connects, errors,
+        lag between a tweet's created_at and when we write it) plus
+        the write queue state if the writer has one. See docstring
+        for parameters and example usage.
+    - RecordingWriter:
+        - Wraps the writer that puts tweets in the files and hands
+        every line to StreamMetrics.record_tweet() right before it is
+        written.
+
+NOTES
+    - The numbers can be read in two ways:
+        1. A JSON status file that is rewritten every `interval`
+        seconds (e.g. `cat stream_status.json`, or check its
+        "updated_at" from a cron job).
+        2. A local HTTP endpoint in the Prometheus text format
+        (http://127.0.0.1:<port>/metrics) for Prometheus/Grafana or
+        just `curl`. The same JSON is served at /status.
+    - record_tweet() is called (through a RecordingWriter) for every
+    line as it is written. With a stream_queue.QueuedWriter that is on
+    the writer thread, so tweets/bytes count what actually reached the
+    files (not what was dropped) and the lag includes the time spent
+    waiting in the queue. record_tweet() only bumps a few counters and
+    pulls created_at out of the raw line with a regular expression.
+    Everything else happens on a background thread.
+
+Author: Matthew R. DeVerna
+Date: 10/18/2026
+"""
+
+import os
+import re
+import json
+import time
+import logging
+import threading
+from datetime import datetime as dt
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# Twitter's V1 created_at format, e.g. "Wed Oct 10 20:19:24 +0000 2018".
+# V2 uses ISO 8601, e.g. "2018-10-10T20:19:24.000Z"
+TWITTER_TIME_FORMAT = "%a %b %d %H:%M:%S %z %Y"
+
+# The first created_at in a line is the tweet's own (V1 puts it first)
+_CREATED_AT = re.compile(r'"created_at":\s*"([^"]+)"')
+_CREATED_AT_BYTES = re.compile(rb'"created_at":\s*"([^"]+)"')
+
+# Metric name: (Prometheus type, help text)
+PROMETHEUS_METRICS = {
+    "tweets_total": ("counter", "Tweets written to the data files."),
+    "lines_total": ("counter", "Lines written to the data files (tweets plus notices such as limit messages)."),
+    "bytes_total": ("counter", "Bytes written to the data files (before compression)."),
+    "connects_total": ("counter", "Connections made to the streaming endpoint."),
+    "reconnects_total": ("counter", "Connections made after the first one."),
+    "errors_total": ("counter", "Errors returned by the streaming endpoint."),
+    "tweets_per_second": ("gauge", "Tweets per second over the last interval."),
+    "bytes_per_second": ("gauge", "Bytes per second over the last interval."),
+    "lag_seconds": ("gauge", "Seconds between the created_at of the last tweet written and when it was handed to the file writer."),
+    "lag_seconds_max": ("gauge", "Largest lag seen over the last interval."),
+    "seconds_since_last_tweet": ("gauge", "Seconds since the last tweet was written."),
+    "uptime_seconds": ("gauge", "Seconds since the stream started."),
+    "queue_depth": ("gauge", "Tweets waiting in the write queue."),
+    "queue_max_depth": ("gauge", "Largest write queue depth seen."),
+    "queue_maxsize": ("gauge", "Size of the write queue."),
+    "queue_dropped": ("counter", "Tweets dropped because the write queue was full."),
+    "queue_spilled": ("counter", "Tweets spilled to the overflow file because the write queue was full."),
+    "queue_failed": ("counter", "Tweets the write queue failed to write (e.g. disk full)."),
+}
+
+
+def parse_created_at(created_at):
+    """
+    Return the unix time of a V1 or V2 `created_at` string.
+    """
+    if created_at[:1].isdigit():
+        return dt.fromisoformat(created_at.replace("Z", "+00:00")).timestamp()
+    return dt.strptime(created_at, TWITTER_TIME_FORMAT).timestamp()
+
+
+class StreamMetrics(object):
+    """
+    Keep live counters for a stream and publish them.
+
+    Optional Parameters:
+    - writer: The writer tweets go to. If it has a `stats()` method
+        (e.g. stream_queue.QueuedWriter) its numbers are included.
+        - default = None
+    - status_file (str): JSON file rewritten every `interval` seconds.
+        None turns it off.
+        - default = None
+    - port (int): Serve the metrics on http://<host>:<port>/metrics
+        (Prometheus text format) and /status (JSON). None turns it off.
+        - default = None
+    - host (str): Address the HTTP server listens on. Keep this local
+        unless you mean to expose the numbers.
+        - default = "127.0.0.1"
+    - interval (float): Seconds between updates of the rates and the
+        status file.
+        - default = 10.0
+    - prefix (str): Start of every Prometheus metric name.
+        - default = "stream"
+
+    Example Usage:
+    metrics = StreamMetrics(status_file="stream_status.json", port=9108)
+    writer = QueuedWriter(RecordingWriter(DailyWriter(), metrics))
+    metrics.writer = writer   # To include the queue's stats
+    metrics.record_connect()
+    for line in stream:
+        writer.write(line)
+    writer.close()
+    metrics.close()
+    """
+
+    def __init__(
+        self,
+        writer=None,
+        status_file=None,
+        port=None,
+        host="127.0.0.1",
+        interval=10.0,
+        prefix="stream"
+        ):
+        self.writer = writer
+        self.status_file = status_file
+        self.interval = interval
+        self.prefix = prefix
+
+        self.started_at = time.time()
+        self.tweets = 0
+        self.lines = 0
+        self.bytes = 0
+        self.connects = 0
+        self.errors = 0
+        self.lag = None
+        self.last_tweet_at = None
+
+        # Set by the background thread every `interval` seconds
+        self.tweets_per_second = 0.0
+        self.bytes_per_second = 0.0
+        self.lag_max = None
+        self._interval_lag_max = None
+        self._last_sample = (self.started_at, 0, 0)
+
+        # Listeners on several connections may record at once
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stream-metrics", daemon=True)
+        self._thread.start()
+
+        self._server = None
+        if port is not None:
+            self._server = ThreadingHTTPServer((host, port), self._make_handler())
+            self._server.daemon_threads = True
+            threading.Thread(target=self._server.serve_forever, name="stream-metrics-http", daemon=True).start()
+            logging.info(f"Serving stream metrics on http://{host}:{port}/metrics")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def record_tweet(self, data):
+        """
+        Count one line (str or bytes) about to be written. Lines with a
+        created_at are counted as tweets and used to update the lag.
+        """
+        pattern = _CREATED_AT_BYTES if isinstance(data, bytes) else _CREATED_AT
+        match = pattern.search(data)
+        with self._lock:
+            now = time.time()
+            self.lines += 1
+            self.bytes += len(data)
+            if match is None:
+                return
+            self.tweets += 1
+            self.last_tweet_at = now
+
+            created_at = match.group(1)
+            try:
+                if isinstance(created_at, bytes):
+                    created_at = created_at.decode()
+                self.lag = now - parse_created_at(created_at)
+            except ValueError:
+                return
+            if (self._interval_lag_max is None) or (self.lag > self._interval_lag_max):
+                self._interval_lag_max = self.lag
+
+    def record_connect(self):
+        """
+        Count a (re)connection to the streaming endpoint.
+        """
+        with self._lock:
+            self.connects += 1
+
+    def record_error(self):
+        """
+        Count an error returned by the streaming endpoint.
+        """
+        with self._lock:
+            self.errors += 1
+
+    def stats(self):
+        """
+        Return a dictionary with every metric.
+        """
+        now = time.time()
+        stats = {
+            "tweets_total": self.tweets,
+            "lines_total": self.lines,
+            "bytes_total": self.bytes,
+            "connects_total": self.connects,
+            "reconnects_total": max(self.connects - 1, 0),
+            "errors_total": self.errors,
+            "tweets_per_second": round(self.tweets_per_second, 3),
+            "bytes_per_second": round(self.bytes_per_second, 3),
+            "lag_seconds": None if self.lag is None else round(self.lag, 3),
+            "lag_seconds_max": None if self.lag_max is None else round(self.lag_max, 3),
+            "seconds_since_last_tweet": None if self.last_tweet_at is None else round(now - self.last_tweet_at, 3),
+            "uptime_seconds": round(now - self.started_at, 3),
+        }
+        writer_stats = getattr(self.writer, "stats", None)
+        if writer_stats is not None:
+            stats.update(writer_stats())
+        return stats
+
+    def status(self):
+        """
+        Return stats() along with when and where they were taken, as
+        written to the status file.
+        """
+        status = {
+            "pid": os.getpid(),
+            "updated_at": dt.now().isoformat(timespec="seconds"),
+            "started_at": dt.fromtimestamp(self.started_at).isoformat(timespec="seconds"),
+        }
+        status.update(self.stats())
+        return status
+
+    def prometheus(self):
+        """
+        Return the metrics in the Prometheus text exposition format.
+        """
+        lines = []
+        for name, value in self.stats().items():
+            if value is None:
+                continue
+            metric_type, help_text = PROMETHEUS_METRICS.get(name, ("gauge", name))
+            full_name = f"{self.prefix}_{name}"
+            lines.append(f"# HELP {full_name} {help_text}")
+            lines.append(f"# TYPE {full_name} {metric_type}")
+            lines.append(f"{full_name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def _update_rates(self):
+        now = time.time()
+        last_time, last_tweets, last_bytes = self._last_sample
+        elapsed = now - last_time
+        if elapsed > 0:
+            self.tweets_per_second = (self.tweets - last_tweets) / elapsed
+            self.bytes_per_second = (self.bytes - last_bytes) / elapsed
+        self._last_sample = (now, self.tweets, self.bytes)
+        with self._lock:
+            self.lag_max, self._interval_lag_max = self._interval_lag_max, None
+
+    def write_status(self):
+        """
+        Rewrite the status file (written to a temporary file first so
+        readers never see half of it).
+        """
+        if self.status_file is None:
+            return
+        tmp_file = f"{self.status_file}.tmp"
+        with open(tmp_file, "w") as f:
+            json.dump(self.status(), f, indent=2)
+        os.replace(tmp_file, self.status_file)
+
+    def _run(self):
+        """
+        Background thread: update the rates and the status file.
+        """
+        while not self._stop.wait(self.interval):
+            try:
+                self._update_rates()
+                self.write_status()
+            except Exception as e:
+                logging.error(f"Problem updating stream metrics: {e}")
+
+    def _make_handler(self):
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.startswith("/metrics"):
+                    body = metrics.prometheus().encode()
+                    content_type = "text/plain; version=0.0.4"
+                elif self.path.startswith("/status"):
+                    body = json.dumps(metrics.status()).encode()
+                    content_type = "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                # Don't print every scrape
+                pass
+
+        return Handler
+
+    def close(self):
+        """
+        Stop the background thread and HTTP server and write the
+        status file one last time.
+        """
+        self._stop.set()
+        self._thread.join()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        self._update_rates()
+        self.write_status()
+
+
+class RecordingWriter(object):
+    """
+    Hand every line to one or more recorders (e.g. a StreamMetrics)
+    right before it is written to `writer`.
+
+    Put this directly around the writer that writes the files (inside
+    any stream_queue.QueuedWriter), so lines are recorded on the thread
+    writing them rather than the thread reading the stream.
+
+    Required Parameters:
+    - writer: The writer that puts lines in the files (e.g.
+        stream_writer.DailyWriter).
+    - recorders: Any objects with a `record_tweet(data)` method.
+
+    Example Usage:
+    writer = QueuedWriter(RecordingWriter(DailyWriter(), metrics))
+    """
+
+    def __init__(self, writer, *recorders):
+        self.writer = writer
+        self.recorders = recorders
+
+    def write(self, data):
+        for recorder in self.recorders:
+            recorder.record_tweet(data)
+        self.writer.write(data)
+
+    def flush_if_due(self):
+        self.writer.flush_if_due()
+
+    def stats(self):
+        writer_stats = getattr(self.writer, "stats", None)
+        return {} if writer_stats is None else writer_stats()
+
+    def close(self):
+        self.writer.close()
@@ -0,0 +1,281 @@
+"""
+PURPOSE
+    - A module for decoupling reading from the stream and writing
+    to disk.
+
+CLASSES
+    - QueuedWriter:
+        - Wraps a writer (e.g. stream_writer.DailyWriter) so that the
+        thread reading from Twitter only puts raw lines into a bounded
+        queue while a dedicated writer thread drains them to disk.
+        See docstring for parameters and example usage.
+
+EXCEPTIONS
+    - WriterError:
+        - Raised by QueuedWriter.write()/close() once the writer thread
+        failed to write, so the streamer stops (and can be restarted)
+        instead of losing tweets quietly.
+
+NOTES
+    - If the disk stalls (NFS /scratch, compaction, etc.) and we keep
+    writing on the reading thread, Twitter disconnects us for falling
+    behind. With QueuedWriter the reading thread only ever blocks if
+    the queue fills up AND the "block" policy is selected.
+
+Author: Matthew R. DeVerna
+Date: 10/18/2026
+"""
+
+import os
+import sys
+import time
+import queue
+import logging
+import threading
+
+
+# Policies for what to do with a line when the queue is full
+POLICIES = ("block", "spill", "drop")
+
+# Put on the queue to tell the writer thread to finish up
+_STOP = object()
+
+
+class WriterError(Exception):
+    """
+    The writer thread of a QueuedWriter failed to write (e.g. the disk
+    is full).
+    """
+    pass
+
+
+class QueuedWriter(object):
+    """
+    Hand lines to a background thread which writes them with `writer`.
+
+    Required Parameters:
+    - writer: Any object with `write(data)`, `flush_if_due()` and `close()`
+        methods (e.g. stream_writer.DailyWriter). It is only ever used
+        from the writer thread.
+
+    Optional Parameters:
+    - maxsize (int): Maximum number of lines held in the queue.
+        - default = 10000
+    - policy (str): What to do with a line when the queue is full.
+        - "block": wait for room in the queue (nothing is lost, but
+        the reading thread stalls along with the disk)
+        - "spill": append the line to `overflow_file` (should be on a
+        local disk). Spilled lines are copied into `writer` once the
+        queue has drained.
+        - "drop": throw the line away and count it
+        - default = "block"
+    - overflow_file (str): File used by the "spill" policy.
+        - default = "stream_overflow.json"
+    - report_interval (float): Seconds between queue depth log messages.
+        - default = 60.0
+
+    NOTE: Lines must end with a newline character when using the "spill"
+    policy so they can be split up again when they are copied back.
+
+    If `writer` raises, the error is logged, the line is counted in
+    `failed` and the writer thread carries on. The next write() (or
+    close()) raises a WriterError.
+
+    Example Usage:
+    writer = QueuedWriter(DailyWriter(data_dir="data"), maxsize=50000, policy="spill")
+    for line in stream:
+        writer.write(line)
+    writer.close()
+    """
+
+    def __init__(
+        self,
+        writer,
+        maxsize=10000,
+        policy="block",
+        overflow_file="stream_overflow.json",
+        report_interval=60.0
+        ):
+        if policy not in POLICIES:
+            raise ValueError(f"`policy` must be one of {POLICIES}")
+
+        self.writer = writer
+        self.maxsize = maxsize
+        self.policy = policy
+        self.overflow_file = overflow_file
+        self.report_interval = report_interval
+
+        self.dropped = 0
+        self.spilled = 0
+        self.failed = 0
+        self.max_depth = 0
+        self.error = None
+        self._error_raised = False
+
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._overflow = None
+        self._overflow_lock = threading.Lock()
+        self._last_report = time.time()
+
+        self._thread = threading.Thread(target=self._run, name="stream-writer", daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def depth(self):
+        """
+        Return the (approximate) number of lines waiting to be written.
+        """
+        return self._queue.qsize()
+
+    def stats(self):
+        """
+        Return a dictionary with the current state of the queue.
+        """
+        return {
+            "queue_depth": self.depth(),
+            "queue_max_depth": self.max_depth,
+            "queue_maxsize": self.maxsize,
+            "queue_dropped": self.dropped,
+            "queue_spilled": self.spilled,
+            "queue_failed": self.failed,
+        }
+
+    def write(self, data):
+        """
+        Queue `data` for writing. Called from the reading thread.
+        Raises a WriterError if the writer thread has failed to write.
+        """
+        self._raise_error()
+        if self.policy == "block":
+            self._queue.put(data)
+            return
+
+        try:
+            self._queue.put_nowait(data)
+        except queue.Full:
+            if self.policy == "drop":
+                self.dropped += 1
+            else:
+                self._spill(data)
+
+    def flush_if_due(self):
+        """
+        Nothing to do. The writer thread flushes `writer` whenever the
+        queue goes quiet, and `writer` must only be touched from there.
+        """
+        pass
+
+    def _spill(self, data):
+        """
+        Append `data` to the overflow file.
+        """
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        with self._overflow_lock:
+            if self._overflow is None:
+                logging.info(f"Write queue full. Spilling to: {self.overflow_file}")
+                self._overflow = open(self.overflow_file, "ab")
+            self._overflow.write(data)
+            self.spilled += 1
+
+    def _replay_overflow(self):
+        """
+        Copy everything spilled so far into `writer`. Called from the
+        writer thread once the queue is empty.
+        """
+        with self._overflow_lock:
+            if self._overflow is None:
+                return
+            self._overflow.close()
+            self._overflow = None
+            replay_file = f"{self.overflow_file}.replay"
+            os.replace(self.overflow_file, replay_file)
+
+        logging.info(f"Copying spilled lines from: {replay_file}")
+        with open(replay_file, "rb") as f:
+            for line in f:
+                self.writer.write(line)
+        os.remove(replay_file)
+
+    def _report(self, now):
+        logging.info(
+            f"Write queue depth: {self.depth()}/{self.maxsize} "
+            f"| max depth: {self.max_depth} "
+            f"| spilled: {self.spilled} "
+            f"| dropped: {self.dropped} "
+            f"| failed: {self.failed}"
+            )
+        self._last_report = now
+
+    def _failed(self, num_lines=1):
+        """
+        Record that `writer` raised. Called from the writer thread inside
+        an `except` block.
+        """
+        self.failed += num_lines
+        if self.error is None:
+            logging.exception("Problem writing tweets. Stopping the stream.")
+            self.error = sys.exc_info()[1]
+
+    def _raise_error(self):
+        if (self.error is not None) and not self._error_raised:
+            self._error_raised = True
+            raise WriterError(f"Writing tweets failed: {self.error!r}") from self.error
+
+    def _run(self):
+        """
+        Writer thread: drain the queue into `writer` until told to stop.
+        """
+        while True:
+            depth = self._queue.qsize()
+            if depth > self.max_depth:
+                self.max_depth = depth
+
+            try:
+                data = self._queue.get(timeout=1)
+            except queue.Empty:
+                # Quiet stream. Catch up on housekeeping.
+                try:
+                    self._replay_overflow()
+                    self.writer.flush_if_due()
+                except Exception:
+                    self._failed(0)
+                data = None
+
+            if data is _STOP:
+                break
+            if data is not None:
+                try:
+                    self.writer.write(data)
+                    # Caught up with the stream, so copy back anything spilled.
+                    if self._overflow is not None and self._queue.empty():
+                        self._replay_overflow()
+                except Exception:
+                    self._failed()
+
+            now = time.time()
+            if now - self._last_report >= self.report_interval:
+                self._report(now)
+
+        try:
+            self._replay_overflow()
+            self.writer.close()
+        except Exception:
+            self._failed(0)
+
+    def close(self):
+        """
+        Write everything still queued (or spilled), then close `writer`.
+        Raises a WriterError if anything failed to be written (unless
+        write() already raised it).
+        """
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+            self._report(time.time())
+        self._raise_error()
@@ -0,0 +1,124 @@
+"""
+PURPOSE
+    - A module for spreading our track terms over several streaming
+    connections (one per set of credentials) and merging what they
+    send back into one stream of tweets.
+
+METHODS
+    - shard_terms:
+        - Split a list of terms into one list per connection.
+
+CLASSES
+    - ShardMerger:
+        - Sits between every connection's Listener and the writer.
+        Drops tweets that more than one connection sent us (a tweet
+        can match terms from several shards) and makes sure only one
+        thread uses the writer at a time. See docstring for details.
+
+NOTES
+    - Twitter allows at most 400 track terms per connection, and each
+    connection is one socket (read by one thread). Sharding lifts both
+    limits.
+    - Duplicates are recognized by the tweet's own (top-level) id_str
+    (see tweet_index.tweet_id). Only the ids of the last `window`
+    tweets are kept, which is plenty since the copies of a tweet
+    arrive at (nearly) the same time on every connection.
+
+Author: Matthew R. DeVerna
+Date: 10/18/2026
+"""
+
+import threading
+from collections import deque
+
+# Local modules
+from tweet_index import tweet_id
+
+
+# Most track terms Twitter accepts on one connection
+MAX_TERMS_PER_CONNECTION = 400
+
+
+def shard_terms(terms, num_shards, max_terms=MAX_TERMS_PER_CONNECTION):
+    """
+    Deal `terms` out (round robin) into `num_shards` lists. Raises a
+    ValueError if some shard would get more than `max_terms` terms.
+    """
+    if num_shards < 1:
+        raise ValueError("`num_shards` must be at least 1")
+    shards = [terms[num::num_shards] for num in range(num_shards)]
+    if len(shards[0]) > max_terms:
+        raise ValueError(
+            f"{len(terms)} terms don't fit on {num_shards} connections "
+            f"({max_terms} terms each). Add more credential sets."
+            )
+    return [shard for shard in shards if shard]
+
+
+class ShardMerger(object):
+    """
+    Merge the tweets from several connections into one `writer`,
+    dropping duplicates.
+
+    Required Parameters:
+    - writer: Any object with `write(data)`, `flush_if_due()` and
+        `close()` methods (e.g. stream_writer.DailyWriter or
+        stream_queue.QueuedWriter).
+
+    Optional Parameters:
+    - window (int): Number of recent tweet ids remembered to spot
+        duplicates.
+        - default = 100000
+
+    Example Usage:
+    merger = ShardMerger(QueuedWriter(DailyWriter()))
+    listeners = [Listener(merger) for _ in shards]   # One per connection
+    ...
+    merger.close()
+    """
+
+    def __init__(self, writer, window=100000):
+        self.writer = writer
+        self.window = window
+        self.duplicates = 0
+
+        self._seen = set()
+        self._order = deque()
+        self._lock = threading.Lock()
+
+    def write(self, data):
+        """
+        Write `data` (one line from a connection) unless we have already
+        written the same tweet. Lines that aren't tweets (e.g. limit or
+        delete notices) are always written.
+        """
+        key = tweet_id(data)
+        with self._lock:
+            if key is not None:
+                if key in self._seen:
+                    self.duplicates += 1
+                    return
+                self._seen.add(key)
+                self._order.append(key)
+                if len(self._order) > self.window:
+                    self._seen.discard(self._order.popleft())
+            self.writer.write(data)
+
+    def flush_if_due(self):
+        with self._lock:
+            self.writer.flush_if_due()
+
+    def stats(self):
+        """
+        Return a dictionary with the number of duplicates dropped (plus
+        the writer's own stats, if it has any).
+        """
+        stats = {"shard_duplicates": self.duplicates}
+        writer_stats = getattr(self.writer, "stats", None)
+        if writer_stats is not None:
+            stats.update(writer_stats())
+        return stats
+
+    def close(self):
+        with self._lock:
+            self.writer.close()
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+
+"""
+PURPOSE:
+    - To keep twitter-streamer-V1.py running, replacing the
+    `while true` loop in persistent_bash_streamer.sh and the
+    `ps -ef | grep` check in cron_stuff/checkprocess.sh.
+
+WHAT IT DOES:
+    - Only one supervisor can run per lock file. The lock is an
+    flock() on the file (which also holds the supervisor's pid), so
+    it is released automatically if the supervisor dies, and cron can
+    safely try to start the supervisor every minute: extra copies just
+    exit.
+    - Restarts the streamer whenever it exits, waiting 1, 2, 4, ...
+    seconds (up to --max-backoff) between quick failures. Once a run
+    lasts --stable-after seconds the wait goes back to the minimum,
+    so a one-off disconnect only costs a second or so.
+    - Passes --heartbeat-file to the streamer, which touches it
+    whenever Twitter sends data or a keep-alive (every ~30 seconds
+    while the stream is quiet). If it isn't touched for
+    --stall-timeout seconds the stream is considered stalled, and
+    the streamer is stopped and restarted, even though its process
+    is still alive. While tweepy backs off after an error (up to 320
+    seconds, plus 5 minutes after a 420) the streamer sets the
+    heartbeat ahead to cover the whole wait, so backoffs Twitter asked
+    for are never cut short.
+    - Optionally runs --alert-cmd (e.g. a `mail` command) after every
+    restart, like persistent_bash_streamer.sh used to.
+
+Example Usage:
+    # Everything after "--" is passed to twitter-streamer-V1.py
+    python stream_supervisor.py -- -f keywords.txt -c gzip
+
+    # Cron line (exits straight away if the supervisor is already running)
+    * * * * * cd /path/2/data && python /path/2/stream_supervisor.py -- -f /path/2/keywords.txt
+
+Author: Matthew R. DeVerna
+Date: 10/18/2026
+"""
+
+# Import packages
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+import os
+import sys
+import time
+import fcntl
+import signal
+import argparse
+import logging
+import subprocess
+
+
+# Default streamer, next to this file
+STREAMER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "twitter-streamer-V1.py")
+
+
+
+# Build Functions.
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+      description="Keep twitter-streamer-V1.py running. Arguments after `--` are passed to the streamer."
+      )
+    parser.add_argument(
+      "--streamer",
+      metavar='Streamer',
+      default=STREAMER,
+      help="Path to the streaming script. (default = twitter-streamer-V1.py next to this file)"
+      )
+    parser.add_argument(
+      "--lock-file",
+      metavar='Lock File',
+      default="stream_supervisor.lock",
+      help="Lock/pid file that makes sure only one supervisor runs. (default = stream_supervisor.lock)"
+      )
+    parser.add_argument(
+      "--heartbeat-file",
+      metavar='Heartbeat File',
+      default="stream.heartbeat",
+      help="File the streamer touches whenever Twitter sends something. (default = stream.heartbeat)"
+      )
+    parser.add_argument(
+      "--stall-timeout",
+      metavar='Stall Timeout',
+      type=float,
+      default=90,
+      help="Restart the streamer if the heartbeat file hasn't been touched for this many seconds. Twitter sends a keep-alive every 30 seconds. (default = 90)"
+      )
+    parser.add_argument(
+      "--min-backoff",
+      metavar='Min Backoff',
+      type=float,
+      default=1,
+      help="Seconds to wait before the first restart. (default = 1)"
+      )
+    parser.add_argument(
+      "--max-backoff",
+      metavar='Max Backoff',
+      type=float,
+      default=300,
+      help="Longest wait between restarts. (default = 300)"
+      )
+    parser.add_argument(
+      "--stable-after",
+      metavar='Stable After',
+      type=float,
+      default=300,
+      help="A run that lasts this many seconds resets the wait to --min-backoff. (default = 300)"
+      )
+    parser.add_argument(
+      "--alert-cmd",
+      metavar='Alert Command',
+      default=None,
+      help="Shell command run after each restart, e.g. 'echo \"$STREAM_RESTART_REASON\" | mail -s \"Stream Update\" me@iu.edu'. The reason for the restart is in $STREAM_RESTART_REASON. (default = none)"
+      )
+    parser.add_argument(
+      "--log-file",
+      metavar='Log File',
+      default="stream_supervisor.log",
+      help="Where the supervisor logs restarts. (default = stream_supervisor.log)"
+      )
+    parser.add_argument(
+      "streamer_args",
+      nargs=argparse.REMAINDER,
+      help="Arguments for the streamer (put them after `--`)."
+      )
+    args = parser.parse_args()
+    if args.streamer_args[:1] == ["--"]:
+        args.streamer_args = args.streamer_args[1:]
+    return args
+
+
+def acquire_lock(lock_file):
+    """
+    Take an exclusive lock on `lock_file` and write our pid to it.
+    Returns the open file (keep it open to hold the lock), or None if
+    another process holds the lock.
+    """
+    f = open(lock_file, "a+")
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        f.close()
+        return None
+    f.seek(0)
+    f.truncate()
+    f.write(f"{os.getpid()}\n")
+    f.flush()
+    return f
+
+
+class StreamSupervisor(object):
+    """
+    Run `command` and restart it whenever it exits or its heartbeat
+    file goes stale.
+
+    Required Parameters:
+    - command (list): The command to run (passed to subprocess.Popen).
+    - heartbeat_file (str): File the command touches while healthy.
+
+    Optional Parameters:
+    - stall_timeout (float): Seconds without a heartbeat before the
+        command is considered stalled.
+        - default = 90
+    - min_backoff, max_backoff (float): Shortest/longest wait between
+        restarts. The wait doubles after every run that ends within
+        `stable_after` seconds.
+        - default = 1, 300
+    - stable_after (float): Seconds a run must last to reset the wait.
+        - default = 300
+    - alert_cmd (str): Shell command run after each restart.
+        - default = None
+    - check_interval (float): Seconds between checks on the command.
+        - default = 1
+    """
+
+    def __init__(
+        self,
+        command,
+        heartbeat_file,
+        stall_timeout=90,
+        min_backoff=1,
+        max_backoff=300,
+        stable_after=300,
+        alert_cmd=None,
+        check_interval=1
+        ):
+        self.command = command
+        self.heartbeat_file = heartbeat_file
+        self.stall_timeout = stall_timeout
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.stable_after = stable_after
+        self.alert_cmd = alert_cmd
+        self.check_interval = check_interval
+
+        self.num_starts = 0
+        self._process = None
+        self._stopping = False
+
+    def stop(self, signum=None, frame=None):
+        """
+        Stop the command and don't restart it (also used as a signal handler).
+        """
+        logging.info(f"Supervisor stopping (signal {signum}).")
+        self._stopping = True
+
+    def _start(self):
+        self.num_starts += 1
+        started_at = time.time()
+        # A heartbeat from before this start doesn't count
+        with open(self.heartbeat_file, "a"):
+            pass
+        os.utime(self.heartbeat_file, (started_at, started_at))
+
+        self._process = subprocess.Popen(self.command)
+        logging.info(f"Started stream #{self.num_starts} (pid {self._process.pid}): {' '.join(self.command)}")
+        return started_at
+
+    def _stop_process(self, grace=30):
+        """
+        Ask the command to stop (SIGINT, so it flushes what it has
+        buffered) and kill it if it hasn't stopped after `grace` seconds.
+        """
+        if self._process is None or self._process.poll() is not None:
+            return
+        self._process.send_signal(signal.SIGINT)
+        try:
+            self._process.wait(timeout=grace)
+        except subprocess.TimeoutExpired:
+            logging.warning(f"Stream (pid {self._process.pid}) didn't stop. Killing it.")
+            self._process.kill()
+            self._process.wait()
+
+    def _heartbeat_age(self):
+        try:
+            return time.time() - os.path.getmtime(self.heartbeat_file)
+        except OSError:
+            return float("inf")
+
+    def _watch(self):
+        """
+        Wait until the command exits, stalls or we are told to stop.
+        Returns a description of what happened.
+        """
+        while True:
+            if self._stopping:
+                self._stop_process()
+                return "supervisor stopped"
+            exit_code = self._process.poll()
+            if exit_code is not None:
+                return f"exited with code {exit_code}"
+            age = self._heartbeat_age()
+            if age > self.stall_timeout:
+                self._stop_process()
+                return f"stalled (no heartbeat for {age:.0f} seconds)"
+            time.sleep(self.check_interval)
+
+    def _alert(self, reason):
+        if not self.alert_cmd:
+            return
+        try:
+            env = dict(os.environ, STREAM_RESTART_REASON=reason)
+            subprocess.run(self.alert_cmd, shell=True, timeout=60, env=env)
+        except Exception as e:
+            logging.error(f"Alert command failed: {e}")
+
+    def run(self):
+        """
+        Keep the command running until stop() is called.
+        """
+        backoff = self.min_backoff
+        while not self._stopping:
+            started_at = self._start()
+            reason = self._watch()
+            ran_for = time.time() - started_at
+            if self._stopping:
+                break
+
+            if ran_for >= self.stable_after:
+                backoff = self.min_backoff
+            logging.warning(f"Stream #{self.num_starts} {reason} after {ran_for:.0f} seconds. Restarting in {backoff:.0f} seconds.")
+            self._alert(reason)
+
+            # Sleep in small steps so a stop signal is handled quickly
+            wake_at = time.time() + backoff
+            while (time.time() < wake_at) and not self._stopping:
+                time.sleep(min(self.check_interval, wake_at - time.time()))
+            backoff = min(backoff * 2, self.max_backoff)
+
+        logging.info("Supervisor finished.")
+
+
+
+# Execute main program.
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+if __name__ == '__main__':
+    args = parse_args()
+
+    logging.basicConfig(
+        filename=args.log_file,
+        format='%(levelname)s - %(asctime)s | %(message)s',
+        datefmt="%m-%d-%Y_%H-%M-%S",
+        level=logging.INFO)
+
+    lock = acquire_lock(args.lock_file)
+    if lock is None:
+        # Another supervisor is already running (e.g. started by cron)
+        sys.exit(0)
+
+    command = [sys.executable, args.streamer, *args.streamer_args, "--heartbeat-file", args.heartbeat_file]
+    supervisor = StreamSupervisor(
+        command,
+        args.heartbeat_file,
+        stall_timeout=args.stall_timeout,
+        min_backoff=args.min_backoff,
+        max_backoff=args.max_backoff,
+        stable_after=args.stable_after,
+        alert_cmd=args.alert_cmd
+        )
+    signal.signal(signal.SIGTERM, supervisor.stop)
+    signal.signal(signal.SIGINT, supervisor.stop)
+    supervisor.run()
+    lock.close()
@@ -0,0 +1,270 @@
+"""
+PURPOSE
+    - A module for writing streamed tweets to disk.
+
+CLASSES
+    - DailyWriter:
+        - Keeps one open, buffered file handle per day and rotates
+        it to a new file at midnight. See docstring for parameters
+        and example usage.
+    - HourlyWriter:
+        - The same, but starts a new file every hour.
+
+NOTES
+    - Files can optionally be compressed (gzip or zstd) as they are
+    written. Each flush writes one complete gzip member / zstd frame,
+    so a crash loses at most the data buffered since the last flush
+    and everything before it can still be read with the usual tools
+    (`zcat`, `gzip.open()`, `zstd -d`, ...).
+    - Uncompressed files can optionally be indexed as they are written
+    (see tweet_index.py), so single tweets can be fetched later without
+    scanning the whole file.
+    - The old approach (opening/closing the daily file for every tweet)
+    costs a handful of syscalls per tweet. DailyWriter only pays for
+    those once per day, so each write is just a memory copy plus one
+    float comparison to check whether the day has rolled over.
+
+Author: Matthew R. DeVerna
+Date: 10/18/2026
+"""
+
+import os
+import gzip
+import time
+import logging
+from datetime import datetime as dt
+from datetime import timedelta
+
+# Local modules
+from tweet_index import IndexWriter
+
+# Optional dependency, only needed for compression="zstd"
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# File name suffix added for each type of compression
+COMPRESSION_SUFFIXES = {
+    None: "",
+    "gzip": ".gz",
+    "zstd": ".zst",
+}
+
+
+class DailyWriter(object):
+    """
+    Write streamed data to one file per day, i.e.
+        <data_dir>/<prefix>--<date>.json
+        <data_dir>/<prefix>--<date>.json.gz   (compression="gzip")
+        <data_dir>/<prefix>--<date>.json.zst  (compression="zstd")
+
+    Optional Parameters:
+    - data_dir (str): Folder where the daily files are written.
+        - default = "data"
+    - prefix (str): Start of each file name.
+        - default = "streaming_data"
+    - extension (str): End of each file name.
+        - default = ".json"
+    - date_format (str): strftime format used for the date in each file name.
+        - default = "%m-%d-%Y"
+    - flush_bytes (int): Flush to disk once this many bytes have been
+        written since the last flush.
+        - default = 1048576 (1 MB)
+    - flush_interval (float): Flush to disk if this many seconds have
+        passed since the last flush.
+        - default = 5.0
+    - compression (str): Compress the files as they are written. One of
+        None, "gzip" or "zstd" ("zstd" requires the `zstandard` package).
+        Everything written between two flushes becomes one gzip member /
+        zstd frame. Compressing is CPU heavy, so wrap the writer in a
+        stream_queue.QueuedWriter to keep it off the thread reading
+        from Twitter.
+        - default = None
+    - compression_level (int): Level passed to the compressor.
+        - default = 6 for gzip, 3 for zstd
+    - index (bool): Keep an index of where each tweet is in each file
+        (<file>.idx, see tweet_index.py). Requires `numpy` and can't be
+        combined with compression.
+        - default = False
+
+    Example Usage:
+    writer = DailyWriter(data_dir="data")
+    for line in lines:
+        writer.write(line)
+    writer.close()
+
+    # Or as a context manager
+    with DailyWriter(data_dir="data") as writer:
+        for line in lines:
+            writer.write(line)
+    """
+
+    def __init__(
+        self,
+        data_dir="data",
+        prefix="streaming_data",
+        extension=".json",
+        date_format="%m-%d-%Y",
+        flush_bytes=1048576,
+        flush_interval=5.0,
+        compression=None,
+        compression_level=None,
+        index=False
+        ):
+        if compression not in COMPRESSION_SUFFIXES:
+            raise ValueError(f"`compression` must be one of {list(COMPRESSION_SUFFIXES)}")
+        if compression == "zstd" and zstandard is None:
+            raise ImportError("compression='zstd' requires the `zstandard` package (pip install zstandard)")
+        if index and compression:
+            raise ValueError("`index` only works with uncompressed files")
+
+        self.data_dir = data_dir
+        self.prefix = prefix
+        self.extension = extension
+        self.date_format = date_format
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.compression = compression
+        self.index = index
+
+        if compression == "gzip":
+            level = 6 if compression_level is None else compression_level
+            self._compress = lambda data: gzip.compress(data, compresslevel=level)
+        elif compression == "zstd":
+            level = 3 if compression_level is None else compression_level
+            self._compress = zstandard.ZstdCompressor(level=level).compress
+        else:
+            self._compress = None
+        self._buffer = bytearray()  # Data waiting to be compressed
+
+        self.file_name = None
+        self._fh = None
+        self._index = None
+        self._rotate_at = 0.0   # Forces a file to be opened on the first write
+        self._pending = 0       # Bytes written since the last flush
+        self._last_flush = time.time()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _next_rotation(self, now):
+        """
+        Return the timestamp of the next local midnight after `now`.
+        """
+        tomorrow = dt.fromtimestamp(now).date() + timedelta(days=1)
+        return dt.combine(tomorrow, dt.min.time()).timestamp()
+
+    def _open(self, now):
+        """
+        Open (for appending) the file that `now` belongs to.
+        """
+        today = dt.strftime(dt.fromtimestamp(now), self.date_format)
+        suffix = COMPRESSION_SUFFIXES[self.compression]
+        file_name = os.path.join(self.data_dir, f"{self.prefix}--{today}{self.extension}{suffix}")
+
+        if not os.path.isfile(file_name):
+            logging.info(f"Creating file: {file_name}")
+
+        self.file_name = file_name
+        fh = open(file_name, "ab")
+        if self.index:
+            self._index = IndexWriter(file_name)
+        return fh
+
+    def _rotate(self, now):
+        """
+        Close the current file (if any) and open the one for `now`.
+        """
+        self.close()
+        self._fh = self._open(now)
+        self._rotate_at = self._next_rotation(now)
+        self._last_flush = now
+
+    def write(self, data):
+        """
+        Write `data` (str or bytes) to the current daily file.
+        Strings are encoded as UTF-8 and written as-is, so callers
+        are responsible for any line endings.
+        """
+        now = time.time()
+        if now >= self._rotate_at:
+            self._rotate(now)
+
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+
+        if self._compress is None:
+            self._fh.write(data)
+            if self._index is not None:
+                self._index.add(data)
+        else:
+            self._buffer += data
+        self._pending += len(data)
+
+        if (self._pending >= self.flush_bytes) or (now - self._last_flush >= self.flush_interval):
+            self.flush(now)
+
+    def flush(self, now=None):
+        """
+        Push buffered data to disk. When compressing, the buffered data
+        is written as one complete gzip member / zstd frame.
+        """
+        if self._fh is not None:
+            if self._buffer:
+                self._fh.write(self._compress(bytes(self._buffer)))
+                self._buffer.clear()
+            self._fh.flush()
+            # Only index data that has reached the file
+            if self._index is not None:
+                self._index.flush()
+        self._pending = 0
+        self._last_flush = time.time() if now is None else now
+
+    def flush_if_due(self):
+        """
+        Flush if `flush_interval` has passed since the last flush.
+        Meant to be called while the stream is quiet (e.g. on a keep-alive)
+        so buffered tweets don't sit in memory indefinitely.
+        """
+        now = time.time()
+        if self._pending and (now - self._last_flush >= self.flush_interval):
+            self.flush(now)
+
+    def close(self):
+        """
+        Flush and close the current file. The next write reopens it.
+        """
+        if self._fh is not None:
+            self.flush()
+            self._fh.close()
+            self._fh = None
+            self._rotate_at = 0.0
+        if self._index is not None:
+            self._index.close()
+            self._index = None
+
+
+class HourlyWriter(DailyWriter):
+    """
+    Write streamed data to one file per hour, i.e.
+        <data_dir>/<prefix>--<date>_<hour>.json
+
+    Takes the same parameters as DailyWriter, except that `date_format`
+    defaults to "%m-%d-%Y_%H". Smaller files are quicker to convert,
+    deduplicate and index once each hour is over.
+    """
+
+    def __init__(self, data_dir="data", date_format="%m-%d-%Y_%H", **kwargs):
+        super(HourlyWriter, self).__init__(data_dir=data_dir, date_format=date_format, **kwargs)
+
+    def _next_rotation(self, now):
+        """
+        Return the timestamp of the start of the next hour after `now`.
+        """
+        this_hour = dt.fromtimestamp(now).replace(minute=0, second=0, microsecond=0)
+        return (this_hour + timedelta(hours=1)).timestamp()
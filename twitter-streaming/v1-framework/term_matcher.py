@@ -0,0 +1,269 @@
+"""
+PURPOSE
+    - A module for working out which of our track terms a tweet matched,
+    following the same rules Twitter uses for the `track` parameter.
+
+CLASSES
+    - TermMatcher:
+        - Compiles every word of every term into one Aho-Corasick
+        automaton, so finding all the terms in a tweet costs the same
+        no matter how many terms there are. See docstring for parameters
+        and example usage.
+    - TaggingWriter:
+        - Wraps a writer and tags every tweet written with the terms it
+        matched (optionally counting it too, see stream_counters.py).
+
+METHODS
+    - split_terms:
+        - Turn the lines of a keywords file into track terms.
+    - tweet_text:
+        - Collect all the text Twitter matches terms against in a tweet.
+
+MATCHING RULES (from Twitter's docs for the `track` parameter)
+    - Each line of the keywords file is a term. Commas also separate
+    terms (that is how tweepy sends them to Twitter).
+    - A term with spaces matches when ALL of its words are in the tweet,
+    in any order ("covid vaccine" matches "the vaccine for covid").
+    - Matching is case-insensitive and on whole words: "vaccine" matches
+    "Vaccine", "vaccine." "#vaccine" and "@vaccine", but not "vaccines".
+    - A word starting with "#" or "@" only matches the hashtag/mention
+    ("#vaccine" doesn't match plain "vaccine").
+    - The text of retweeted and quoted tweets, expanded urls and
+    mentioned screen names are searched as well as the tweet's own text.
+
+Author: Matthew R. DeVerna
+Date: 10/18/2026
+"""
+
+import json
+
+
+def split_terms(lines):
+    """
+    Return the list of terms in `lines` (e.g. an open keywords file),
+    skipping blank lines and splitting on commas.
+    """
+    terms = []
+    for line in lines:
+        for term in line.split(","):
+            term = term.strip()
+            if term:
+                terms.append(term)
+    return terms
+
+
+def _is_word_char(ch):
+    return ch.isalnum() or ch == "_"
+
+
+def tweet_text(tweet):
+    """
+    Return all the text of `tweet` (a tweet object) that track terms are
+    matched against, joined by newlines.
+    """
+    parts = []
+    for status in (tweet, tweet.get("retweeted_status"), tweet.get("quoted_status")):
+        if not status:
+            continue
+        extended = status.get("extended_tweet") or {}
+        parts.append(extended.get("full_text") or status.get("full_text") or status.get("text") or "")
+        entities = extended.get("entities") or status.get("entities") or {}
+        parts.extend(url.get("expanded_url") or "" for url in entities.get("urls", []))
+        parts.extend(f"@{mention.get('screen_name')}" for mention in entities.get("user_mentions", []))
+    return "\n".join(parts)
+
+
+class TermMatcher(object):
+    """
+    Find which track `terms` appear in a piece of text or a tweet.
+
+    Required Parameters:
+    - terms (list): Track terms, e.g. from split_terms().
+
+    Example Usage:
+    with open("keywords.txt") as f:
+        matcher = TermMatcher(split_terms(f))
+    matcher.match("Got my #COVID vaccine today")   # ["covid vaccine", "#covid"]
+    matcher.match_tweet(tweet)                     # Same, for a tweet object
+    line = matcher.tag(line)                       # Add "matched_terms" to a raw JSON line
+    """
+
+    # Field added to tweets by tag()
+    TAG_FIELD = "matched_terms"
+
+    def __init__(self, terms):
+        self.terms = list(terms)
+
+        # Each unique word gets an index. `_word_terms[w]` lists the terms
+        # that contain word w, and `_term_sizes[t]` is the number of
+        # unique words in term t.
+        words = {}
+        self._word_terms = []
+        self._term_sizes = []
+        for term_index, term in enumerate(self.terms):
+            term_words = set(term.lower().split())
+            self._term_sizes.append(len(term_words))
+            for word in term_words:
+                if word not in words:
+                    words[word] = len(words)
+                    self._word_terms.append([])
+                self._word_terms[words[word]].append(term_index)
+        self._words = list(words)
+
+        self._build_automaton()
+
+    def _build_automaton(self):
+        """
+        Build the Aho-Corasick automaton: a trie of all words (`_goto`),
+        the state to fall back to when the next character doesn't fit
+        (`_fail`) and the words that end in each state (`_out`).
+        """
+        self._goto = [{}]
+        self._out = [[]]
+        for word_index, word in enumerate(self._words):
+            state = 0
+            for ch in word:
+                if ch not in self._goto[state]:
+                    self._goto.append({})
+                    self._out.append([])
+                    self._goto[state][ch] = len(self._goto) - 1
+                state = self._goto[state][ch]
+            self._out[state].append(word_index)
+
+        # Breadth first, so each state's fallback is finished before its children
+        self._fail = [0] * len(self._goto)
+        level = list(self._goto[0].values())
+        while level:
+            next_level = []
+            for state in level:
+                for ch, child in self._goto[state].items():
+                    fallback = self._fail[state]
+                    while fallback and ch not in self._goto[fallback]:
+                        fallback = self._fail[fallback]
+                    self._fail[child] = self._goto[fallback].get(ch, 0)
+                    self._out[child] = self._out[child] + self._out[self._fail[child]]
+                    next_level.append(child)
+            level = next_level
+
+    def _find_words(self, text):
+        """
+        Return the set of word indices found as whole words in `text`.
+        """
+        text = text.lower()
+        goto, fail, out, words = self._goto, self._fail, self._out, self._words
+        found = set()
+        state = 0
+        last = len(text) - 1
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if not out[state]:
+                continue
+            # Words must end at the end of a word in the text...
+            if i < last and _is_word_char(text[i + 1]):
+                continue
+            for word_index in out[state]:
+                start = i - len(words[word_index]) + 1
+                # ...and start at the beginning of one. "#" and "@" aren't
+                # word characters, so "vaccine" also matches "#vaccine".
+                if start == 0 or not _is_word_char(text[start - 1]):
+                    found.add(word_index)
+        return found
+
+    def match(self, text):
+        """
+        Return the terms found in `text`, in the order they were given.
+        """
+        hits = {}
+        for word_index in self._find_words(text):
+            for term_index in self._word_terms[word_index]:
+                hits[term_index] = hits.get(term_index, 0) + 1
+        return [self.terms[t] for t in sorted(hits) if hits[t] == self._term_sizes[t]]
+
+    def match_tweet(self, tweet):
+        """
+        Return the terms found in `tweet` (a tweet object, see tweet_text()).
+        """
+        return self.match(tweet_text(tweet))
+
+    def tag(self, line):
+        """
+        Add the terms a raw tweet JSON `line` (str) matched to it as
+        "matched_terms". Lines that aren't tweets (e.g. {"limit": ...}
+        notices) are returned unchanged.
+
+        The field is spliced in at the front of the object rather than
+        re-encoding the whole tweet, so the rest of the line is written
+        exactly as Twitter sent it.
+        """
+        return self.tag_tweet(line)[0]
+
+    def tag_tweet(self, line):
+        """
+        Same as tag() (for a str or bytes `line`), but also return what
+        was worked out along the way.
+
+        Returns:
+        - A (tagged line, tweet object, matched terms) tuple. The tweet
+        and terms are None for lines that aren't tweets.
+        """
+        try:
+            tweet = json.loads(line)
+        except ValueError:
+            return line, None, None
+        if not isinstance(tweet, dict) or "id" not in tweet:
+            return line, None, None
+        terms = self.match_tweet(tweet)
+        field = f'"{self.TAG_FIELD}":{json.dumps(terms)},'
+        if isinstance(line, bytes):
+            start = line.index(b"{") + 1
+            return line[:start] + field.encode() + line[start:], tweet, terms
+        start = line.index("{") + 1
+        return f'{line[:start]}{field}{line[start:]}', tweet, terms
+
+
+class TaggingWriter(object):
+    """
+    Tag every tweet with the terms it matched (see TermMatcher.tag) on
+    its way to `writer`.
+
+    Put this inside any stream_queue.QueuedWriter so the tweets are
+    parsed on the writer thread rather than the thread reading the
+    stream.
+
+    Required Parameters:
+    - writer: Any object with `write(data)`, `flush_if_due()` and
+        `close()` methods (e.g. stream_writer.DailyWriter).
+    - matcher (TermMatcher): Matches the terms.
+
+    Optional Parameters:
+    - counters (stream_counters.StreamCounters): Handed every tweet
+        already parsed, along with its terms, so it doesn't have to
+        parse or match it again.
+        - default = None
+
+    Example Usage:
+    writer = QueuedWriter(TaggingWriter(DailyWriter(), matcher, counters))
+    """
+
+    def __init__(self, writer, matcher, counters=None):
+        self.writer = writer
+        self.matcher = matcher
+        self.counters = counters
+
+    def write(self, data):
+        data, tweet, terms = self.matcher.tag_tweet(data)
+        if (self.counters is not None) and (tweet is not None):
+            self.counters.add_tweet(tweet, terms)
+        self.writer.write(data)
+
+    def flush_if_due(self):
+        self.writer.flush_if_due()
+
+    def stats(self):
+        writer_stats = getattr(self.writer, "stats", None)
+        return {} if writer_stats is None else writer_stats()
+
+    def close(self):
+        self.writer.close()
@@ -0,0 +1,234 @@
+"""
+PURPOSE
+    - A module for indexing where each tweet is stored in our data
+    files, so single tweets can be read back without scanning a file.
+
+METHODS
+    - tweet_id:
+        - Return the id of the tweet in one (raw JSON) line, or None
+        for lines that aren't tweets (e.g. delete notices).
+    - snowflake_time:
+        - Return the time a tweet was created from its id.
+    - finish_index:
+        - Sort an index that is done being written.
+    - load_index:
+        - Load (memory-map) the index of one data file.
+    - find_tweets:
+        - Look up the position of many tweet ids in one index.
+
+CLASSES
+    - IndexWriter:
+        - Records the position of every tweet written to one data file.
+        Used by stream_writer.DailyWriter(index=True).
+
+INDEX FILES
+    - <data file>.idx.log
+        - Written while the data file is being written: one record of
+        three uint64 numbers (tweet id, byte offset, length in bytes) per
+        tweet, in the order they were written. Lines that aren't tweets
+        (limit, delete and other notices) aren't indexed.
+    - <data file>.idx
+        - Written once the data file is closed (e.g. at the end of the
+        hour/day): all records sorted by tweet id and stored as three
+        uint64 arrays one after the other (n ids, then n offsets, then n
+        lengths). The ids are memory-mapped and binary searched, so a
+        lookup only touches a few pages of the index.
+
+NOTES
+    - Offsets are only meaningful for uncompressed data files.
+    - If the streamer dies before closing a file, its .idx.log is left
+    behind. load_index reads it as well (sorting it in memory), and the
+    next close of that file merges it into the .idx.
+    - Requires numpy.
+
+Author: Matthew R. DeVerna
+Date: 10/18/2026
+"""
+
+import os
+import re
+import json
+from array import array
+
+# Optional dependency, only needed when indexing is switched on
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+INDEX_SUFFIX = ".idx"
+LOG_SUFFIX = ".idx.log"
+
+# Milliseconds between the unix epoch and the epoch of Twitter's ids
+TWITTER_EPOCH_MS = 1288834974657
+
+# A V1 tweet's own id_str comes before any nested object
+_ID_STR = re.compile(r'"id_str":\s*"(\d+)"')
+_ID_STR_BYTES = re.compile(rb'"id_str":\s*"(\d+)"')
+
+
+def tweet_id(data):
+    """
+    Return the id (int) of the tweet in `data` (one raw JSON line, str
+    or bytes) or None if it isn't a tweet, e.g. a limit notice or a
+    delete notice (which carries the id of the tweet it deletes).
+    """
+    if isinstance(data, bytes):
+        pattern, brace = _ID_STR_BYTES, b"{"
+    else:
+        pattern, brace = _ID_STR, "{"
+    match = pattern.search(data, 0, 1000)
+    if match is None:
+        return None
+    if brace not in data[data.find(brace) + 1:match.start()]:
+        return int(match.group(1))
+
+    # The first id_str is nested (or a string before it has a "{" in it)
+    try:
+        tweet = json.loads(data)
+    except ValueError:
+        return None
+    if not isinstance(tweet, dict) or "created_at" not in tweet or "id_str" not in tweet:
+        return None
+    return int(tweet["id_str"])
+
+
+def snowflake_time(tweet_id):
+    """
+    Return the unix time (seconds) `tweet_id` was created, read from the
+    id itself (only for ids from November 2010 onwards).
+    """
+    return ((tweet_id >> 22) + TWITTER_EPOCH_MS) / 1000
+
+
+def _read_log(log_file):
+    """
+    Return the records in `log_file` as an (n, 3) array, dropping a
+    partial record at the end (left by a crash mid-write).
+    """
+    records = np.fromfile(log_file, dtype=np.uint64)
+    records = records[:len(records) - len(records) % 3]
+    return records.reshape(-1, 3)
+
+
+def finish_index(data_file):
+    """
+    Merge <data_file>.idx.log into <data_file>.idx (keeping every
+    record already there), sorted by tweet id, and remove the log.
+    """
+    log_file = data_file + LOG_SUFFIX
+    index_file = data_file + INDEX_SUFFIX
+    if not os.path.isfile(log_file):
+        return
+
+    records = _read_log(log_file)
+    if os.path.isfile(index_file):
+        ids, offsets, lengths = load_index(data_file, include_log=False)[0]
+        records = np.concatenate([records, np.column_stack([ids, offsets, lengths])])
+    records = records[np.argsort(records[:, 0], kind="stable")]
+
+    temp_file = index_file + ".tmp"
+    with open(temp_file, "wb") as f:
+        for column in range(3):
+            f.write(np.ascontiguousarray(records[:, column]).tobytes())
+    os.replace(temp_file, index_file)
+    os.remove(log_file)
+
+
+def load_index(data_file, include_log=True):
+    """
+    Load the index of `data_file`.
+
+    Returns:
+    - A list of (ids, offsets, lengths) tuples of uint64 arrays, each
+    sorted by id: one memory-mapped from the .idx file and/or one read
+    from a leftover .idx.log. Empty if the file has no index.
+    """
+    parts = []
+    index_file = data_file + INDEX_SUFFIX
+    if os.path.isfile(index_file) and os.path.getsize(index_file):
+        columns = np.memmap(index_file, dtype=np.uint64, mode="r").reshape(3, -1)
+        parts.append((columns[0], columns[1], columns[2]))
+
+    log_file = data_file + LOG_SUFFIX
+    if include_log and os.path.isfile(log_file):
+        records = _read_log(log_file)
+        records = records[np.argsort(records[:, 0], kind="stable")]
+        parts.append((records[:, 0].copy(), records[:, 1].copy(), records[:, 2].copy()))
+    return parts
+
+
+def find_tweets(parts, tweet_ids):
+    """
+    Look up `tweet_ids` (an array of uint64) in an index from load_index.
+
+    Returns:
+    - A dictionary of {tweet id: (offset, length)} for the ids found.
+    """
+    found = {}
+    for ids, offsets, lengths in parts:
+        if not len(ids):
+            continue
+        positions = np.searchsorted(ids, tweet_ids)
+        positions[positions == len(ids)] = 0
+        for num in np.flatnonzero(ids[positions] == tweet_ids):
+            pos = positions[num]
+            found[int(tweet_ids[num])] = (int(offsets[pos]), int(lengths[pos]))
+    return found
+
+
+class IndexWriter(object):
+    """
+    Append (tweet id, offset, length) to <data_file>.idx.log for every
+    tweet written to `data_file`, then sort it into <data_file>.idx
+    when the data file is closed.
+
+    Required Parameters:
+    - data_file (str): The (uncompressed) data file being indexed.
+
+    Optional Parameters:
+    - offset (int): Byte offset the next write to `data_file` lands on.
+        - default = the current size of `data_file`
+
+    Example Usage:
+    index = IndexWriter(file_name)
+    for line in lines:
+        f.write(line)
+        index.add(line)
+    f.flush()
+    index.flush()   # Always after the data itself is flushed
+    ...
+    index.close()
+    """
+
+    def __init__(self, data_file, offset=None):
+        if np is None:
+            raise ImportError("Indexing tweets requires the `numpy` package (pip install numpy)")
+        self.data_file = data_file
+        self.offset = os.path.getsize(data_file) if offset is None else offset
+        self._records = array("Q")
+        self._fh = open(data_file + LOG_SUFFIX, "ab")
+
+    def add(self, data):
+        """
+        Record `data` (bytes just written to the data file).
+        """
+        tid = tweet_id(data)
+        if tid is not None:
+            self._records.extend((tid, self.offset, len(data)))
+        self.offset += len(data)
+
+    def flush(self):
+        if self._records:
+            self._fh.write(self._records.tobytes())
+            del self._records[:]
+        self._fh.flush()
+
+    def close(self):
+        """
+        Flush the log and sort it into the data file's .idx.
+        """
+        self.flush()
+        self._fh.close()
+        finish_index(self.data_file)
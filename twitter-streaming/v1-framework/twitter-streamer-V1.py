@@ -24,6 +24,33 @@ CHANGELOG:
     - 01/02/2020: Removed the scripts use of emailer.py
     email updating system functionality to simplify the
     script.
+    - 10/18/2026: Tweets are now written with the buffered
+    DailyWriter (stream_writer.py) which keeps one file open
+    per day instead of reopening it for every tweet.
+    - 10/18/2026: Added -q/--queue-size to write tweets from a
+    separate thread (stream_queue.py) so a slow disk doesn't
+    stall the stream.
+    - 10/18/2026: Added -c/--compression to write gzip or
+    zstd compressed daily files (streaming_data--<date>.json.gz).
+    - 10/18/2026: Added -t/--tag-terms to record which filter
+    terms each tweet matched (term_matcher.py) in a new
+    "matched_terms" field.
+    - 10/18/2026: Added --metrics-port and --status-file to
+    publish live throughput/lag numbers (stream_metrics.py).
+    - 10/18/2026: Added --heartbeat-file, touched whenever
+    Twitter sends data or a keep-alive, so stream_supervisor.py
+    can tell a stalled stream from a healthy one.
+    - 10/18/2026: Added --credentials and --shards to split the
+    filter terms across several connections (one per set of
+    credentials) and merge their tweets, dropping duplicates
+    (stream_shards.py).
+    - 10/18/2026: Added --hourly to start a new file every hour
+    (streaming_data--<date>_<hour>.json) and --index to keep an
+    index of where each tweet is in the files (tweet_index.py),
+    used by lookup_tweets.py.
+    - 10/18/2026: Added --counts-file to keep rolling per-term,
+    per-hashtag and total counts for the last minute/hour/day
+    (stream_counters.py) and log surges as they happen.
 
 """
 
@@ -32,13 +59,26 @@ CHANGELOG:
 
 import os
 import sys
+import time
 import argparse
 import logging
+import threading
 from datetime import datetime as dt
 
 # Dependencies
 from tweepy import OAuthHandler, Stream, StreamListener
 
+# Local modules
+from stream_writer import DailyWriter, HourlyWriter
+from stream_queue import QueuedWriter, WriterError
+from term_matcher import TermMatcher, TaggingWriter, split_terms
+from stream_metrics import StreamMetrics, RecordingWriter
+from stream_counters import StreamCounters
+from stream_shards import ShardMerger, shard_terms
+
+# credential_pool.py lives in the root of this repository
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir))
+
 
 
 # Initialize the log
@@ -91,12 +131,110 @@ parser.add_argument(
   metavar='File',
   help="Full path to the file containing keywords you would like to include. (One object (i.e. hashtag) per line)"
   )
+parser.add_argument(
+  "-q", "--queue-size",
+  metavar='Queue Size',
+  type=int,
+  default=0,
+  help="Write tweets from a separate thread, holding up to this many tweets in memory while the disk catches up. (default = 0, write on the thread reading the stream)"
+  )
+parser.add_argument(
+  "--queue-policy",
+  metavar='Queue Policy',
+  choices=["block", "spill", "drop"],
+  default="block",
+  help="What to do when the write queue is full. One of: block (wait for the disk), spill (append to --overflow-file and copy back later), drop (discard and count the tweet). (default = block)"
+  )
+parser.add_argument(
+  "--overflow-file",
+  metavar='Overflow File',
+  default="stream_overflow.json",
+  help="File (ideally on a local disk) used by `--queue-policy spill`. (default = stream_overflow.json)"
+  )
+parser.add_argument(
+  "-c", "--compression",
+  metavar='Compression',
+  choices=["gzip", "zstd"],
+  default=None,
+  help="Compress output files as they are written. One of: gzip (.json.gz), zstd (.json.zst, requires `zstandard`). Compression always runs on a separate writer thread (see -q/--queue-size). (default = no compression)"
+  )
+parser.add_argument(
+  "--hourly",
+  action='store_true',
+  help="Start a new file every hour (streaming_data--<date>_<hour>.json) instead of every day."
+  )
+parser.add_argument(
+  "--index",
+  action='store_true',
+  help="Keep an index (<file>.idx) of where each tweet is in the files, so lookup_tweets.py can fetch tweets by id without scanning them. Requires `numpy`; can't be combined with -c/--compression."
+  )
+parser.add_argument(
+  "-t", "--tag-terms",
+  action='store_true',
+  help="Add a \"matched_terms\" field to each tweet listing the filter terms it matched (see term_matcher.py)."
+  )
+parser.add_argument(
+  "--metrics-port",
+  metavar='Metrics Port',
+  type=int,
+  default=None,
+  help="Serve live stream metrics on http://127.0.0.1:<port>/metrics (Prometheus format) and /status (JSON). (default = off)"
+  )
+parser.add_argument(
+  "--status-file",
+  metavar='Status File',
+  default=None,
+  help="JSON file rewritten every 10 seconds with live stream metrics (tweets/second, lag, reconnects, queue depth, ...). (default = off)"
+  )
+parser.add_argument(
+  "--counts-file",
+  metavar='Counts File',
+  default=None,
+  help="JSON file rewritten every minute with tweet counts per filter term and per hashtag over the last minute, hour and day, plus any terms/hashtags that are surging (see stream_counters.py). Counting always runs on a separate writer thread (see -q/--queue-size). (default = off)"
+  )
+parser.add_argument(
+  "--heartbeat-file",
+  metavar='Heartbeat File',
+  default=None,
+  help="File touched whenever Twitter sends data or a keep-alive (at most every 5 seconds). Used by stream_supervisor.py to spot a stalled stream. (default = off)"
+  )
+parser.add_argument(
+  "--credentials",
+  metavar='Credentials File',
+  default=None,
+  help="JSON file with several sets of Twitter API keys/tokens (see credential_pool.py). The filter terms are split across one connection per set and their tweets are merged, dropping duplicates (see stream_shards.py). (default = one connection using the TWITTER_* environment variables)"
+  )
+parser.add_argument(
+  "--shards",
+  metavar='Shards',
+  type=int,
+  default=None,
+  help="Number of connections to split the filter terms across. Each needs its own set of credentials, from --credentials or the TWITTER_*_2, TWITTER_*_3, ... environment variables. (default = one per credential set with --credentials, otherwise 1)"
+  )
 
 # Read parsed arguments from the command line into "args"
 args = parser.parse_args()
 
 # Assign them to objects
 file = args.file
+queue_size = args.queue_size
+queue_policy = args.queue_policy
+overflow_file = args.overflow_file
+compression = args.compression
+hourly = args.hourly
+index = args.index
+tag_terms = args.tag_terms
+metrics_port = args.metrics_port
+status_file = args.status_file
+heartbeat_file = args.heartbeat_file
+counts_file = args.counts_file
+credentials_file = args.credentials
+num_shards = args.shards
+
+# Compressing (or counting) on the thread reading the stream would slow
+# it down, so then tweets always go through the write queue.
+if (compression or counts_file) and queue_size <= 0:
+    queue_size = 10000
 
 
 
@@ -110,60 +248,118 @@ class Listener(StreamListener):
 
     This Listener does the following:
         - Writes raw tweet data to a file named for the day it is scraped.
+        - Optionally counts connections and errors, if given a
+        stream_metrics.StreamMetrics (tweets are counted by a
+        stream_metrics.RecordingWriter as they are written).
+        - Optionally touches `heartbeat_file` whenever Twitter sends
+        anything, so a supervisor can spot a stalled stream.
     """
 
-    def on_data(self, data):
-        today = dt.strftime(dt.now(), "%m-%d-%Y")
-        file_name = f"data/streaming_data--{today}.json"
+    # Seconds between heartbeat file updates
+    HEARTBEAT_INTERVAL = 5
+
+    # Longest tweepy (3.10) sleeps before reconnecting after an error
+    # (its Stream's retry_time_cap). The heartbeat covers it, so the
+    # supervisor doesn't restart us in the middle of a backoff Twitter
+    # asked for.
+    MAX_RETRY_WAIT = 320
+
+    def __init__(self, writer, metrics=None, heartbeat_file=None, api=None):
+        super(Listener, self).__init__(api)
+        self.writer = writer
+        self.metrics = metrics
+        self.heartbeat_file = heartbeat_file
+        self._next_beat = 0
 
+    def beat(self, until=None):
         """
-        The 'if os.path.isfile()' line below checks if the data 
-        file has already been created for a given day. If not, 
-        we send an email update which includes an update on 
-        the number of total tweets collected as well as the
-        number of tweets collected that day.
-
-        Since a new file will be created at the beginning of 
-        each day, this if statement will only be activated 
-        once at the very end of of day.
-
-        This allows us to get updates on the volume of tweets 
-        we are capturing and get an idea of when a surge
-        may be taking place. 
+        Touch the heartbeat file (if there is one). Passing `until`
+        (a unix time) marks the stream as healthy up to that time,
+        e.g. while we deliberately wait.
         """
-        if os.path.isfile(file_name):
-            with open(file_name, "a+") as f:
-                f.write(f"{data}")
+        if self.heartbeat_file is None:
+            return
+        now = time.time()
+        if (until is None) and (now < self._next_beat):
+            return
+        self._next_beat = now + self.HEARTBEAT_INTERVAL
+        beat_time = now if until is None else until
+        with open(self.heartbeat_file, "a"):
+            pass
+        os.utime(self.heartbeat_file, (beat_time, beat_time))
+
+    def on_connect(self):
+        self.beat()
+        if self.metrics is not None:
+            self.metrics.record_connect()
 
-        else:
-            logging.info(f"Creating file: {file_name}")
-
-            with open(file_name, "a+") as f:
-                f.write(f"{data}")
+    def on_data(self, data):
+        """
+        The writer keeps the day's file open and only works out
+        the file name again once the clock passes midnight. A
+        new file is created at the beginning of each day, which
+        lets us get an idea of the volume of tweets we are 
+        capturing and when a surge may be taking place.
+        """
+        self.beat()
+        self.writer.write(data)
 
         return True
 
+    def keep_alive(self):
+        # Twitter sends keep-alives while the stream is quiet, so
+        # use them to push any buffered tweets to disk.
+        self.beat()
+        self.writer.flush_if_due()
+
 
 
     def on_error(self, status_code):
         # Log error with exception info
         logging.error(f"Error, code {status_code}", exc_info=True) 
+        if self.metrics is not None:
+            self.metrics.record_error()
         if status_code == 420:
 
-            # Wait five minutes
+            # Wait five minutes, then tweepy backs off some more
+            # (without looking stalled)
+            self.beat(until=time.time() + 300 + self.MAX_RETRY_WAIT)
             time.sleep(300)
             return True
 
+        # tweepy backs off before reconnecting (without looking stalled)
+        self.beat(until=time.time() + self.MAX_RETRY_WAIT)
+
+    def on_timeout(self):
+        # tweepy waits (at most 16 seconds) and reconnects
+        self.beat(until=time.time())
+
+
+
+def run_shard(num, stream, terms, stopping):
+    """
+    Keep one connection of a sharded stream open until `stopping` is set.
+    Sets `stopping` itself if tweets can't be written.
+    """
+    while not stopping.is_set():
+        try:
+            stream.filter(track=terms, languages=["en"])
+        except WriterError:
+            logging.exception(f"Shard {num}: tweets can't be written, stopping the stream.")
+            stopping.set()
+        except Exception:
+            logging.exception(f"Shard {num}: unexpected exception, reconnecting...")
+            time.sleep(1)
+
 
 
 def load_terms(file):
     logging.info("Attempting to load filter rules...")
 
-    filter_terms = []
     with open(file, "r") as f:
-        for line in f:
-            logging.info("Loaded Filter Rule: {}".format(line.strip('\n')))
-            filter_terms.append(line.strip("\n"))
+        filter_terms = split_terms(f)
+    for term in filter_terms:
+        logging.info("Loaded Filter Rule: {}".format(term))
 
     return filter_terms
 
@@ -182,21 +378,114 @@ if __name__ == '__main__':
     # Loading the file terms...
     filter_terms = load_terms(file)
 
+    # Sharded: one connection (and reading thread) per set of credentials,
+    # all feeding the same writer through a ShardMerger.
+    shards = None
+    if credentials_file or (num_shards is not None and num_shards > 1):
+        from credential_pool import load_credentials
+        credentials = load_credentials(credentials_file)
+        if num_shards is None:
+            num_shards = len(credentials)
+        if num_shards > len(credentials):
+            sys.exit(f"--shards {num_shards} needs {num_shards} sets of credentials, found {len(credentials)}.")
+        shards = shard_terms(filter_terms, num_shards)
+
     # Set up the stream.
     logging.info("Setting up the stream...")
-    listener = Listener()
+    metrics = None
+    if (metrics_port is not None) or status_file:
+        metrics = StreamMetrics(status_file=status_file, port=metrics_port)
+    counters = None
+    if counts_file:
+        logging.info(f"Writing rolling tweet counts to: {counts_file}")
+        counters = StreamCounters(filter_terms, snapshot_file=counts_file)
+    writer_class = HourlyWriter if hourly else DailyWriter
+    writer = writer_class(data_dir="data", compression=compression, index=index)
+    # Tag and count tweets as they are written, i.e. on the writer thread
+    # and after any duplicates across shards are dropped. Tagging parses
+    # and matches each tweet, so the counters reuse that.
+    recorders = [metrics] if metrics is not None else []
+    if (counters is not None) and not tag_terms:
+        recorders.append(counters)
+    if recorders:
+        writer = RecordingWriter(writer, *recorders)
+    if tag_terms:
+        logging.info("Tagging tweets with the terms they matched...")
+        writer = TaggingWriter(writer, TermMatcher(filter_terms), counters)
+    if queue_size > 0:
+        logging.info(f"Writing from a separate thread. Queue size: {queue_size} | Policy: {queue_policy}")
+        writer = QueuedWriter(
+            writer,
+            maxsize=queue_size,
+            policy=queue_policy,
+            overflow_file=overflow_file
+            )
+    if shards is not None:
+        writer = ShardMerger(writer)
+    if metrics is not None:
+        # Include the queue's (and merger's) stats
+        metrics.writer = writer
+
+    if shards is not None:
+        stopping = threading.Event()
+        streams = []
+
+        logging.info(f"Starting {len(shards)} stream shards...")
+        try:
+            for num, (credential, terms) in enumerate(zip(credentials, shards), start=1):
+                logging.info(f"Shard {num} ({credential.name}): {len(terms)} terms")
+                auth = OAuthHandler(credential.consumer_key, credential.consumer_secret)
+                auth.set_access_token(credential.access_token, credential.access_token_secret)
+                stream = Stream(auth, Listener(writer, metrics, heartbeat_file))
+                streams.append(stream)
+                threading.Thread(
+                    target=run_shard,
+                    args=(num, stream, terms, stopping),
+                    name=f"stream-shard-{num}",
+                    daemon=True
+                    ).start()
+            while not stopping.is_set():
+                time.sleep(1)
+            sys.exit("\n\nStream stopped because tweets can't be written. See the log.\n\n")
+        except KeyboardInterrupt:
+            logging.info("User manually ended stream with a Keyboard Interruption.")
+            sys.exit("\n\nUser manually ended stream with a Keyboard Interruption.\n\n")
+        finally:
+            stopping.set()
+            for stream in streams:
+                stream.disconnect()
+            logging.info(f"Dropped {writer.duplicates} duplicate tweets across shards.")
+            writer.close()
+            if metrics is not None:
+                metrics.close()
+            if counters is not None:
+                counters.close()
+
+    listener = Listener(writer, metrics, heartbeat_file)
     auth = OAuthHandler(api_key, api_key_secret)
     auth.set_access_token(access_token, access_token_secret)
     stream = Stream(auth, listener)
 
     # Begin the stream.
     logging.info("Starting the stream...")
-    while True:
-        try:
-            stream.filter(track=filter_terms, languages=["en"])
-        except KeyboardInterrupt:
-            logging.info("User manually ended stream with a Keyboard Interruption.")
-            sys.exit("\n\nUser manually ended stream with a Keyboard Interruption.\n\n")
-        except Exception as e:
-            logging.debug('Unexpected exception: %s %e')
-            continue
+    try:
+        while True:
+            try:
+                stream.filter(track=filter_terms, languages=["en"])
+            except KeyboardInterrupt:
+                logging.info("User manually ended stream with a Keyboard Interruption.")
+                sys.exit("\n\nUser manually ended stream with a Keyboard Interruption.\n\n")
+            except WriterError:
+                # Exit (non-zero) so the supervisor can restart us
+                logging.exception("Tweets can't be written, stopping the stream.")
+                sys.exit("\n\nStream stopped because tweets can't be written. See the log.\n\n")
+            except Exception as e:
+                logging.debug('Unexpected exception: %s %e')
+                continue
+    finally:
+        # Make sure buffered tweets reach the disk however we exit.
+        writer.close()
+        if metrics is not None:
+            metrics.close()
+        if counters is not None:
+            counters.close()
@@ -0,0 +1,147 @@
+"""
+PURPOSE
+    - A module for keeping the rules of a V2 filtered stream in sync
+    with a rules file, changing only what is different.
+
+METHODS
+    - load_rule_file:
+        - Read the rules in a rules file.
+    - diff_rules:
+        - Compare the rules in place with the rules we want.
+    - sync_rules:
+        - Make the rules in place match the rules we want with (at most)
+        one add request and one delete request.
+
+RULES FILES
+    One rule per line. A line is either a JSON rule object, e.g.
+        {"value": "#covid OR #vaccine lang:en -is:retweet", "tag": "vaccines"}
+    or just the rule itself, optionally followed by a tab and its tag:
+        #covid OR #vaccine lang:en -is:retweet<TAB>vaccines
+    Blank lines and lines starting with "//" are skipped.
+
+NOTES
+    - Rules take effect on a stream that is already connected, so
+    there is no need to reconnect after syncing. Rules that didn't
+    change are never touched, so they keep matching the whole time.
+    - New rules are added before old ones are deleted, unless a rule is
+    only changing its tag (Twitter won't hold two rules with the same
+    value, so the old one has to go first).
+
+Author: Matthew DeVerna
+Date: 10/18/2026
+"""
+
+import json
+import requests
+
+
+RULES_URL = "https://api.twitter.com/2/tweets/search/stream/rules"
+
+
+def load_rule_file(file):
+    """
+    Return the list of rule objects ({"value": ..., "tag": ...}) in `file`.
+    """
+    rules = []
+    with open(file, "r") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("//"):
+                continue
+            if line.startswith("{"):
+                rule = json.loads(line)
+            else:
+                value, _, tag = line.partition("\t")
+                rule = {"value": value.strip()}
+                if tag.strip():
+                    rule["tag"] = tag.strip()
+            rules.append(rule)
+    return rules
+
+
+def get_rules(headers):
+    """
+    Return the list of rule objects currently in place (each with an "id").
+    """
+    response = requests.get(RULES_URL, headers=headers)
+    if response.status_code != 200:
+        raise Exception(
+            "Cannot get rules (HTTP {}): {}".format(response.status_code, response.text)
+        )
+    return response.json().get("data", [])
+
+
+def _post_rules(headers, payload, dry_run=False):
+    params = {"dry_run": "true"} if dry_run else None
+    response = requests.post(RULES_URL, headers=headers, json=payload, params=params)
+    # Twitter can answer 200/201 and still reject some of the rules
+    if (response.status_code not in (200, 201)) or response.json().get("errors"):
+        raise Exception(
+            "Cannot update rules (HTTP {}): {}".format(response.status_code, response.text)
+        )
+    return response.json()
+
+
+def diff_rules(current, desired):
+    """
+    Compare the `current` rules (from get_rules) with the `desired` rules.
+
+    Returns:
+    - to_add (list): Rule objects in `desired` but not in place
+    - to_delete (list): Rule objects in place but not in `desired`
+    - retagged (bool): True if a rule is only changing its tag
+    """
+    def key(rule):
+        return (rule["value"], rule.get("tag"))
+
+    desired_keys = {}
+    for rule in desired:
+        desired_keys.setdefault(key(rule), rule)
+    current_keys = {key(rule) for rule in current}
+
+    to_add = [
+        {k: v for k, v in rule.items() if k in ("value", "tag")}
+        for rule_key, rule in desired_keys.items() if rule_key not in current_keys
+        ]
+    to_delete = [rule for rule in current if key(rule) not in desired_keys]
+
+    deleted_values = {rule["value"] for rule in to_delete}
+    retagged = any(rule["value"] in deleted_values for rule in to_add)
+    return to_add, to_delete, retagged
+
+
+def sync_rules(headers, desired, dry_run=False):
+    """
+    Make the stream's rules match `desired` (a list of rule objects),
+    sending one add request and/or one delete request with only the
+    differences. With `dry_run` Twitter checks the changes but doesn't
+    make them (rules only changing their tag aren't sent for checking,
+    since their old version is still in place).
+
+    Returns:
+    - to_add, to_delete: the changes (see diff_rules)
+    """
+    current = get_rules(headers)
+    to_add, to_delete, retagged = diff_rules(current, desired)
+
+    def add(rules):
+        if rules:
+            _post_rules(headers, {"add": rules}, dry_run)
+
+    def delete():
+        if to_delete:
+            _post_rules(headers, {"delete": {"ids": [rule["id"] for rule in to_delete]}}, dry_run)
+
+    if retagged:
+        rules = to_add
+        if dry_run:
+            # The delete wasn't made, so Twitter would reject the retagged
+            # rules as duplicates. Their values are in place already.
+            deleted_values = {rule["value"] for rule in to_delete}
+            rules = [rule for rule in to_add if rule["value"] not in deleted_values]
+        delete()
+        add(rules)
+    else:
+        add(to_add)
+        delete()
+    return to_add, to_delete
@@ -43,6 +43,13 @@ import time
 import sys
 from datetime import datetime as dt
 
+# Writer utilities are shared with the V1 framework
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "v1-framework"))
+from stream_writer import DailyWriter
+from stream_queue import QueuedWriter
+from stream_metrics import StreamMetrics, RecordingWriter
+from stream_rules import load_rule_file, sync_rules
+
 
 
 # Set CLI Arguments
@@ -64,6 +71,58 @@ parser.add_argument(
   metavar='File',
   help="Full path to the file containing terms you would like to include. (One object (i.e. hashtag) per line)"
   )
+parser.add_argument(
+  "-q", "--queue-size",
+  metavar='Queue Size',
+  type=int,
+  default=0,
+  help="Write tweets from a separate thread, holding up to this many tweets in memory while the disk catches up. (default = 0, write on the thread reading the stream)"
+  )
+parser.add_argument(
+  "--queue-policy",
+  metavar='Queue Policy',
+  choices=["block", "spill", "drop"],
+  default="block",
+  help="What to do when the write queue is full. One of: block (wait for the disk), spill (append to --overflow-file and copy back later), drop (discard and count the tweet). (default = block)"
+  )
+parser.add_argument(
+  "--overflow-file",
+  metavar='Overflow File',
+  default="stream_overflow.json",
+  help="File (ideally on a local disk) used by `--queue-policy spill`. (default = stream_overflow.json)"
+  )
+parser.add_argument(
+  "-c", "--compression",
+  metavar='Compression',
+  choices=["gzip", "zstd"],
+  default=None,
+  help="Compress output files as they are written. One of: gzip (.json.gz), zstd (.json.zst, requires `zstandard`). Compression always runs on a separate writer thread (see -q/--queue-size). (default = no compression)"
+  )
+parser.add_argument(
+  "--raw",
+  action='store_true',
+  help="Write the bytes received from Twitter straight to disk without parsing and re-serializing each tweet. Much cheaper on CPU and keeps the original key order."
+  )
+parser.add_argument(
+  "--validate-every",
+  metavar='Validate Every',
+  type=int,
+  default=0,
+  help="With --raw, fully parse every Nth line with json.loads as a spot check. (default = 0, never)"
+  )
+parser.add_argument(
+  "--metrics-port",
+  metavar='Metrics Port',
+  type=int,
+  default=None,
+  help="Serve live stream metrics on http://127.0.0.1:<port>/metrics (Prometheus format) and /status (JSON). (default = off)"
+  )
+parser.add_argument(
+  "--status-file",
+  metavar='Status File',
+  default=None,
+  help="JSON file rewritten every 10 seconds with live stream metrics (tweets/second, lag, queue depth, ...). (default = off)"
+  )
 
 # Read parsed arguments from the command line into "args"
 args = parser.parse_args()
@@ -72,6 +131,19 @@ args = parser.parse_args()
 t = args.time
 time2run = (60**2 * t) # This turns the user input "1" into one hour
 file = args.file
+queue_size = args.queue_size
+queue_policy = args.queue_policy
+overflow_file = args.overflow_file
+compression = args.compression
+raw = args.raw
+validate_every = args.validate_every
+metrics_port = args.metrics_port
+status_file = args.status_file
+
+# Compressing on the thread reading the stream would slow it down,
+# so compressed output always goes through the write queue.
+if compression and queue_size <= 0:
+    queue_size = 10000
 
 
 
@@ -146,15 +218,26 @@ def set_rules(headers, all_rules):
     print(json.dumps(response.json()))
 
 
-def get_stream(headers, time2run):
+def get_stream(headers, time2run, writer, raw=False, validate_every=0, metrics=None):
     """
     This function begins the filter stream.
 
     This will run until the connection breaks or is manually
-    stopped.
+    stopped. Tweets are handed to `writer` (see stream_writer.py
+    and stream_queue.py) which takes care of getting them to disk.
+
+    If `raw` is True, the bytes received from Twitter are written
+    as-is instead of being parsed and re-serialized. Only a cheap
+    framing check is done on each line (it must look like one JSON
+    object), and every `validate_every`-th line is fully parsed
+    with json.loads as a spot check (0 = never).
+
+    If `metrics` (see stream_metrics.py) is given, connections are
+    counted there. Lines are counted as they are written, by wrapping
+    the file writer in a stream_metrics.RecordingWriter.
     """
     response = requests.get(
-        "https://api.twitter.com/2/tweets/search/stream?tweet.fields=entities,author_id",
+        "https://api.twitter.com/2/tweets/search/stream?tweet.fields=entities,author_id,created_at",
         headers=headers,
         stream=True,
     )
@@ -166,25 +249,58 @@ def get_stream(headers, time2run):
             )
         )
 
-    today = dt.strftime(dt.today(), "%Y-%m-%d_%M")
-    with open(f"streaming_data--{today}.json", "w") as f:
+    if metrics is not None:
+        metrics.record_connect()
+
+    num_lines = 0
+    num_malformed = 0
+
+    try:
+
+        # Set when stream should end
+        t_end = None if time2run is None else time.time() + time2run
+
+        for response_line in response.iter_lines():
+
+            if (t_end is not None) and (time.time() > t_end):
+                raise KeyboardInterrupt()
 
-        try:
+            # Empty lines are keep-alive signals
+            if not response_line:
+                continue
 
-            # Set when stream should end
-            t_end = time.time() + time2run 
+            if not raw:
+                json_response = json.loads(response_line)
+                line = f"{json.dumps(json_response)}\n"
+                writer.write(line)
+                continue
 
-            for response_line in response.iter_lines():
+            num_lines += 1
 
-                if time.time() > t_end:
-                    raise KeyboardInterrupt()
+            # iter_lines() already split on newlines, so a well framed
+            # line holds exactly one JSON object.
+            if not (response_line.startswith(b"{") and response_line.rstrip().endswith(b"}")):
+                num_malformed += 1
+                print(f"Skipping malformed line #{num_lines} ({num_malformed} so far): {response_line[:100]}")
+                continue
 
-                if response_line:
-                    json_response = json.loads(response_line)
-                    f.write(f"{json.dumps(json_response)}\n")
+            if validate_every and (num_lines % validate_every == 0):
+                try:
+                    json.loads(response_line)
+                except ValueError:
+                    num_malformed += 1
+                    print(f"Skipping invalid JSON on line #{num_lines} ({num_malformed} so far): {response_line[:100]}")
+                    continue
 
-        except KeyboardInterrupt:
-            sys.exit("Script manually ended or the indicated time ran out.")
+            writer.write(response_line + b"\n")
+
+    except KeyboardInterrupt:
+        sys.exit("Script manually ended or the indicated time ran out.")
+
+    finally:
+        writer.close()
+        if metrics is not None:
+            metrics.close()
 
 def another_rule():
     answer = None 
@@ -258,29 +374,18 @@ if __name__ == "__main__":
     # Create header w/ bearer to authorize stream
     headers = create_headers(bearer_token)
 
-    # Get existing rules set from any old streams
-    rules = get_rules(headers, bearer_token)
-
-    # Delete them for a clean slate
-    delete = delete_all_rules(headers, bearer_token, rules)
-
     ### Get rules. ###
 
     # If file was passed...
     if file:
-        all_rules = []
-
-        # Open the file and load into a list
-        with open(file, "r") as f:
-            for line in f:
-                all_rules.append(line)
+        all_rules = load_rule_file(file)
 
     # If not, call the user input option.
     else:
         all_rules = import_rules()
 
-    # Set the new rules we just loaded/imported
-    set_rules(headers, all_rules)
+    # Only add/delete the rules that differ from any old stream's rules
+    sync_rules(headers, all_rules)
 
     # Print them so the user knows what they're streaming...
     print("\nRULES:\n\n")
@@ -288,8 +393,28 @@ if __name__ == "__main__":
       print(f"#{num + 1}.",rule.get("value"))
       print("~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~")
 
+    # Set up where the tweets are written
+    metrics = None
+    if (metrics_port is not None) or status_file:
+        metrics = StreamMetrics(status_file=status_file, port=metrics_port)
+
+    writer = DailyWriter(data_dir=".", date_format="%Y-%m-%d", compression=compression)
+    if metrics is not None:
+        # Count tweets (and their lag) as they are written
+        writer = RecordingWriter(writer, metrics)
+    if queue_size > 0:
+        writer = QueuedWriter(
+            writer,
+            maxsize=queue_size,
+            policy=queue_policy,
+            overflow_file=overflow_file
+            )
+    if metrics is not None:
+        # Include the queue's stats
+        metrics.writer = writer
+
     # Start streamer
-    get_stream(headers, time2run)
+    get_stream(headers, time2run, writer, raw=raw, validate_every=validate_every, metrics=metrics)
 
     # Let the folks know!
     print("\n\nStreaming tweets...\n\nPress ctrl-c to cancel it.")
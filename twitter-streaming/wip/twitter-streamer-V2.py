@@ -22,10 +22,17 @@ Twitter References for the Filtered Stream Endpoint:
 Script Features:
 - Can receive a file of "rules" for your twitter stream
     - Each line is read in as a string representing one rule
+    (see stream_rules.py for the format, including tags)
     - Rules can be 512 characters long
     - You can have a maximum of 25 rules
 - If no file is given, a user input is required and 
     commandline direction is provided by the script.
+- Rules are synced rather than replaced: only rules that are
+    new are added and only rules that are gone are deleted, so
+    rules that stay the same never stop matching.
+- While a stream is running, run this script again with
+    -u/--update new_rules.txt to change its rules. The running
+    stream picks them up without reconnecting.
 
 Author: Matthew DeVerna
 Date: 12/14/2020
@@ -43,6 +50,12 @@ import time
 import sys
 from datetime import datetime as dt
 
+# Writer utilities are shared with the V1 framework
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "v1-framework"))
+from stream_writer import DailyWriter
+from stream_metrics import StreamMetrics, RecordingWriter
+from stream_rules import load_rule_file, sync_rules
+
 
 
 # Set CLI Arguments
@@ -60,32 +73,65 @@ parser.add_argument(
   )
 parser.add_argument(
   "-p", "--print", 
-  metavar='Print Rules',
-  help="Print the filter rules currently in place."
+  action='store_true',
+  help="Print the filter rules currently in place and exit."
   )
 parser.add_argument(
   "-u", "--update", 
   metavar='Update Filters',
-  help="Update the existing filter terms with new file of terms. Provide full path to the file containing new rules you would like to include. (One rule per line)"
+  help="Update the rules of the running stream (without stopping its connection) to match a new file of rules, then exit. Only rules that changed are added/deleted. Provide full path to the file containing the rules you would like to have. (One rule per line)"
   )
 parser.add_argument(
   "-d", "--delete", 
-  metavar='Delete Filters',
-  help="Delete all existing filters (can be passed with -u/--update to remove old rules and start new filter w/o stopping connection)."
+  action='store_true',
+  help="Delete all existing filters and exit."
+  )
+parser.add_argument(
+  "--dry-run",
+  action='store_true',
+  help="With -u/--update, have Twitter check the rule changes without making them."
   )
 parser.add_argument(
   "-b", "--break", 
   metavar='Break Connection',
   help="Breakconnection and end stream."
   )
+parser.add_argument(
+  "--raw",
+  action='store_true',
+  help="Write the bytes received from Twitter straight to disk without parsing and re-serializing each tweet. Much cheaper on CPU and keeps the original key order."
+  )
+parser.add_argument(
+  "--validate-every",
+  metavar='Validate Every',
+  type=int,
+  default=0,
+  help="With --raw, fully parse every Nth line with json.loads as a spot check. (default = 0, never)"
+  )
+parser.add_argument(
+  "--metrics-port",
+  metavar='Metrics Port',
+  type=int,
+  default=None,
+  help="Serve live stream metrics on http://127.0.0.1:<port>/metrics (Prometheus format) and /status (JSON). (default = off)"
+  )
+parser.add_argument(
+  "--status-file",
+  metavar='Status File',
+  default=None,
+  help="JSON file rewritten every 10 seconds with live stream metrics (tweets/second, lag, queue depth, ...). (default = off)"
+  )
 
 # Read parsed arguments from the command line into "args"
 args = parser.parse_args()
 
 # Assign them to objects
-t = args.time
-time2run = (60**2 * t) # This turns the user input "1" into one hour
-file = args.file
+time2run = None # This stream runs until the connection breaks or is stopped
+file = args.rules
+raw = args.raw
+validate_every = args.validate_every
+metrics_port = args.metrics_port
+status_file = args.status_file
 
 
 
@@ -160,15 +206,26 @@ def set_rules(headers, all_rules):
     print(json.dumps(response.json()))
 
 
-def get_stream(headers, time2run):
+def get_stream(headers, time2run, writer, raw=False, validate_every=0, metrics=None):
     """
     This function begins the filter stream.
 
     This will run until the connection breaks or is manually
-    stopped.
+    stopped. Tweets are handed to `writer` (see stream_writer.py
+    and stream_queue.py) which takes care of getting them to disk.
+
+    If `raw` is True, the bytes received from Twitter are written
+    as-is instead of being parsed and re-serialized. Only a cheap
+    framing check is done on each line (it must look like one JSON
+    object), and every `validate_every`-th line is fully parsed
+    with json.loads as a spot check (0 = never).
+
+    If `metrics` (see stream_metrics.py) is given, connections are
+    counted there. Lines are counted as they are written, by wrapping
+    the file writer in a stream_metrics.RecordingWriter.
     """
     response = requests.get(
-        "https://api.twitter.com/2/tweets/search/stream?tweet.fields=entities,author_id",
+        "https://api.twitter.com/2/tweets/search/stream?tweet.fields=entities,author_id,created_at",
         headers=headers,
         stream=True,
     )
@@ -180,25 +237,58 @@ def get_stream(headers, time2run):
             )
         )
 
-    today = dt.strftime(dt.today(), "%Y-%m-%d_%M")
-    with open(f"streaming_data--{today}.json", "w") as f:
+    if metrics is not None:
+        metrics.record_connect()
+
+    num_lines = 0
+    num_malformed = 0
+
+    try:
 
-        try:
+        # Set when stream should end
+        t_end = None if time2run is None else time.time() + time2run
 
-            # Set when stream should end
-            t_end = time.time() + time2run 
+        for response_line in response.iter_lines():
 
-            for response_line in response.iter_lines():
+            if (t_end is not None) and (time.time() > t_end):
+                raise KeyboardInterrupt()
 
-                if time.time() > t_end:
-                    raise KeyboardInterrupt()
+            # Empty lines are keep-alive signals
+            if not response_line:
+                continue
 
-                if response_line:
-                    json_response = json.loads(response_line)
-                    f.write(f"{json.dumps(json_response)}\n")
+            if not raw:
+                json_response = json.loads(response_line)
+                line = f"{json.dumps(json_response)}\n"
+                writer.write(line)
+                continue
 
-        except KeyboardInterrupt:
-            sys.exit("Script manually ended or the indicated time ran out.")
+            num_lines += 1
+
+            # iter_lines() already split on newlines, so a well framed
+            # line holds exactly one JSON object.
+            if not (response_line.startswith(b"{") and response_line.rstrip().endswith(b"}")):
+                num_malformed += 1
+                print(f"Skipping malformed line #{num_lines} ({num_malformed} so far): {response_line[:100]}")
+                continue
+
+            if validate_every and (num_lines % validate_every == 0):
+                try:
+                    json.loads(response_line)
+                except ValueError:
+                    num_malformed += 1
+                    print(f"Skipping invalid JSON on line #{num_lines} ({num_malformed} so far): {response_line[:100]}")
+                    continue
+
+            writer.write(response_line + b"\n")
+
+    except KeyboardInterrupt:
+        sys.exit("Script manually ended or the indicated time ran out.")
+
+    finally:
+        writer.close()
+        if metrics is not None:
+            metrics.close()
 
 def another_rule():
     answer = None 
@@ -258,6 +348,18 @@ def import_rules():
     return all_rules
 
 
+def print_changes(to_add, to_delete):
+    """
+    Print the rules added and deleted by stream_rules.sync_rules().
+    """
+    if not (to_add or to_delete):
+        print("\nRules already up to date.")
+    for rule in to_add:
+        print(f"+ {rule.get('value')} (tag: {rule.get('tag')})")
+    for rule in to_delete:
+        print(f"- {rule.get('value')} (tag: {rule.get('tag')})")
+
+
 # Execute program.
 #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
@@ -272,29 +374,36 @@ if __name__ == "__main__":
     # Create header w/ bearer to authorize stream
     headers = create_headers(bearer_token)
 
-    # Get existing rules set from any old streams
-    rules = get_rules(headers, bearer_token)
+    # Just print the existing rules
+    if args.print:
+        get_rules(headers, bearer_token)
+        sys.exit(0)
+
+    # Delete all existing rules
+    if args.delete:
+        rules = get_rules(headers, bearer_token)
+        delete_all_rules(headers, bearer_token, rules)
+        sys.exit(0)
 
-    # Delete them for a clean slate
-    delete = delete_all_rules(headers, bearer_token, rules)
+    # Change the rules of the stream that is already running
+    if args.update:
+        to_add, to_delete = sync_rules(headers, load_rule_file(args.update), dry_run=args.dry_run)
+        print_changes(to_add, to_delete)
+        sys.exit(0)
 
     ### Get rules. ###
 
     # If file was passed...
     if file:
-        all_rules = []
-
-        # Open the file and load into a list
-        with open(file, "r") as f:
-            for line in f:
-                all_rules.append(line)
+        all_rules = load_rule_file(file)
 
     # If not, call the user input option.
     else:
         all_rules = import_rules()
 
-    # Set the new rules we just loaded/imported
-    set_rules(headers, all_rules)
+    # Only add/delete the rules that differ from any old stream's rules
+    to_add, to_delete = sync_rules(headers, all_rules)
+    print_changes(to_add, to_delete)
 
     # Print them so the user knows what they're streaming...
     print("\nRULES:\n\n")
@@ -302,8 +411,18 @@ if __name__ == "__main__":
       print(f"#{num + 1}.",rule.get("value"))
       print("~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~")
 
+    # Set up where the tweets are written
+    metrics = None
+    if (metrics_port is not None) or status_file:
+        metrics = StreamMetrics(status_file=status_file, port=metrics_port)
+
+    writer = DailyWriter(data_dir=".", date_format="%Y-%m-%d")
+    if metrics is not None:
+        # Count tweets (and their lag) as they are written
+        writer = RecordingWriter(writer, metrics)
+
     # Start streamer
-    get_stream(headers, time2run)
+    get_stream(headers, time2run, writer, raw=raw, validate_every=validate_every, metrics=metrics)
 
     # Let the folks know!
     print("\n\nStreaming tweets...\n\nPress ctrl-c to cancel it.")
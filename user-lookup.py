@@ -13,14 +13,19 @@ Date: Dec. 17th 2020
 #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
 import argparse
+import asyncio
+import functools
 import requests
 import os
 import json
-import pause
+import time
+from concurrent.futures import ThreadPoolExecutor
 from tqdm import tqdm
 from datetime import datetime as dt
 from requests_oauthlib import OAuth1Session
 
+from user_cache import UserCache
+
 
 
 # Set CLI Arguments.
@@ -36,12 +41,40 @@ parser.add_argument(
     metavar='File',
     help="Full path to the file containing the USER IDS you would like to scrape."
 )
+parser.add_argument(
+    "-c", "--concurrency",
+    metavar='Concurrency',
+    type=int,
+    default=5,
+    help="Maximum number of requests in flight at once. (default = 5)"
+)
+parser.add_argument(
+    "--cache",
+    metavar='Cache',
+    help="SQLite file used to cache user objects between runs. Cached users are not requested from Twitter again until they expire. (default = no cache)"
+)
+parser.add_argument(
+    "--cache-ttl",
+    metavar='Cache TTL',
+    type=float,
+    default=168,
+    help="Hours before a cached user expires. (default = 168, one week)"
+)
+parser.add_argument(
+    "--cache-fields",
+    metavar='Cache Fields',
+    help="Comma-separated list of user fields to keep in the cache, e.g. username,public_metrics (default = keep everything)"
+)
 
 # Read parsed arguments from the command line into "args"
 args = parser.parse_args()
 
 # Assign them to objects
 file = args.file
+concurrency = args.concurrency
+cache_file = args.cache
+cache_ttl = args.cache_ttl * 60**2 # Hours to seconds
+cache_fields = args.cache_fields.split(",") if args.cache_fields else None
 # To set your enviornment variables in your terminal run the following line:
 # export 'BEARER_TOKEN'='<your_bearer_token>'
 
@@ -83,66 +116,116 @@ def create_params(userids):
     return params
 
 
-def connect_to_endpoint(oauth, params):
+class RateLimiter(object):
+    """Paces requests so that the requests left in the current rate limit
+    window (`x-rate-limit-remaining`) are spread evenly over the time left
+    in it (`x-rate-limit-reset`), instead of bursting through them and then
+    sleeping until the reset.
+
+    Shared by all the requests in flight, so it is only used from the
+    event loop.
+    """
+
+    def __init__(self, buffer_wait_time=15):
+        self.buffer_wait_time = buffer_wait_time
+        self.remaining = None   # Unknown until the first response comes back
+        self.reset = 0
+        self.next_slot = 0
+        self.lock = asyncio.Lock()
+
+    def update(self, headers):
+        """Record the rate limit state from a response's headers."""
+        if "x-rate-limit-remaining" not in headers:
+            return
+        remaining = int(headers["x-rate-limit-remaining"])
+        reset = int(headers["x-rate-limit-reset"])
+
+        # Responses for requests sent earlier in the same window report more
+        # requests left than we really have, so only ever count down.
+        if reset > self.reset:
+            self.reset = reset
+            self.remaining = remaining
+        elif reset == self.reset:
+            self.remaining = remaining if self.remaining is None else min(self.remaining, remaining)
+
+    def exhaust(self, reset):
+        """Mark the window as used up (e.g. after a 429 error)."""
+        self.remaining = 0
+        self.reset = max(self.reset, reset)
+
+    async def wait(self):
+        """Wait until it is our turn to send a request."""
+        async with self.lock:
+            now = time.time()
+
+            # Window used up, everyone waits for the reset.
+            if (self.remaining is not None) and (self.remaining <= 1) and (now < self.reset + self.buffer_wait_time):
+                resume_time = dt.fromtimestamp(self.reset + self.buffer_wait_time)
+                print(f"Waiting on Twitter.\n\tResume Time: {resume_time}")
+                await asyncio.sleep(self.reset + self.buffer_wait_time - now)
+                self.remaining = None
+                now = time.time()
+
+            if (self.remaining is not None) and (self.reset > now):
+                interval = (self.reset - now) / self.remaining
+                self.remaining -= 1
+            else:
+                interval = 0
+
+            start = max(now, self.next_slot)
+            self.next_slot = start + interval
+
+        await asyncio.sleep(start - now)
+
+
+async def connect_to_endpoint(oauth, params, limiter, executor):
     """Downloads data from Twitter based on the `oauth` object passed and the
     `params` created with the `create_params()` function. 
 
-    If time-dependent errors (429, 500, 503)
+    Requests are sent from `executor` (a thread pool) when `limiter` says it
+    is our turn, so several of them can be in flight at once.
 
+    If time-dependent errors (429, 500, 503) are returned, we wait and
+    try again.
     """
-    
-    switch = True
-    
-    while switch:
-        response = oauth.get("https://api.twitter.com/2/users", params=params)
-        
-        # Get number of requests left with our tokens
-        remaining_requests = int(response.headers["x-rate-limit-remaining"])
-        
-        # If that number is one, we get the reset-time and wait until then, plus 15 seconds.
-        # This is caught below as well, however, we want to program defensively, if possible.
-        if remaining_requests == 1:
-            buffer_wait_time = 15 
-            resume_time = dt.fromtimestamp( int(response.headers["x-rate-limit-reset"]) + buffer_wait_time )
-            print(f"Waiting on Twitter.\n\tResume Time: {resume_time}")
-            pause.until(resume_time)
+    loop = asyncio.get_running_loop()
+
+    while True:
+        await limiter.wait()
+        response = await loop.run_in_executor(
+            executor,
+            functools.partial(oauth.get, "https://api.twitter.com/2/users", params=params)
+        )
+        limiter.update(response.headers)
+
+        # If we get a 200 response, lets exit the function and return the response.json
+        if response.ok:
+            return response.json()
 
         """To be safe, we check explicitly for these TIME DEPENDENT errors.
         That is, these errors can be solved simply by waiting a little while 
         and pinging Twitter again. So that's what we do."""
-        if response.status_code != 200:
 
-            # Too many requests error
-            if response.status_code == 429:
-                buffer_wait_time = 15 
-                resume_time = dt.fromtimestamp( int(response.headers["x-rate-limit-reset"]) + buffer_wait_time )
-                print(f"Waiting on Twitter.\n\tResume Time: {resume_time}")
-                pause.until(resume_time)
+        # Too many requests error
+        if response.status_code == 429:
+            reset = int(response.headers.get("x-rate-limit-reset", time.time() + 15 * 60))
+            limiter.exhaust(reset)
+            continue
 
-            # Twitter internal server error
-            elif response.status_code == 500:
-                # Twitter needs a break, so we wait 30 seconds
-                resume_time = dt.now().timestamp() + 30
-                print(f"Waiting on Twitter.\n\tResume Time: {resume_time}")
-                pause.unit(resume_time)
-
-            # Twitter service unavailable error
-            elif response.status_code == 503:
-                # Twitter needs a break, so we wait 30 seconds
-                resume_time = dt.now().timestamp() + 30
-                print(f"Waiting on Twitter.\n\tResume Time: {resume_time}")
-                pause.unit(resume_time)
+        # Twitter internal server error or service unavailable error
+        if response.status_code in (500, 503):
+            # Twitter needs a break, so we wait 30 seconds
+            resume_time = dt.fromtimestamp(time.time() + 30)
+            print(f"Waiting on Twitter.\n\tResume Time: {resume_time}")
+            await asyncio.sleep(30)
+            continue
 
-            # If we get this far, we've done something wrong and should exit
-            raise Exception(
-                "Request returned an error: {} {}".format(
-                    response.status_code, response.text
-                )
+        # If we get this far, we've done something wrong and should exit
+        raise Exception(
+            "Request returned an error: {} {}".format(
+                response.status_code, response.text
             )
-        
-        # If we get a 200 response, lets exit the function and return the response.json
-        if response.ok:
-            return response.json()
+        )
 
 
 def chunker(seq, size):
@@ -166,6 +249,54 @@ def load_users(file):
     return chunked_user_list
 
 
+def write_response(json_response, data_file, error_file):
+    """Write the users and errors from one response to their files."""
+    data = json_response.get("data")
+    errors = json_response.get("errors")
+    
+    # No matter what `data` and `errors` will return, however, they may return `None`.
+    try:
+        data_file.writelines(f"{json.dumps(line)}\n" for line in data)
+    except TypeError:
+        print("No USER data found in this set of users, skipping to the next set.")
+        pass
+    
+    try:
+        error_file.writelines(f"{json.dumps(line)}\n" for line in errors)
+    except TypeError:
+        print("No problematic users found in this set of user, skipping to the next set.")
+        pass
+
+
+async def lookup_users(oauth, list_of_user_lists, data_file, error_file, concurrency, cache=None):
+    """Look up every list of users, keeping up to `concurrency` requests
+    in flight at once. Results are written as soon as they come back, so
+    the order of the output files does not match the input file.
+
+    If a `cache` (user_cache.UserCache) is given, every response is
+    added to it."""
+    limiter = RateLimiter()
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    user_lists = iter(list_of_user_lists)
+    progress = tqdm(total=len(list_of_user_lists))
+
+    async def worker():
+        for one_hundred_users in user_lists:
+            stringify_list = ",".join(one_hundred_users)
+            params = create_params(userids = stringify_list)
+            json_response = await connect_to_endpoint(oauth, params, limiter, executor)
+            write_response(json_response, data_file, error_file)
+            if cache is not None:
+                cache.put_many(json_response.get("data"), json_response.get("errors"))
+            progress.update(1)
+
+    try:
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    finally:
+        progress.close()
+        executor.shutdown()
+
+
 def main():
     
     # Authorize API and return `oauth` object
@@ -174,32 +305,28 @@ def main():
     # Get chunked list of 
     list_of_user_lists = load_users(file)
 
+    # Answer what we can from the cache and only ask Twitter for the rest
+    cache = None
+    cached_response = {}
+    if cache_file:
+        cache = UserCache(cache_file, ttl=cache_ttl, fields=cache_fields)
+        all_users = [user for user_list in list_of_user_lists for user in user_list]
+        cached_users, cached_errors, misses = cache.get_many(all_users)
+        cached_response = {"data": cached_users, "errors": cached_errors}
+        list_of_user_lists = list(chunker(misses, 100))
+
     # Get today's date
     today = dt.strftime(dt.today(), "%Y-%m-%d_%H-%M")
 
     # Open two files. One for good data, the other for account errors.
     with open(f"account_data--{today}.json", 'w') as data_file, open(f"account_errors--{today}.json", 'w') as error_file:
+        if cache is not None:
+            write_response(cached_response, data_file, error_file)
+        asyncio.run(lookup_users(oauth, list_of_user_lists, data_file, error_file, concurrency, cache))
 
-        # Iterate through the list of lists, starting a tqdm timer
-        for one_hundred_users in tqdm(list_of_user_lists):
-            stringify_list = ",".join(one_hundred_users)
-            params = create_params(userids = stringify_list)
-            json_response = connect_to_endpoint(oauth, params)
-            data = json_response.get("data")
-            errors = json_response.get("errors")
-            
-            # No matter what `data` and `errors` will return, however, they may return `None`.
-            try:
-                data_file.writelines(f"{json.dumps(line)}\n" for line in data)
-            except TypeError:
-                print("No USER data found in this set of users, skipping to the next set.")
-                pass
-            
-            try:
-                error_file.writelines(f"{json.dumps(line)}\n" for line in errors)
-            except TypeError:
-                print("No problematic users found in this set of user, skipping to the next set.")
-                pass
+    if cache is not None:
+        print(f"Cache hits: {cache.hits} | Cache misses: {cache.misses}")
+        cache.close()
 
 # Exectue the program
 #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
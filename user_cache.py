@@ -0,0 +1,127 @@
+"""
+PURPOSE
+    - A module for caching Twitter user objects locally (in SQLite) so
+    that scripts like user-lookup.py don't ask Twitter for the same
+    accounts again and again.
+
+CLASSES
+    - UserCache:
+        - Key-value cache of user objects (and lookup errors) keyed by
+        user id, with a time-to-live. See docstring for parameters and
+        example usage.
+
+Author: Matthew R. DeVerna
+Date: 10/18/2026
+"""
+
+import json
+import time
+import sqlite3
+
+
+class UserCache(object):
+    """
+    Cache user objects returned by Twitter's /2/users endpoint.
+
+    Both found users ("data") and the errors returned for users that could
+    not be found/are suspended ("errors") are cached, so neither is
+    requested again until it expires.
+
+    Required Parameters:
+    - path (str): SQLite database file. Created if it doesn't exist.
+
+    Optional Parameters:
+    - ttl (float): Seconds before a cached entry expires and is fetched
+        from Twitter again.
+        - default = 604800 (one week)
+    - fields (list): Only store these fields of each user object (the
+        "id" field is always kept). None stores the whole object.
+        - default = None
+
+    Example Usage:
+    cache = UserCache("user_cache.sqlite", ttl=24*60*60, fields=["username", "public_metrics"])
+    users, errors, misses = cache.get_many(user_ids)
+    ...  # Look up `misses` with Twitter
+    cache.put_many(json_response.get("data"), json_response.get("errors"))
+    print(cache.hits, cache.misses)
+    cache.close()
+    """
+
+    def __init__(self, path, ttl=604800, fields=None):
+        self.path = path
+        self.ttl = ttl
+        self.fields = set(fields) | {"id"} if fields else None
+        self.hits = 0
+        self.misses = 0
+
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS users ("
+            "id TEXT PRIMARY KEY, "
+            "is_error INTEGER NOT NULL, "
+            "fetched_at REAL NOT NULL, "
+            "data TEXT NOT NULL)"
+            )
+        self.conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def get_many(self, user_ids):
+        """
+        Look up `user_ids` in the cache.
+
+        Returns:
+        - users (list): Cached user objects
+        - errors (list): Cached error objects
+        - misses (list): Ids that are not cached (or have expired)
+        """
+        oldest = time.time() - self.ttl
+        found = {}
+
+        # Stay under SQLite's limit on the number of query variables
+        for start in range(0, len(user_ids), 500):
+            chunk = user_ids[start:start + 500]
+            rows = self.conn.execute(
+                f"SELECT id, is_error, data FROM users WHERE fetched_at >= ? AND id IN ({','.join('?' * len(chunk))})",
+                [oldest, *chunk]
+                )
+            for user_id, is_error, data in rows:
+                found[user_id] = (is_error, data)
+
+        users, errors, misses = [], [], []
+        for user_id in user_ids:
+            if user_id not in found:
+                misses.append(user_id)
+                continue
+            is_error, data = found[user_id]
+            (errors if is_error else users).append(json.loads(data))
+
+        self.hits += len(user_ids) - len(misses)
+        self.misses += len(misses)
+        return users, errors, misses
+
+    def put_many(self, users=None, errors=None):
+        """
+        Add the `users` and `errors` from one /2/users response to the cache.
+        Either may be None.
+        """
+        now = time.time()
+        rows = []
+        for user in users or []:
+            if self.fields:
+                user = {key: value for key, value in user.items() if key in self.fields}
+            rows.append((str(user["id"]), 0, now, json.dumps(user)))
+        for error in errors or []:
+            user_id = error.get("resource_id") or error.get("value")
+            if user_id is not None:
+                rows.append((str(user_id), 1, now, json.dumps(error)))
+
+        self.conn.executemany("INSERT OR REPLACE INTO users VALUES (?, ?, ?, ?)", rows)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()